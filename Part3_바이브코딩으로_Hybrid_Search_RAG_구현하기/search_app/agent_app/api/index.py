@@ -1,5 +1,6 @@
 import os
 import json
+from contextlib import asynccontextmanager
 from typing import List
 from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
 from pydantic import BaseModel
@@ -8,12 +9,20 @@ from fastapi import FastAPI, Query
 from fastapi.responses import StreamingResponse
 from openai import OpenAI
 from .utils.prompt import ClientMessage, convert_to_openai_messages
-from .utils.tools import hybrid_search_tool, tavily_search_tool
+from .utils.tools import hybrid_search_tool, tavily_search_tool, verify_search_indexes
 
 
 load_dotenv(".env.local")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작 시 검색 인덱스 확인 (없으면 요청을 받기 전에 실패)"""
+    verify_search_indexes()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 client = OpenAI(
     api_key=os.environ.get("OPENAI_API_KEY"),
@@ -60,6 +69,30 @@ def stream_text(messages: List[ChatCompletionMessageParam], protocol: str = 'dat
                             "description": "반환할 최대 결과 개수 (기본값: 3)",
                             "default": 3,
                         },
+                        "min_interest_rate_lte": {
+                            "type": "number",
+                            "description": "최저금리(%)가 이 값 이하인 상품만 검색 (예: '금리 3% 이하로 받을 수 있는' → 3)",
+                        },
+                        "max_interest_rate_lte": {
+                            "type": "number",
+                            "description": "최고금리(%)가 이 값 이하인 상품만 검색",
+                        },
+                        "can_apply_online": {
+                            "type": "boolean",
+                            "description": "true이면 인터넷으로 신청 가능한 상품만 검색",
+                        },
+                        "can_apply_mobile": {
+                            "type": "boolean",
+                            "description": "true이면 모바일(스마트폰 앱)로 신청 가능한 상품만 검색",
+                        },
+                        "is_available": {
+                            "type": "boolean",
+                            "description": "true이면 현재 이용 가능한 상품만 검색",
+                        },
+                        "is_sale_available": {
+                            "type": "boolean",
+                            "description": "true이면 현재 판매 중인 상품만 검색",
+                        },
                     },
                     "required": ["query"],
                 },
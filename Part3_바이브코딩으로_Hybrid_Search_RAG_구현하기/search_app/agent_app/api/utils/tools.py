@@ -6,7 +6,7 @@ Agent 도구 구현
 import os
 import sys
 import requests
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
 # 환경변수 로드 - 절대 경로로 .env.local 파일 지정
@@ -22,25 +22,55 @@ search_app_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../
 if search_app_dir not in sys.path:
     sys.path.insert(0, search_app_dir)
 
-from hybrid_search import hybrid_search as execute_hybrid_search
+from hybrid_search import (
+    hybrid_search as execute_hybrid_search, HYBRID_SEARCH_VECTOR_QUANTIZATION, HYBRID_SEARCH_VECTOR_DIMENSIONS
+)
+from schema import verify_search_indexes as verify_schema_indexes
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
 
-def hybrid_search_tool(query: str, limit: int = 3) -> List[Dict]:
+def verify_search_indexes():
+    """서버 시작 시 검색 인덱스 확인 (양자화 검색을 쓰면 식 인덱스 포함)"""
+    verify_schema_indexes(quantization=HYBRID_SEARCH_VECTOR_QUANTIZATION, dimensions=HYBRID_SEARCH_VECTOR_DIMENSIONS)
+
+
+def hybrid_search_tool(
+    query: str,
+    limit: int = 3,
+    min_interest_rate_lte: Optional[float] = None,
+    max_interest_rate_lte: Optional[float] = None,
+    can_apply_online: Optional[bool] = None,
+    can_apply_mobile: Optional[bool] = None,
+    is_available: Optional[bool] = None,
+    is_sale_available: Optional[bool] = None
+) -> List[Dict]:
     """
     농협 대출 상품 하이브리드 검색 도구
 
     Args:
         query: 검색할 질문 또는 키워드
         limit: 반환할 최대 결과 개수 (기본값: 3)
+        min_interest_rate_lte, max_interest_rate_lte: 최저/최고금리(%) 상한
+        can_apply_online, can_apply_mobile, is_available, is_sale_available: 신청 채널/판매 여부 필터
+        (지정한 필터는 BM25/벡터 SQL에서 먼저 적용됩니다)
 
     Returns:
         검색된 대출 상품 목록
         각 상품은 id, product_name, product_summary, target_description 등을 포함
     """
     try:
-        results = execute_hybrid_search(query, limit=limit)
+        filters = {
+            'min_interest_rate_lte': min_interest_rate_lte,
+            'max_interest_rate_lte': max_interest_rate_lte,
+            'can_apply_online': can_apply_online,
+            'can_apply_mobile': can_apply_mobile,
+            'is_available': is_available,
+            'is_sale_available': is_sale_available,
+        }
+        results = execute_hybrid_search(
+            query, limit=limit, filters=filters
+        )
         return results
     except Exception as e:
         print(f"Hybrid search error: {e}")
@@ -0,0 +1,35 @@
+"""
+벤치마크 공통 유틸리티
+"""
+import os
+import sys
+import math
+from typing import List
+
+# search_app 폴더를 sys.path에 추가하여 hybrid_search 등 모듈을 임포트합니다.
+SEARCH_APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if SEARCH_APP_DIR not in sys.path:
+    sys.path.insert(0, SEARCH_APP_DIR)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """nearest-rank 방식 백분위수 (p: 0~100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_latency(name: str, latencies_ms: List[float]):
+    """p50/p99/평균 지연시간 한 줄 출력"""
+    if not latencies_ms:
+        print(f"{name:<24} (측정값 없음)")
+        return
+    mean = sum(latencies_ms) / len(latencies_ms)
+    print(
+        f"{name:<24} n={len(latencies_ms):<4} "
+        f"p50={percentile(latencies_ms, 50):8.1f}ms  "
+        f"p99={percentile(latencies_ms, 99):8.1f}ms  "
+        f"mean={mean:8.1f}ms"
+    )
@@ -0,0 +1,66 @@
+"""
+커넥션 풀 벤치마크
+매 쿼리마다 새로 연결하는 방식과 커넥션 풀을 재사용하는 방식의 p50/p99 지연시간을 비교합니다.
+
+기본 모드는 BM25 쿼리만 측정하여 OpenAI 임베딩 호출의 변동을 배제합니다.
+--full 옵션을 주면 hybrid_search() 전체(임베딩 포함)를 측정합니다.
+
+사용법:
+    uv run python benchmarks/benchmark_pool.py
+    uv run python benchmarks/benchmark_pool.py --iterations 50 --full
+"""
+import time
+import argparse
+from bench_utils import summarize_latency
+from db_pool import get_connection, close_pool
+from hybrid_search import bm25_search, hybrid_search
+
+QUERIES = [
+    "공무원 대출",
+    "의사 전용 대출",
+    "햇살론",
+    "농업인 운전자금",
+    "전세자금대출",
+]
+
+
+def run(iterations: int, pooled: bool, full: bool) -> list:
+    """지정한 모드로 쿼리를 반복 실행하고 지연시간(ms) 목록 반환"""
+    latencies = []
+    for i in range(iterations):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        if full:
+            hybrid_search(query, limit=3, use_pool=pooled, use_cache=False)
+        else:
+            with get_connection(pooled=pooled) as conn:
+                bm25_search(conn, query, limit=20)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="커넥션 풀 벤치마크")
+    parser.add_argument("--iterations", type=int, default=30, help="모드별 반복 횟수")
+    parser.add_argument("--full", action="store_true", help="hybrid_search() 전체 측정 (임베딩 포함)")
+    args = parser.parse_args()
+
+    target = "hybrid_search()" if args.full else "bm25_search()"
+    print(f"측정 대상: {target}, 반복: {args.iterations}회\n")
+
+    # 풀 워밍업 (최초 연결 비용은 측정에서 제외)
+    with get_connection(pooled=True):
+        pass
+
+    no_pool = run(args.iterations, pooled=False, full=args.full)
+    with_pool = run(args.iterations, pooled=True, full=args.full)
+    close_pool()
+
+    print("="*80)
+    summarize_latency("connect per query", no_pool)
+    summarize_latency("connection pool", with_pool)
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+프롬프트 캐시 벤치마크
+답변 생성 프롬프트의 이전 배치(짧은 시스템 메시지 + Few-shot/인용 규칙/검색 정보/문서/질문/작성 지침/안내사항을 합친 사용자 메시지)와
+현재 배치(1024 토큰 이상의 고정 지시문을 시스템 메시지로 앞에 두고 가변 부분을 뒤에 두는 build_search_messages)를 비교합니다.
+배치별로 질문 세트를 여러 번 돌려 답변 생성 지연시간, 입력/캐시된 입력/출력 토큰, 추정 비용을 출력합니다.
+배치 차이만 비교하도록 두 배치 모두 같은 prompt_cache_key(RAG_PROMPT_CACHE_KEY)로 호출합니다.
+
+OpenAI는 1024 토큰 이상인 프롬프트의 앞부분만 캐시하며, 캐시는 몇 분 동안만 유지됩니다.
+이전 배치는 질문마다 같은 앞부분이 1024 토큰보다 짧아 같은 질문이 반복될 때만 적중하고,
+현재 배치는 질문이 달라도 고정 지시문 부분이 적중합니다.
+첫 번째 반복은 캐시를 채우는 용도이므로 --iterations는 2 이상을 권장합니다.
+
+DATABASE_URL과 OPENAI_API_KEY가 필요합니다. 검색은 측정 전에 한 번만 실행합니다.
+
+사용법:
+    uv run python benchmarks/benchmark_prompt_cache.py
+    uv run python benchmarks/benchmark_prompt_cache.py --iterations 3 --limit 5
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from langchain_core.messages import SystemMessage, HumanMessage
+from bench_utils import summarize_latency
+from hybrid_search import hybrid_search
+from db_pool import close_pool
+import langgraph_rag as rag
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(__file__), "router_questions.json")
+
+# gpt-5-mini 가격 (USD / 100만 토큰)
+PRICE_INPUT = float(os.getenv("PRICE_INPUT_PER_M", "0.25"))
+PRICE_CACHED_INPUT = float(os.getenv("PRICE_CACHED_INPUT_PER_M", "0.025"))
+PRICE_OUTPUT = float(os.getenv("PRICE_OUTPUT_PER_M", "2.0"))
+
+
+def legacy_messages(question: str, documents: list, current_date: str) -> list:
+    """이전 배치 (변경 전 generate_node와 같은 구성): 고정 지시문이 검색 정보/문서와 같은 사용자 메시지에 섞임"""
+    metadata, context = rag.format_search_context(documents)
+    disclaimer = rag.DISCLAIMER_TEMPLATE.format(current_date=current_date)
+    user_prompt = f"""
+{rag.FEW_SHOT_EXAMPLES}
+
+{rag.CITATION_PROMPT}
+
+{metadata}
+
+[검색된 대출 상품 정보]
+{context}
+
+[사용자 질문]
+{question}
+
+위 정보를 바탕으로 정확하고 친절하게 답변해주세요.
+반드시 출처([상품N])를 명시하고, 아래 안내사항을 답변 마지막에 포함하세요.
+
+{disclaimer}
+""".strip()
+    return [SystemMessage(content=rag.SYSTEM_PROMPT), HumanMessage(content=user_prompt)]
+
+
+async def generate(messages: list) -> tuple:
+    """답변 생성 한 번 → (지연시간 ms, usage_metadata)"""
+    start = time.perf_counter()
+    response = await rag.llm.ainvoke(messages, prompt_cache_key=rag.RAG_PROMPT_CACHE_KEY)
+    return (time.perf_counter() - start) * 1000, response.usage_metadata or {}
+
+
+def estimate_cost(input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    return (
+        (input_tokens - cached_tokens) * PRICE_INPUT
+        + cached_tokens * PRICE_CACHED_INPUT
+        + output_tokens * PRICE_OUTPUT
+    ) / 1_000_000
+
+
+def run_layout(build, retrieved: list, iterations: int) -> tuple:
+    """배치 하나로 질문 세트를 iterations번 실행 → (지연시간 목록, 토큰 합계)"""
+    current_date = datetime.now().strftime("%Y년 %m월 %d일")
+    latencies = []
+    totals = {'input_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0}
+    for _ in range(iterations):
+        for question, documents in retrieved:
+            latency, usage = asyncio.run(generate(build(question, documents, current_date)))
+            latencies.append(latency)
+            totals['input_tokens'] += usage.get('input_tokens', 0)
+            totals['cached_tokens'] += (usage.get('input_token_details') or {}).get('cache_read', 0) or 0
+            totals['output_tokens'] += usage.get('output_tokens', 0)
+    return latencies, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="프롬프트 캐시 벤치마크")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="질문 세트 경로 (route가 search인 질문만 사용)")
+    parser.add_argument("--iterations", type=int, default=2, help="질문 세트 반복 횟수")
+    parser.add_argument("--limit", type=int, default=3, help="질문당 검색 문서 수")
+    args = parser.parse_args()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f) if item.get('route', 'search') == 'search']
+
+    # 검색은 측정에서 제외 (두 배치에 같은 문서 사용)
+    retrieved = [(question, hybrid_search(question, limit=args.limit)) for question in questions]
+    retrieved = [(question, documents) for question, documents in retrieved if documents]
+    close_pool()
+    if not retrieved:
+        print("검색 결과가 있는 질문이 없습니다. DB에 상품을 먼저 적재하세요.")
+        return
+
+    print(f"질문: {len(retrieved)}개, 반복: {args.iterations}회, 문서: 질문당 {args.limit}개")
+    print(f"가격(USD/1M): 입력 {PRICE_INPUT}, 캐시된 입력 {PRICE_CACHED_INPUT}, 출력 {PRICE_OUTPUT}\n")
+    layouts = [
+        ("before (legacy)", legacy_messages),
+        ("after (static prefix)", rag.build_search_messages),
+    ]
+    print("="*80)
+    for name, build in layouts:
+        latencies, totals = run_layout(build, retrieved, args.iterations)
+        calls = len(latencies)
+        if not calls:
+            print(f"{name:<24} 호출 없음 (--iterations를 1 이상으로 지정하세요)")
+            continue
+        cost = estimate_cost(**totals)
+        summarize_latency(name, latencies)
+        print(
+            f"{'':<24} 입력 {totals['input_tokens'] / calls:.0f} / 캐시 {totals['cached_tokens'] / calls:.0f} / "
+            f"출력 {totals['output_tokens'] / calls:.0f} 토큰 (호출당), "
+            f"캐시 비율 {totals['cached_tokens'] / max(totals['input_tokens'], 1):.1%}, "
+            f"비용 ${cost:.5f} (호출당 ${cost / calls:.6f})"
+        )
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+벡터 양자화 벤치마크
+원본 float 인덱스와 양자화(halfvec, binary)/축소 차원 인덱스의 인덱스 크기, 벡터 검색 지연시간,
+float 결과 대비 recall@k를 비교합니다. 양자화 인덱스는 후보를 뽑은 뒤 원본 벡터로 재점수화합니다.
+
+DATABASE_URL과 OPENAI_API_KEY가 필요하며, 없는 양자화 인덱스는 먼저 생성합니다 (--skip-migrate로 생략).
+
+사용법:
+    uv run python benchmarks/benchmark_quantization.py
+    uv run python benchmarks/benchmark_quantization.py --config halfvec:1536 --config binary:1536 --k 10
+    uv run python benchmarks/benchmark_quantization.py --rescore-factor 8
+"""
+import os
+import time
+import argparse
+from bench_utils import percentile
+from search_eval import load_queries
+from db_pool import get_connection, close_pool
+import hybrid_search
+from hybrid_search import get_embedding, vector_search
+from schema import (
+    migrate_quantized_index, quantized_index_name, is_quantized, VECTOR_INDEX_NAMES, EMBEDDING_DIMENSIONS
+)
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(__file__), "relevance_queries.json")
+DEFAULT_CONFIGS = ["halfvec:1536", "binary:1536", "none:512", "halfvec:512"]
+
+
+def parse_config(value: str) -> tuple:
+    """QUANTIZATION:DIMENSIONS (예: halfvec:512)"""
+    quantization, _, dimensions = value.partition(":")
+    return quantization, int(dimensions or EMBEDDING_DIMENSIONS)
+
+
+def index_size_mb(conn, quantization: str, dimensions: int) -> float:
+    """설정에 해당하는 벡터 인덱스 크기 (MB, 인덱스가 없으면 0)"""
+    if is_quantized(quantization, dimensions):
+        names = [quantized_index_name(quantization, dimensions)]
+    else:
+        names = list(VECTOR_INDEX_NAMES.values())
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COALESCE(sum(pg_relation_size(indexrelid)), 0)
+        FROM pg_stat_user_indexes
+        WHERE indexrelname = ANY(%s)
+    """, (names,))
+    size = cursor.fetchone()[0]
+    cursor.close()
+    return size / (1024 * 1024)
+
+
+def run_config(conn, embeddings: list, k: int, iterations: int, quantization: str, dimensions: int) -> tuple:
+    """질의별 상위 k개 id 목록과 지연시간(ms) 목록"""
+    results, latencies = [], []
+    for embedding in embeddings:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            ranked = vector_search(
+                conn, "", limit=k, query_embedding=embedding, quantization=quantization, dimensions=dimensions
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+        results.append([product_id for product_id, _ in ranked])
+    return results, latencies
+
+
+def recall_against(baseline: list, results: list, k: int) -> float:
+    """질의별로 float 상위 k개 중 양자화 결과에 포함된 비율의 평균"""
+    recalls = [
+        len(set(expected[:k]) & set(found[:k])) / len(expected[:k])
+        for expected, found in zip(baseline, results) if expected
+    ]
+    return sum(recalls) / len(recalls) if recalls else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벡터 양자화 벤치마크")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="질의 세트 경로 (query 필드만 사용)")
+    parser.add_argument("--config", action="append", default=None, metavar="QUANTIZATION:DIMENSIONS", help="비교할 설정 (예: halfvec:512)")
+    parser.add_argument("--k", type=int, default=10, help="recall@k의 k")
+    parser.add_argument("--iterations", type=int, default=5, help="질의별 반복 횟수")
+    parser.add_argument("--rescore-factor", type=int, default=hybrid_search.VECTOR_RESCORE_FACTOR, help="재점수화 후보 배수")
+    parser.add_argument("--skip-migrate", action="store_true", help="양자화 인덱스 생성 생략")
+    args = parser.parse_args()
+
+    hybrid_search.VECTOR_RESCORE_FACTOR = args.rescore_factor
+    configs = [parse_config(value) for value in (args.config or DEFAULT_CONFIGS)]
+    queries = [item['query'] for item in load_queries(args.queries)]
+    # 임베딩 API 시간은 측정에서 제외
+    embeddings = [get_embedding(query) for query in queries]
+
+    print(f"질의: {len(queries)}개, k={args.k}, 반복: {args.iterations}회, 재점수화 배수: {args.rescore_factor}\n")
+    rows = []
+    with get_connection() as conn:
+        if not args.skip_migrate:
+            for quantization, dimensions in configs:
+                migrate_quantized_index(conn, quantization, dimensions)
+
+        baseline, latencies = run_config(conn, embeddings, args.k, args.iterations, "none", EMBEDDING_DIMENSIONS)
+        rows.append(("float:1536", index_size_mb(conn, "none", EMBEDDING_DIMENSIONS), latencies, 1.0))
+        for quantization, dimensions in configs:
+            results, latencies = run_config(conn, embeddings, args.k, args.iterations, quantization, dimensions)
+            rows.append((
+                f"{quantization}:{dimensions}",
+                index_size_mb(conn, quantization, dimensions),
+                latencies,
+                recall_against(baseline, results, args.k)
+            ))
+    close_pool()
+
+    print("="*80)
+    print(f"{'config':<16} {'index MB':>10} {'p50 ms':>9} {'p99 ms':>9} {'recall@' + str(args.k):>10}")
+    print("-"*80)
+    for name, size, latencies, recall in rows:
+        print(
+            f"{name:<16} {size:>10.2f} {percentile(latencies, 50):>9.1f} "
+            f"{percentile(latencies, 99):>9.1f} {recall:>10.3f}"
+        )
+    print("="*80)
+    print("recall은 float 인덱스 상위 k개 대비 값입니다 (재점수화 후).")
+
+
+if __name__ == "__main__":
+    main()
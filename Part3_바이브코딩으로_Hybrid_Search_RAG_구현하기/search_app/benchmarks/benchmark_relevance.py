@@ -0,0 +1,76 @@
+"""
+검색 품질 벤치마크
+라벨링된 질의 세트(relevance_queries.json)로 BM25 단독 / 벡터 단독 / RRF의 recall@k, MRR, nDCG@k와
+단계별 지연시간을 출력합니다. BM25_ISSUE_REPORT.md의 '햇살론', '서민금융' 질의를 포함합니다.
+--compare-fusion을 주면 fusion.py의 결합 전략(가중 RRF, min-max, z-score, convex)을 같은 후보로 비교합니다.
+
+기본 백엔드(memory)는 loan_products.json과 결정적 가짜 임베딩을 사용하므로 DB와 API 키가 필요 없습니다.
+가짜 임베딩은 의미 유사도가 없으므로 벡터/RRF 점수는 파이프라인 비교용이며, 실제 품질은 --backend postgres로 측정합니다.
+
+사용법:
+    uv run python benchmarks/benchmark_relevance.py
+    uv run python benchmarks/benchmark_relevance.py --k 5 --depth 10
+    uv run python benchmarks/benchmark_relevance.py --backend postgres
+    uv run python benchmarks/benchmark_relevance.py --compare-fusion --depth 10
+"""
+import os
+import argparse
+from bench_utils import SEARCH_APP_DIR, summarize_latency
+
+# memory 백엔드는 API를 호출하지 않지만 hybrid_search 모듈은 import 시점에 키를 요구
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+
+from search_eval import (
+    LATENCY_STAGES, FUSION_COMPARISON, MemoryCatalog, PostgresCatalog, evaluate, load_queries
+)
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(__file__), "relevance_queries.json")
+DEFAULT_PRODUCTS = os.path.join(SEARCH_APP_DIR, "..", "loan_products.json")
+
+
+def print_report(report: dict, k: int):
+    """모드별 평균 지표, 질의별 recall, 단계별 지연시간 출력"""
+    print("="*80)
+    print(f"{'mode':<14} {'recall@' + str(k):>10} {'MRR':>8} {'nDCG@' + str(k):>10}")
+    print("-"*80)
+    for mode in report['modes']:
+        metrics = report['metrics'][mode]
+        print(f"{mode:<14} {metrics['recall']:>10.3f} {metrics['mrr']:>8.3f} {metrics['ndcg']:>10.3f}")
+
+    print("\n질의별 recall@{} ({})".format(k, " / ".join(report['modes'])))
+    print("-"*80)
+    for result in report['per_query']:
+        recalls = " / ".join(f"{result[mode]['recall']:.2f}" for mode in report['modes'])
+        print(f"  {result['query']:<24} {recalls}")
+
+    print("\n단계별 지연시간")
+    print("-"*80)
+    for stage in LATENCY_STAGES:
+        summarize_latency(stage, report['latencies'][stage])
+    print("="*80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 품질 벤치마크")
+    parser.add_argument("--backend", choices=["memory", "postgres"], default="memory", help="검색 백엔드")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="라벨링된 질의 세트 경로")
+    parser.add_argument("--products", default=DEFAULT_PRODUCTS, help="memory 백엔드용 상품 JSON 경로")
+    parser.add_argument("--k", type=int, default=10, help="recall@k, nDCG@k의 k")
+    parser.add_argument("--depth", type=int, default=20, help="레그별 후보 수")
+    parser.add_argument("--compare-fusion", action="store_true", help="결합 전략 비교")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    if args.backend == "memory":
+        catalog = MemoryCatalog.from_json(args.products)
+    else:
+        catalog = PostgresCatalog()
+
+    print(f"백엔드: {args.backend}, 질의: {len(queries)}개, k={args.k}, depth={args.depth}\n")
+    fusions = FUSION_COMPARISON if args.compare_fusion else None
+    report = evaluate(catalog, queries, k=args.k, depth=args.depth, fusions=fusions)
+    print_report(report, args.k)
+
+
+if __name__ == "__main__":
+    main()
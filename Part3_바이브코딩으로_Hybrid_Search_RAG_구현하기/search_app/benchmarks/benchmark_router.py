@@ -0,0 +1,105 @@
+"""
+라우터 벤치마크
+고정된 질문 세트(router_questions.json)로 LLM 라우터와 fast 라우터(규칙/임베딩 + LLM fallback)의
+라우팅 지연시간, 라벨 대비 정확도, LLM fallback 비율을 비교합니다.
+--full을 주면 그래프 전체(라우팅 → 검색 → 답변)의 지연시간도 라우터별로 측정합니다 (DB 필요).
+--speculative를 함께 주면 추측 검색을 켜고, 낭비된 검색 비율과 사용 시 절감 시간을 출력합니다.
+
+OPENAI_API_KEY가 필요합니다. 예시 질문 임베딩은 측정 전에 미리 생성합니다.
+--full에서는 결과 캐시를 끄고 라우터마다 빈 임베딩 캐시를 사용하여 같은 조건으로 비교합니다.
+fast 라우터가 만든 질문 임베딩을 벡터 레그가 재사용하는 효과는 절감분에 포함됩니다.
+
+사용법:
+    uv run python benchmarks/benchmark_router.py
+    uv run python benchmarks/benchmark_router.py --full
+    uv run python benchmarks/benchmark_router.py --full --speculative
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from bench_utils import summarize_latency
+import hybrid_search
+import langgraph_rag as rag
+from embedding_cache import EmbeddingCache
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(__file__), "router_questions.json")
+
+
+async def route_with(router: str, question: str) -> dict:
+    """route_node만 실행"""
+    return await rag.route_node({"question": question, "router": router, "debug": False})
+
+
+async def run_graph(app, router: str, question: str, speculative: bool = False) -> dict:
+    """그래프 전체 실행"""
+    return await app.ainvoke({
+        "question": question, "route_decision": "", "route_method": "", "router": router, "speculative": speculative,
+        "documents": [], "answer": "", "debug": False, "search_options": {"use_cache": False},
+    })
+
+
+def measure(run, router: str, questions: list) -> tuple:
+    """질문별 결과와 지연시간(ms) 목록"""
+    results, latencies = [], []
+    for item in questions:
+        start = time.perf_counter()
+        results.append(asyncio.run(run(router, item['question'])))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="라우터 벤치마크")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="라벨링된 질문 세트 경로")
+    parser.add_argument("--full", action="store_true", help="그래프 전체 지연시간도 측정")
+    parser.add_argument("--speculative", action="store_true", help="--full에서 추측 검색 사용")
+    args = parser.parse_args()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+
+    # 예시 질문 임베딩(최초 1회)은 측정에서 제외
+    rag.fast_router.embedding_decision("워밍업")
+
+    print(f"질문: {len(questions)}개\n")
+    print("="*80)
+    route_means = {}
+    for router in rag.ROUTERS:
+        results, latencies = measure(route_with, router, questions)
+        correct = sum(result['route_decision'] == item['route'] for result, item in zip(results, questions))
+        methods = [result['route_method'] for result in results]
+        route_means[router] = sum(latencies) / len(latencies)
+        summarize_latency(f"route ({router})", latencies)
+        print(
+            f"{'':<24} 정확도 {correct}/{len(questions)}, "
+            + ", ".join(f"{method} {methods.count(method)}" for method in ("rule", "embedding", "llm"))
+        )
+    stats = rag.fast_router.stats()
+    print("-"*80)
+    print(f"fast 라우터 LLM fallback 비율: {stats['fallback_rate']:.1%}")
+    print(f"질문당 라우팅 지연시간 절감: {route_means['llm'] - route_means['fast']:.1f}ms")
+
+    if args.full:
+        app = rag.build_graph()
+        full_means = {}
+        print("-"*80)
+        for router in rag.ROUTERS:
+            # 앞선 실행의 질문 임베딩이 다음 라우터의 검색을 빠르게 하지 않도록 새 메모리 캐시 사용 (디스크 캐시는 건드리지 않음)
+            hybrid_search.embedding_cache = EmbeddingCache()
+            _, latencies = measure(lambda r, q: run_graph(app, r, q, args.speculative), router, questions)
+            full_means[router] = sum(latencies) / len(latencies)
+            summarize_latency(f"end-to-end ({router})", latencies)
+        print(f"질문당 전체 지연시간 절감: {full_means['llm'] - full_means['fast']:.1f}ms")
+        if args.speculative:
+            stats = rag.speculation_stats()
+            print(
+                f"추측 검색: {stats['speculated']}회, 사용 {stats['used']}회 (평균 {stats['avg_saved_ms']:.0f}ms 절감), "
+                f"낭비 {stats['wasted']}회 ({stats['waste_rate']:.1%}, 검색 시간 {stats['wasted_ms']:.0f}ms)"
+            )
+    print("="*80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+로컬 BM25 인덱스
+pg_search 대신 프로세스 내에서 키워드 검색을 수행합니다 (네트워크 왕복 없음, DB 없이 테스트 가능).
+cleaned_searchable_text를 pg_search 인덱스와 같은 2~3글자 n-gram으로 토큰화하여 역색인을 만들고,
+BM25 점수(k1=1.2, b=0.75)를 NumPy로 계산합니다.
+
+- 디스크 저장: BM25_INDEX_PATH를 지정하면 .npz 파일로 저장하고, 카탈로그 버전이 같으면 재시작 시 다시 읽습니다.
+- 갱신: vector_index.py와 같이 카탈로그 버전(schema.bump_catalog_version)을 보고 다시 로드합니다.
+"""
+import os
+import sys
+import math
+import time
+import threading
+from contextlib import nullcontext
+from collections import Counter
+from typing import List, Optional, Set, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from db_pool import get_connection
+from schema import get_catalog_version
+
+# 환경변수 로드
+load_dotenv()
+
+# 인덱스 파일 경로 (지정하지 않으면 메모리에만 유지)
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH")
+# 카탈로그 버전 확인 주기 (초)
+BM25_INDEX_REFRESH_INTERVAL = float(os.getenv("BM25_INDEX_REFRESH_INTERVAL", "60"))
+
+_index = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def ngram_tokens(text: str, min_gram: int = 2, max_gram: int = 3) -> List[str]:
+    """
+    pg_search ngram 토크나이저(min_gram=2, max_gram=3, prefix_only=false)와 같은 방식의 토큰화
+    공백을 포함한 전체 문자열에서 글자 n-gram을 만들고 소문자로 변환합니다.
+    예: "햇살론" → ["햇살", "햇살론", "살론"]
+    """
+    text = text.lower()
+    return [
+        text[start:start + size]
+        for start in range(len(text))
+        for size in range(min_gram, max_gram + 1)
+        if start + size <= len(text)
+    ]
+
+
+class LocalBM25Index:
+    """
+    n-gram 역색인 BM25
+    term별 포스팅(문서 번호, 등장 횟수)을 CSR 형태의 배열 세 개(offsets, postings, frequencies)로 저장합니다.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        terms: List[str],
+        offsets,
+        postings,
+        frequencies,
+        doc_lengths,
+        k1: float = 1.2,
+        b: float = 0.75,
+        catalog_version: int = 0
+    ):
+        self.ids = list(ids)
+        self.positions = {product_id: i for i, product_id in enumerate(self.ids)}
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int32)
+        self.frequencies = np.asarray(frequencies, dtype=np.float32)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.k1 = k1
+        self.b = b
+        self.catalog_version = catalog_version
+        avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        # 문서 길이 정규화 항은 쿼리와 무관하므로 미리 계산
+        self._length_norm = k1 * (1 - b + b * self.doc_lengths / avg_length) if avg_length else self.doc_lengths
+
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str], catalog_version: int = 0, **params) -> "LocalBM25Index":
+        """정제된 텍스트(cleaned_searchable_text)로 인덱스 생성"""
+        postings_by_term = {}
+        doc_lengths = []
+        for doc, text in enumerate(texts):
+            counts = Counter(ngram_tokens(text or ""))
+            doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings_by_term.setdefault(term, []).append((doc, count))
+
+        terms = sorted(postings_by_term)
+        offsets = [0]
+        postings, frequencies = [], []
+        for term in terms:
+            for doc, count in postings_by_term[term]:
+                postings.append(doc)
+                frequencies.append(count)
+            offsets.append(len(postings))
+
+        return cls(ids, terms, offsets, postings, frequencies, doc_lengths, catalog_version=catalog_version, **params)
+
+    @classmethod
+    def from_db(cls, conn, catalog_version: int = 0) -> "LocalBM25Index":
+        """loan_products의 cleaned_searchable_text로 인덱스 생성"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, cleaned_searchable_text FROM loan_products ORDER BY id")
+        rows = cursor.fetchall()
+        cursor.close()
+        return cls.build([row[0] for row in rows], [row[1] for row in rows], catalog_version=catalog_version)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(
+        self,
+        cleaned_query: str,
+        limit: int = 20,
+        allowed_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        BM25 검색 (bm25_search()와 같은 형식, 점수가 0인 문서는 제외)
+        allowed_ids를 주면 그 상품만 후보로 사용합니다 (search_filters.allowed_ids 참고).
+        Returns: [(product_id, score), ...]
+        """
+        if not self.ids or limit <= 0:
+            return []
+
+        total = len(self.ids)
+        scores = np.zeros(total, dtype=np.float32)
+        for term in set(ngram_tokens(cleaned_query or "")):
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end]
+            df = end - start
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            # 한 term의 포스팅에는 같은 문서가 한 번만 있으므로 인덱스 대입으로 누적 가능
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + self._length_norm[docs])
+
+        matched = np.flatnonzero(scores > 0)
+        if allowed_ids is not None:
+            positions = self.positions
+            matched = matched[np.isin(matched, [positions[i] for i in allowed_ids if i in positions])]
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        # 점수 내림차순, 동점은 id 순서
+        matched = matched[np.lexsort((matched, -scores[matched]))]
+        return [(self.ids[i], float(scores[i])) for i in matched]
+
+    def save(self, path: str):
+        """.npz 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        terms = sorted(self.terms, key=self.terms.get)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                ids=np.array(self.ids, dtype=str),
+                terms=np.array(terms, dtype=str),
+                offsets=self.offsets,
+                postings=self.postings,
+                frequencies=self.frequencies,
+                doc_lengths=self.doc_lengths,
+                params=np.array([self.k1, self.b]),
+                catalog_version=np.array(self.catalog_version)
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalBM25Index":
+        """save()로 저장한 파일 읽기"""
+        with np.load(path, allow_pickle=False) as data:
+            k1, b = data['params'].tolist()
+            return cls(
+                data['ids'].tolist(),
+                data['terms'].tolist(),
+                data['offsets'],
+                data['postings'],
+                data['frequencies'],
+                data['doc_lengths'],
+                k1=k1,
+                b=b,
+                catalog_version=int(data['catalog_version'])
+            )
+
+
+def _load_or_build(conn, version: int) -> LocalBM25Index:
+    """디스크의 인덱스가 현재 카탈로그 버전이면 읽고, 아니면 DB에서 새로 만들어 저장"""
+    if BM25_INDEX_PATH and os.path.exists(BM25_INDEX_PATH):
+        index = LocalBM25Index.load(BM25_INDEX_PATH)
+        if index.catalog_version == version:
+            print(f"Loaded local BM25 index from {BM25_INDEX_PATH}: {len(index)} products", file=sys.stderr)
+            return index
+
+    index = LocalBM25Index.from_db(conn, catalog_version=version)
+    print(f"Built local BM25 index: {len(index)} products, {len(index.terms)} terms (catalog version {version})", file=sys.stderr)
+    if BM25_INDEX_PATH:
+        index.save(BM25_INDEX_PATH)
+    return index
+
+
+def get_bm25_index(conn=None) -> LocalBM25Index:
+    """
+    모듈 단위 BM25 인덱스 반환
+    최초 호출 시 로드하고, 이후에는 BM25_INDEX_REFRESH_INTERVAL마다 카탈로그 버전을 확인합니다.
+    conn: 호출자가 이미 잡고 있는 연결 (주면 풀에서 연결을 하나 더 빌리지 않으므로, 연결을 쥔 채 풀을 기다리는 교착을 막음)
+    """
+    global _index, _checked_at
+
+    if _index is not None and time.monotonic() - _checked_at < BM25_INDEX_REFRESH_INTERVAL:
+        return _index
+
+    with _index_lock:
+        if _index is not None and time.monotonic() - _checked_at < BM25_INDEX_REFRESH_INTERVAL:
+            return _index
+
+        with nullcontext(conn) if conn is not None else get_connection() as conn:
+            version = get_catalog_version(conn)
+            if _index is None or version != _index.catalog_version:
+                _index = _load_or_build(conn, version)
+        _checked_at = time.monotonic()
+
+    return _index
+
+
+def refresh_bm25_index(conn=None) -> LocalBM25Index:
+    """디스크 파일과 관계없이 DB에서 즉시 다시 생성 (갱신 훅, conn은 get_bm25_index()와 같음)"""
+    global _index, _checked_at
+
+    with _index_lock:
+        with nullcontext(conn) if conn is not None else get_connection() as conn:
+            version = get_catalog_version(conn)
+            _index = LocalBM25Index.from_db(conn, catalog_version=version)
+        if BM25_INDEX_PATH:
+            _index.save(BM25_INDEX_PATH)
+        _checked_at = time.monotonic()
+        print(f"Rebuilt local BM25 index: {len(_index)} products (catalog version {version})", file=sys.stderr)
+
+    return _index
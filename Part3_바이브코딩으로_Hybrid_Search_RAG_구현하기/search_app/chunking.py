@@ -0,0 +1,188 @@
+"""
+상품 긴 필드 청크 분할
+product_description, important_notices, required_documents처럼 searchable_text에 들어가지 않는 긴 필드를
+겹치는 구간(passage)으로 나눠 loan_product_chunks 테이블에 색인합니다 (load_data.py --chunks).
+
+- 구간 크기와 겹침은 토큰 수(추정치)로 지정합니다 (CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS).
+- 토큰 수는 load_data.estimate_tokens()(UTF-8 바이트 / 3)로 추정합니다.
+- 단어(공백) 단위로 자르므로 단어가 중간에 끊기지 않습니다.
+- 청크 내용 해시가 같으면 다시 임베딩하지 않고, 원본에서 사라진 청크는 삭제합니다.
+"""
+import os
+import hashlib
+from typing import Callable, Iterable, List
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+from load_data import get_embeddings, clean_text, estimate_tokens, chunked, TokenBudget
+from fields import CHUNK_FIELDS
+
+# 환경변수 로드
+load_dotenv()
+
+# 구간 크기와 겹침 (추정 토큰 수)
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+
+
+def split_passages(
+    text: str,
+    window_tokens: int = None,
+    overlap_tokens: int = None,
+    count_tokens: Callable[[str], int] = estimate_tokens
+) -> List[str]:
+    """
+    텍스트를 window_tokens 크기의 겹치는 구간으로 분할
+    다음 구간은 이전 구간 끝의 overlap_tokens만큼을 다시 포함하여 시작합니다.
+    단어 하나가 window_tokens보다 길면 그 단어만으로 한 구간이 됩니다.
+    """
+    window_tokens = window_tokens or CHUNK_TOKENS
+    overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    if overlap_tokens >= window_tokens:
+        raise ValueError(f"overlap_tokens({overlap_tokens}) must be smaller than window_tokens({window_tokens})")
+
+    words = (text or "").split()
+    if not words:
+        return []
+    sizes = [count_tokens(word + " ") for word in words]
+
+    passages = []
+    start = 0
+    while True:
+        end, total = start, 0
+        while end < len(words) and (end == start or total + sizes[end] <= window_tokens):
+            total += sizes[end]
+            end += 1
+        passages.append(" ".join(words[start:end]))
+        if end >= len(words):
+            return passages
+
+        # 겹침: 끝에서부터 overlap_tokens를 넘지 않는 만큼 되돌아가되, 반드시 앞으로 진행
+        next_start, overlap = end, 0
+        while next_start - 1 > start and overlap + sizes[next_start - 1] <= overlap_tokens:
+            next_start -= 1
+            overlap += sizes[next_start]
+        start = next_start
+
+
+def chunk_id(product_id: str, field: str, index: int) -> str:
+    return f"{product_id}:{field}:{index}"
+
+
+def product_chunks(
+    product: dict,
+    fields: tuple = CHUNK_FIELDS,
+    window_tokens: int = None,
+    overlap_tokens: int = None
+) -> List[dict]:
+    """
+    상품 하나의 청크 목록
+    Returns: [{'id', 'product_id', 'field', 'chunk_index', 'content', 'content_hash'}, ...]
+    """
+    chunks = []
+    for field in fields:
+        for index, content in enumerate(split_passages(product.get(field) or "", window_tokens, overlap_tokens)):
+            chunks.append({
+                'id': chunk_id(product['id'], field, index),
+                'product_id': product['id'],
+                'field': field,
+                'chunk_index': index,
+                'content': content,
+                'content_hash': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            })
+    return chunks
+
+
+def fetch_chunk_hashes(conn, product_ids: List[str]) -> dict:
+    """DB에 저장된 청크의 내용 해시 조회 → {청크 id: content_hash}"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, content_hash FROM loan_product_chunks
+        WHERE product_id = ANY(%s)
+    """, (product_ids,))
+    existing = dict(cursor.fetchall())
+    cursor.close()
+    conn.commit()
+    return existing
+
+
+def write_chunks(conn, chunks: List[dict], embeddings: List[list], stale_ids: List[str]):
+    """청크 upsert와 사라진 청크 삭제를 하나의 트랜잭션으로 커밋"""
+    rows = [
+        (
+            chunk['id'], chunk['product_id'], chunk['field'], chunk['chunk_index'],
+            chunk['content'], clean_text(chunk['content']), embedding, chunk['content_hash']
+        )
+        for chunk, embedding in zip(chunks, embeddings)
+    ]
+    cursor = conn.cursor()
+    try:
+        if rows:
+            execute_values(cursor, """
+                INSERT INTO loan_product_chunks
+                    (id, product_id, field, chunk_index, content, cleaned_content, embedding, content_hash)
+                VALUES %s
+                ON CONFLICT (id) DO UPDATE SET
+                    product_id = EXCLUDED.product_id,
+                    field = EXCLUDED.field,
+                    chunk_index = EXCLUDED.chunk_index,
+                    content = EXCLUDED.content,
+                    cleaned_content = EXCLUDED.cleaned_content,
+                    embedding = EXCLUDED.embedding,
+                    content_hash = EXCLUDED.content_hash
+            """, rows, page_size=len(rows))
+        if stale_ids:
+            cursor.execute("DELETE FROM loan_product_chunks WHERE id = ANY(%s)", (stale_ids,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def ingest_chunks(
+    conn,
+    products: Iterable[dict],
+    batch_size: int = 100,
+    budget: TokenBudget = None,
+    window_tokens: int = None,
+    overlap_tokens: int = None
+) -> dict:
+    """
+    상품들의 긴 필드를 청크로 나눠 임베딩 후 저장
+    batch_size개 청크마다 임베딩 API를 한 번 호출하고, 상품 batch_size개 단위로 커밋합니다.
+    상품은 loan_products에 먼저 저장되어 있어야 합니다 (외래 키).
+    Returns: {'products', 'chunks', 'embedded', 'unchanged', 'deleted', 'failed'}
+    """
+    stats = {'products': 0, 'chunks': 0, 'embedded': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0}
+    for batch in chunked(products, batch_size):
+        chunks = [
+            chunk for product in batch
+            for chunk in product_chunks(product, window_tokens=window_tokens, overlap_tokens=overlap_tokens)
+        ]
+        try:
+            existing = fetch_chunk_hashes(conn, [product['id'] for product in batch])
+            current_ids = {chunk['id'] for chunk in chunks}
+            to_embed = [chunk for chunk in chunks if existing.get(chunk['id']) != chunk['content_hash']]
+            stale_ids = [chunk_id for chunk_id in existing if chunk_id not in current_ids]
+
+            embeddings = []
+            for part in chunked(to_embed, batch_size):
+                texts = [chunk['content'] for chunk in part]
+                if budget is not None:
+                    budget.acquire(sum(estimate_tokens(text) for text in texts))
+                embeddings.extend(get_embeddings(texts))
+
+            write_chunks(conn, to_embed, embeddings, stale_ids)
+        except Exception as e:
+            stats['failed'] += len(batch)
+            print(f"  Chunk batch failed ({len(batch)} products): {e}")
+            continue
+
+        stats['products'] += len(batch)
+        stats['chunks'] += len(chunks)
+        stats['embedded'] += len(to_embed)
+        stats['unchanged'] += len(chunks) - len(to_embed)
+        stats['deleted'] += len(stale_ids)
+        print(f"  Chunked {stats['products']} products: {stats['chunks']} chunks ({stats['embedded']} embedded)")
+    return stats
@@ -0,0 +1,179 @@
+"""
+PostgreSQL 커넥션 풀
+검색 요청마다 Neon에 새로 연결(TCP+TLS+인증)하지 않도록 모듈 단위 풀을 재사용합니다.
+"""
+import os
+import sys
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool
+from dotenv import load_dotenv
+from tracing import span
+
+# 환경변수 로드
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# 풀 설정 (환경변수로 조정 가능)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "5"))
+# 마지막 사용 후 이 시간(초)이 지난 연결만 꺼낼 때 SELECT 1로 상태 확인
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_last_used = {}
+
+
+def _create_pool(minconn: int = None, maxconn: int = None, dsn: str = None) -> pool.ThreadedConnectionPool:
+    """ThreadedConnectionPool 생성 (호출자가 _pool_lock을 잡고 있어야 함)"""
+    global _pool, _pool_slots
+
+    maxconn = maxconn if maxconn is not None else DB_POOL_MAX_SIZE
+    _pool = pool.ThreadedConnectionPool(
+        minconn if minconn is not None else DB_POOL_MIN_SIZE,
+        maxconn,
+        dsn or DATABASE_URL
+    )
+    # 풀이 가득 차면 PoolError 대신 반납될 때까지 대기하도록 슬롯 수를 제한
+    _pool_slots = threading.BoundedSemaphore(maxconn)
+    return _pool
+
+
+def init_pool(minconn: int = None, maxconn: int = None, dsn: str = None) -> pool.ThreadedConnectionPool:
+    """
+    모듈 단위 커넥션 풀 초기화
+    이미 생성된 풀이 있으면 닫고 새로 만듭니다.
+    """
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _last_used.clear()
+        return _create_pool(minconn, maxconn, dsn)
+
+
+def get_pool() -> pool.ThreadedConnectionPool:
+    """풀을 반환 (최초 호출 시 생성)"""
+    if _pool is None or _pool.closed:
+        with _pool_lock:
+            if _pool is None or _pool.closed:
+                _create_pool()
+    return _pool
+
+
+def close_pool():
+    """풀의 모든 연결 종료"""
+    global _pool, _pool_slots
+
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _pool_slots = None
+        _last_used.clear()
+
+
+def _is_healthy(conn) -> bool:
+    """
+    연결 상태 확인
+    최근에 사용된 연결은 바로 통과시키고, 오래 쉰 연결만 SELECT 1로 확인합니다.
+    (Neon은 유휴 연결을 끊을 수 있음)
+    """
+    if conn.closed:
+        return False
+
+    last_used = _last_used.get(id(conn))
+    if last_used is not None and time.monotonic() - last_used < DB_POOL_HEALTHCHECK_INTERVAL:
+        return True
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def _checkout(p: pool.ThreadedConnectionPool):
+    """
+    풀에서 연결을 꺼내고, 끊긴 연결이면 버리고 다시 연결
+    유휴 연결이 모두 끊겼을 수 있으므로 풀 크기만큼 재시도합니다.
+    """
+    for _ in range(p.maxconn):
+        conn = p.getconn()
+        if _is_healthy(conn):
+            return conn
+
+        print("Stale database connection detected, reconnecting...", file=sys.stderr)
+        _last_used.pop(id(conn), None)
+        p.putconn(conn, close=True)
+
+    # 유휴 연결을 모두 폐기했으므로 새 연결이 생성됨
+    return p.getconn()
+
+
+@contextmanager
+def get_connection(pooled: bool = True):
+    """
+    DB 연결 컨텍스트 매니저
+
+    pooled=True: 풀에서 연결을 빌려 쓰고 반납
+    pooled=False: 기존 방식처럼 매번 새로 연결하고 종료 (벤치마크 비교용)
+
+    사용 예:
+        with get_connection() as conn:
+            bm25_search(conn, "공무원 대출")
+    """
+    if not pooled:
+        with span("db.connect", pooled=False):
+            conn = psycopg2.connect(DATABASE_URL)
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+
+    p = get_pool()
+    slots = _pool_slots
+    # 풀이 모두 사용 중이면 반납될 때까지 대기하므로 대기 시간도 db.connect span에 포함
+    with span("db.connect", pooled=True):
+        slots.acquire()
+        try:
+            conn = _checkout(p)
+        except Exception:
+            slots.release()
+            raise
+
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # 사용 중 연결이 끊기면 풀에 되돌리지 않고 폐기
+        broken = True
+        raise
+    finally:
+        if not broken and not conn.closed:
+            # 열린 트랜잭션을 정리한 뒤 반납
+            try:
+                conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+
+        if broken or conn.closed:
+            _last_used.pop(id(conn), None)
+            p.putconn(conn, close=True)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+            p.putconn(conn)
+        slots.release()
+
+
+atexit.register(close_pool)
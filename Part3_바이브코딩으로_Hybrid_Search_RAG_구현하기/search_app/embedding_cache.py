@@ -0,0 +1,192 @@
+"""
+쿼리 임베딩 캐시
+"공무원 대출"처럼 반복되는 질문의 임베딩을 재사용하여 OpenAI API 지연시간과 비용을 줄입니다.
+
+- 1단계: 프로세스 내 LRU 캐시 (TTL 적용)
+- 2단계: SQLite 파일 캐시 (선택, 프로세스 재시작 후에도 유지)
+"""
+import os
+import re
+import time
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+def normalize_query(text: str) -> str:
+    """
+    캐시 키용 쿼리 정규화
+    유니코드 정규화(NFKC), 소문자 변환, 공백 정리, 끝의 문장부호 제거
+    예: "  공무원   대출? " → "공무원 대출"
+    """
+    if not text:
+        return ""
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    return normalized.rstrip('?!.~ ')
+
+
+class SQLiteEmbeddingStore:
+    """SQLite 기반 영구 임베딩 저장소 (float64 배열을 BLOB으로 저장)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                cache_key TEXT PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[list]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT embedding FROM query_embeddings WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return array('d', row[0]).tolist()
+
+    def set(self, key: str, embedding: list):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (cache_key, embedding, created_at) VALUES (?, ?, ?)",
+                (key, array('d', embedding).tobytes(), time.time())
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM query_embeddings")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingCache:
+    """
+    2단계 임베딩 캐시
+    키는 (모델명, 정규화된 쿼리)이며, 모델이 바뀌면 캐시도 분리됩니다.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 86400,
+        store: Optional[SQLiteEmbeddingStore] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (embedding, expires_at)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingCache":
+        """
+        환경변수로 캐시 생성
+        - EMBEDDING_CACHE_SIZE: LRU 최대 항목 수 (0이면 메모리 캐시 비활성화, 기본값 1024)
+        - EMBEDDING_CACHE_TTL: 메모리 캐시 TTL 초 (기본값 86400)
+        - EMBEDDING_CACHE_PATH: SQLite 파일 경로 (지정하면 영구 캐시 활성화)
+        """
+        path = os.getenv("EMBEDDING_CACHE_PATH")
+        return cls(
+            max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+            store=SQLiteEmbeddingStore(path) if path else None
+        )
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        return f"{model}:{normalize_query(text)}"
+
+    def get(self, text: str, model: str) -> Optional[list]:
+        """캐시 조회 (메모리 → SQLite 순서), 없으면 None"""
+        key = self.make_key(text, model)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                embedding, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return embedding
+                del self._entries[key]
+
+        if self.store is not None:
+            embedding = self.store.get(key)
+            if embedding is not None:
+                self._remember(key, embedding)
+                with self._lock:
+                    self.disk_hits += 1
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, text: str, model: str, embedding: list):
+        """두 단계 모두에 저장"""
+        key = self.make_key(text, model)
+        self._remember(key, embedding)
+        if self.store is not None:
+            self.store.set(key, embedding)
+
+    def get_or_create(self, text: str, model: str, create: Callable[[str], list]) -> list:
+        """캐시에 있으면 반환하고, 없으면 create(text)로 생성 후 저장"""
+        embedding = self.get(text, model)
+        if embedding is None:
+            embedding = create(text)
+            self.set(text, model, embedding)
+        return embedding
+
+    def _remember(self, key: str, embedding: list):
+        """메모리 LRU에 저장하고 초과분은 가장 오래 안 쓴 항목부터 제거"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (embedding, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """캐시 항목과 통계 초기화"""
+        with self._lock:
+            self._entries.clear()
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> dict:
+        """히트/미스 통계"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': hits / total if total else 0.0,
+                'size': len(self._entries),
+            }
@@ -0,0 +1,15 @@
+"""
+상품 긴 필드 상수
+청크 색인(chunking.py)과 검색/답변 생성(hybrid_search.py, langgraph_rag.py)이 함께 사용합니다.
+검색 경로에서 chunking → load_data(OpenAI 클라이언트 생성)를 임포트하지 않도록 따로 둡니다.
+"""
+
+# 청크로 색인할 상품 필드
+CHUNK_FIELDS = ('product_description', 'important_notices', 'required_documents')
+
+# 필드 이름 → 프롬프트/출력용 한글 이름
+FIELD_LABELS = {
+    'product_description': '상품 설명',
+    'important_notices': '유의사항',
+    'required_documents': '필요 서류',
+}
@@ -0,0 +1,189 @@
+"""
+검색 결과 결합(fusion) 전략
+BM25 결과와 벡터 결과를 하나의 순위로 합칩니다. hybrid_search(fusion=..., fusion_params=...)로 호출마다 선택할 수 있습니다.
+
+- rrf: 기존 RRF (score = Σ 1/(k + rank))
+- weighted_rrf: 레그별 가중치를 준 RRF (score = w_bm25/(k + rank_bm25) + w_vector/(k + rank_vector))
+- minmax: 레그별 점수를 min-max 정규화한 뒤 가중합
+- zscore: 레그별 점수를 z-score 정규화한 뒤 가중합
+- convex: alpha * (BM25 / 최대 BM25) + (1 - alpha) * 코사인 유사도 (정규화 범위가 후보 구성에 덜 흔들림)
+
+모든 전략은 reciprocal_rank_fusion()과 같은 [(product_id, score), ...] 형식을 점수 내림차순으로 반환하며,
+동점이면 BM25 결과에 먼저 등장한 순서, 그다음 벡터 결과 순서를 유지합니다.
+
+순위 기반 전략(RANK_FUSIONS)은 rank_fusion_is_final()로 후보를 더 가져와도 상위 순서가 바뀌지 않는지 판단할 수 있어,
+hybrid_search의 적응형 후보 수가 이를 조기 종료 조건으로 사용합니다.
+"""
+import math
+from typing import Callable, Dict, List, Tuple
+
+Results = List[Tuple[str, float]]
+
+
+def _sorted(scores: Dict[str, float]) -> Results:
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def weighted_rrf(
+    bm25_results: Results,
+    vector_results: Results,
+    k: int = 60,
+    bm25_weight: float = 1.0,
+    vector_weight: float = 1.0
+) -> Results:
+    """가중 RRF (가중치가 모두 1이면 reciprocal_rank_fusion()과 같은 결과)"""
+    scores = {}
+    for rank, (product_id, _) in enumerate(bm25_results, start=1):
+        scores[product_id] = scores.get(product_id, 0) + bm25_weight / (k + rank)
+    for rank, (product_id, _) in enumerate(vector_results, start=1):
+        scores[product_id] = scores.get(product_id, 0) + vector_weight / (k + rank)
+    return _sorted(scores)
+
+
+def rank_fusion_is_final(
+    fused: Results,
+    bm25_results: Results,
+    vector_results: Results,
+    limit: int,
+    bm25_exhausted: bool = False,
+    vector_exhausted: bool = False,
+    k: int = 60,
+    bm25_weight: float = 1.0,
+    vector_weight: float = 1.0
+) -> bool:
+    """
+    (가중) RRF 상위 limit개가 확정되었는지 판단
+    아직 끝나지 않은 레그에서 앞으로 나올 문서의 순위는 현재 후보 수 + 1 이상이므로,
+    어떤 문서든 그 레그에서 얻을 수 있는 점수는 최대 weight / (k + 후보 수 + 1)입니다.
+    상위 limit개 각각의 현재 점수가 그 아래 문서들과 아직 나오지 않은 문서의 최대 가능 점수보다 크면
+    더 깊이 조회해도 상위 limit개의 순서는 바뀌지 않습니다.
+    """
+    if bm25_exhausted and vector_exhausted:
+        return True
+    if len(fused) < limit:
+        return False
+
+    bm25_ids = {product_id for product_id, _ in bm25_results}
+    vector_ids = {product_id for product_id, _ in vector_results}
+    bm25_gain = 0.0 if bm25_exhausted else bm25_weight / (k + len(bm25_results) + 1)
+    vector_gain = 0.0 if vector_exhausted else vector_weight / (k + len(vector_results) + 1)
+
+    def upper_bound(product_id: str, score: float) -> float:
+        return (
+            score
+            + (bm25_gain if product_id not in bm25_ids else 0.0)
+            + (vector_gain if product_id not in vector_ids else 0.0)
+        )
+
+    # 뒤에서부터 "i번째 이후 문서가 얻을 수 있는 최대 점수"를 누적
+    best_below = bm25_gain + vector_gain
+    for i in range(len(fused) - 1, limit - 1, -1):
+        best_below = max(best_below, upper_bound(*fused[i]))
+    for i in range(limit - 1, -1, -1):
+        # 동점이면 삽입 순서로 순위가 정해지므로 확정으로 보지 않음
+        if fused[i][1] <= best_below:
+            return False
+        best_below = max(best_below, upper_bound(*fused[i]))
+    return True
+
+
+def minmax_normalize(results: Results) -> Dict[str, float]:
+    """후보 안에서 최솟값 0, 최댓값 1로 정규화 (모두 같은 점수면 1)"""
+    if not results:
+        return {}
+    values = [score for _, score in results]
+    low, high = min(values), max(values)
+    if high == low:
+        return {product_id: 1.0 for product_id, _ in results}
+    return {product_id: (score - low) / (high - low) for product_id, score in results}
+
+
+def zscore_normalize(results: Results) -> Dict[str, float]:
+    """후보 안에서 평균 0, 표준편차 1로 정규화 (표준편차가 0이면 모두 0)"""
+    if not results:
+        return {}
+    values = [score for _, score in results]
+    mean = sum(values) / len(values)
+    std = math.sqrt(sum((value - mean) ** 2 for value in values) / len(values))
+    if std == 0:
+        return {product_id: 0.0 for product_id, _ in results}
+    return {product_id: (score - mean) / std for product_id, score in results}
+
+
+def _linear(
+    bm25_scores: Dict[str, float],
+    vector_scores: Dict[str, float],
+    bm25_weight: float,
+    vector_weight: float,
+    missing_bm25: float,
+    missing_vector: float
+) -> Results:
+    """정규화된 점수의 가중합 (한쪽 레그에 없는 문서는 missing 값 사용)"""
+    scores = {}
+    for product_id in list(bm25_scores) + [pid for pid in vector_scores if pid not in bm25_scores]:
+        scores[product_id] = (
+            bm25_weight * bm25_scores.get(product_id, missing_bm25)
+            + vector_weight * vector_scores.get(product_id, missing_vector)
+        )
+    return _sorted(scores)
+
+
+def minmax_fusion(
+    bm25_results: Results,
+    vector_results: Results,
+    bm25_weight: float = 0.5,
+    vector_weight: float = 0.5
+) -> Results:
+    """min-max 정규화 가중합 (한쪽 레그에 없으면 그 레그 점수 0)"""
+    return _linear(minmax_normalize(bm25_results), minmax_normalize(vector_results), bm25_weight, vector_weight, 0.0, 0.0)
+
+
+def zscore_fusion(
+    bm25_results: Results,
+    vector_results: Results,
+    bm25_weight: float = 0.5,
+    vector_weight: float = 0.5
+) -> Results:
+    """z-score 정규화 가중합 (한쪽 레그에 없으면 그 레그의 최저 z-score 사용)"""
+    bm25_scores = zscore_normalize(bm25_results)
+    vector_scores = zscore_normalize(vector_results)
+    return _linear(
+        bm25_scores, vector_scores, bm25_weight, vector_weight,
+        min(bm25_scores.values(), default=0.0), min(vector_scores.values(), default=0.0)
+    )
+
+
+def convex_fusion(bm25_results: Results, vector_results: Results, alpha: float = 0.5) -> Results:
+    """
+    볼록 결합: alpha * BM25/최대BM25 + (1 - alpha) * 코사인 유사도
+    BM25는 이론적 최솟값 0, 코사인은 이미 [-1, 1] 범위이므로 후보의 최솟값에 의존하지 않습니다.
+    """
+    if not 0.0 <= alpha <= 1.0:
+        raise ValueError(f"alpha must be between 0 and 1: {alpha}")
+    top = max((score for _, score in bm25_results), default=0.0)
+    bm25_scores = {product_id: score / top if top > 0 else 0.0 for product_id, score in bm25_results}
+    vector_scores = dict(vector_results)
+    return _linear(bm25_scores, vector_scores, alpha, 1.0 - alpha, 0.0, 0.0)
+
+
+FUSION_METHODS: Dict[str, Callable[..., Results]] = {
+    "rrf": weighted_rrf,
+    "weighted_rrf": weighted_rrf,
+    "minmax": minmax_fusion,
+    "zscore": zscore_fusion,
+    "convex": convex_fusion,
+}
+
+
+# 순위만 사용하는 전략 (rank_fusion_is_final() 적용 가능)
+RANK_FUSIONS = ("rrf", "weighted_rrf")
+
+
+def fuse(bm25_results: Results, vector_results: Results, method: str = "rrf", **params) -> Results:
+    """
+    이름으로 결합 전략 선택
+    예: fuse(bm25, vector, "weighted_rrf", bm25_weight=2.0), fuse(bm25, vector, "convex", alpha=0.3)
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {method} (choose from {tuple(FUSION_METHODS)})")
+    return FUSION_METHODS[method](bm25_results, vector_results, **params)
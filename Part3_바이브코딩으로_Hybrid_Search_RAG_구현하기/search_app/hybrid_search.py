@@ -4,10 +4,24 @@ BM25 키워드 검색과 벡터 유사도 검색을 RRF로 결합합니다.
 """
 import os
 import re
+import sys
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple
-import psycopg2
 from openai import OpenAI
 from dotenv import load_dotenv
+from db_pool import get_connection
+from embedding_cache import EmbeddingCache
+from result_cache import SearchResultCache
+from schema import (
+    get_catalog_version, quantized_expression, is_quantized, QUANTIZATION_OPS, VECTOR_QUANTIZATIONS, EMBEDDING_DIMENSIONS
+)
+from fusion import FUSION_METHODS, RANK_FUSIONS, fuse, rank_fusion_is_final
+from search_filters import filter_sql, normalize_filters, parse_filter_args, allowed_ids as filtered_ids
+from rerank import RERANKERS, RERANK_CANDIDATES, rerank as rerank_products
+from tracing import span
+from fields import FIELD_LABELS
 
 # 환경변수 로드
 load_dotenv()
@@ -15,9 +29,93 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# 동시 실행 모드 기본값 (BM25 레그와 임베딩+벡터 레그를 병렬 실행)
+HYBRID_SEARCH_CONCURRENT = os.getenv("HYBRID_SEARCH_CONCURRENT", "false").lower() == "true"
+HYBRID_SEARCH_WORKERS = int(os.getenv("HYBRID_SEARCH_WORKERS", "8"))
+
+# 검색 엔진 기본값
+# - "python": BM25/벡터 후보를 각각 조회한 뒤 Python에서 RRF 결합 후 상세 조회 (3회 왕복)
+# - "sql": 두 랭킹 CTE, RRF 결합, 상세 조인을 SQL 한 문장으로 실행 (1회 왕복)
+HYBRID_SEARCH_ENGINE = os.getenv("HYBRID_SEARCH_ENGINE", "python")
+SEARCH_ENGINES = ("python", "sql")
+
+# 벡터 레그 백엔드 기본값 (python 엔진에서만 사용)
+# - "pgvector": DB에서 코사인 거리 검색
+# - "memory": 프로세스 내 NumPy 행렬로 검색 (vector_index.py, DB 왕복 없음)
+HYBRID_SEARCH_VECTOR_BACKEND = os.getenv("HYBRID_SEARCH_VECTOR_BACKEND", "pgvector")
+VECTOR_BACKENDS = ("pgvector", "memory")
+
+# 키워드(BM25) 레그 백엔드 기본값 (python 엔진에서만 사용)
+# - "pg_search": ParadeDB BM25 인덱스
+# - "local": 프로세스 내 n-gram 역색인 BM25 (bm25_index.py, DB 왕복 없음)
+HYBRID_SEARCH_KEYWORD_BACKEND = os.getenv("HYBRID_SEARCH_KEYWORD_BACKEND", "pg_search")
+KEYWORD_BACKENDS = ("pg_search", "local")
+
+# 벡터 양자화 기본값 (pgvector 백엔드 전용, schema.py 참고)
+# 양자화/축소 차원 인덱스로 후보를 limit * VECTOR_RESCORE_FACTOR개 뽑고 원본 float 벡터로 재점수화합니다.
+HYBRID_SEARCH_VECTOR_QUANTIZATION = os.getenv("HYBRID_SEARCH_VECTOR_QUANTIZATION", "none")
+HYBRID_SEARCH_VECTOR_DIMENSIONS = int(os.getenv("HYBRID_SEARCH_VECTOR_DIMENSIONS", str(EMBEDDING_DIMENSIONS)))
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+# pgvector의 hnsw.ef_search 상한 (재점수화 후보 수가 이보다 많으면 후보가 이 수로 잘림)
+HNSW_MAX_EF_SEARCH = 1000
+
+# 결과 결합 전략 기본값 (fusion.py 참고, sql 엔진은 rrf만 지원)
+HYBRID_SEARCH_FUSION = os.getenv("HYBRID_SEARCH_FUSION", "rrf")
+
+# 레그별 후보 수 (적응형 모드에서는 최대값)
+HYBRID_SEARCH_DEPTH = int(os.getenv("HYBRID_SEARCH_DEPTH", "20"))
+# 적응형 후보 수: limit에 맞춰 작게 시작하고, 결합 상위 limit개가 확정되면 중단 (python 엔진 전용)
+HYBRID_SEARCH_ADAPTIVE_DEPTH = os.getenv("HYBRID_SEARCH_ADAPTIVE_DEPTH", "false").lower() == "true"
+ADAPTIVE_MIN_DEPTH = 5
+ADAPTIVE_DEPTH_FACTOR = 2  # 첫 라운드 후보 수 = max(ADAPTIVE_MIN_DEPTH, limit * ADAPTIVE_DEPTH_FACTOR)
+
+# 재정렬 기본값 (rerank.py 참고)
+# - "none": 결합 순서 그대로 사용
+# - "cross_encoder" / "llm": 결합 상위 RERANK_CANDIDATES개를 다시 점수화
+HYBRID_SEARCH_RERANK = os.getenv("HYBRID_SEARCH_RERANK", "none")
+RERANK_METHODS = ("none",) + tuple(RERANKERS)
+
+# 검색 단위 기본값
+# - "product": 상품의 searchable_text로 검색
+# - "chunk": 긴 필드 청크(loan_product_chunks)로 검색한 뒤 상품 단위로 묶음 (python 엔진, pg 백엔드 전용)
+HYBRID_SEARCH_GRANULARITY = os.getenv("HYBRID_SEARCH_GRANULARITY", "product")
+GRANULARITIES = ("product", "chunk")
+# 상품 하나에 청크가 여러 개 걸리므로 청크 모드의 레그별 후보 수 = depth * CHUNK_DEPTH_FACTOR
+CHUNK_DEPTH_FACTOR = 3
+# 청크 모드에서 상품마다 결과에 붙이는 일치 구간 수
+CHUNK_PASSAGES_PER_PRODUCT = int(os.getenv("CHUNK_PASSAGES_PER_PRODUCT", "2"))
+
+# 검색 결과로 반환하는 상품 컬럼
+PRODUCT_COLUMNS = [
+    'id', 'product_code', 'product_name', 'product_summary',
+    'target_description', 'loan_limit_description'
+]
+
+# 임베딩 모델 (API 호출과 캐시 키에 함께 사용)
+EMBEDDING_MODEL = "text-embedding-3-small"
+
 # OpenAI 클라이언트 초기화
 client = OpenAI(api_key=OPENAI_API_KEY)
 
+# 쿼리 임베딩 캐시 (메모리 LRU + 선택적 SQLite)
+embedding_cache = EmbeddingCache.from_env()
+
+
+def _catalog_version() -> int:
+    with get_connection() as conn:
+        return get_catalog_version(conn)
+
+
+# 검색 결과 캐시 (카탈로그 버전이 바뀌면 무효화)
+result_cache = SearchResultCache.from_env(version_source=_catalog_version)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 쿼리별 후보 수 통계 (depth_stats()로 조회)
+_depth_stats = {'queries': 0, 'total_depth': 0, 'rounds': 0, 'early_stops': 0, 'last_depth': 0}
+_depth_stats_lock = threading.Lock()
+
 
 def clean_text(text: str) -> str:
     """특수문자를 제거하여 BM25 검색용 텍스트 생성"""
@@ -28,93 +126,282 @@ def clean_text(text: str) -> str:
     return cleaned.strip()
 
 
-def get_embedding(text: str) -> list:
+def get_embedding(text: str, use_cache: bool = True) -> list:
+    """
+    쿼리 임베딩 반환
+    반복되는 질문은 embedding_cache에서 꺼내고, 없을 때만 OpenAI API를 호출합니다.
+    """
+    with span("embedding") as attributes:
+        if not use_cache:
+            attributes['cache_hit'] = False
+            return _create_embedding(text)
+
+        created = False
+
+        def create(text: str) -> list:
+            nonlocal created
+            created = True
+            return _create_embedding(text)
+
+        embedding = embedding_cache.get_or_create(text, EMBEDDING_MODEL, create)
+        # 조회가 끝난 뒤에 기록 (API를 호출했으면 캐시 미스)
+        attributes['cache_hit'] = not created
+        return embedding
+
+
+def _create_embedding(text: str) -> list:
     """OpenAI API를 사용하여 텍스트 임베딩 생성"""
     response = client.embeddings.create(
-        model="text-embedding-3-small",
+        model=EMBEDDING_MODEL,
         input=text
     )
     return response.data[0].embedding
 
 
-def bm25_search(conn, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+def bm25_search(
+    conn,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    filters: dict = None
+) -> List[Tuple[str, float]]:
     """
     BM25 키워드 검색
-    pg_search의 BM25 인덱스 사용
+    pg_search의 BM25 인덱스 사용 (인덱스는 schema.py 마이그레이션으로 미리 생성)
+    offset을 주면 그 순위 이후부터 조회합니다 (적응형 후보 수에서 다음 구간만 가져올 때 사용).
+    filters는 WHERE 절에 추가되는 구조화 필드 조건입니다 (search_filters.py 참고).
     Returns: [(product_id, score), ...]
     """
     cursor = conn.cursor()
-
-    # BM25 인덱스가 없으면 생성
-    # ngram 토크나이저 사용: 한글 검색을 위해 필수
-    try:
-        cursor.execute("""
-            SELECT indexname FROM pg_indexes
-            WHERE tablename = 'loan_products' AND indexname = 'idx_loan_products_bm25'
-        """)
-        if cursor.fetchone() is None:
-            print("Creating BM25 index with ngram tokenizer...")
-            cursor.execute("""
-                CREATE INDEX idx_loan_products_bm25
-                ON loan_products
-                USING bm25(id, cleaned_searchable_text)
-                WITH (key_field='id', text_fields='{"cleaned_searchable_text": {"tokenizer": {"type": "ngram", "min_gram": 2, "max_gram": 3, "prefix_only": false}}}');
-            """)
-            conn.commit()
-            print("BM25 index created successfully with ngram tokenizer")
-    except Exception as e:
-        print(f"Index check/creation note: {e}")
-        conn.rollback()
+    filter_clause, filter_params = filter_sql(filters)
 
     # cleaned_searchable_text에 대한 BM25 검색
     # pg_search는 검색어를 그대로 전달
-    search_query = """
+    # 동점은 id 순서 (로컬 BM25 인덱스, HYBRID_SQL과 같은 순서가 되도록)
+    search_query = f"""
     SELECT
         id,
         paradedb.score(id) as bm25_score
     FROM loan_products
-    WHERE cleaned_searchable_text @@@ %s
-    ORDER BY bm25_score DESC
-    LIMIT %s
+    WHERE cleaned_searchable_text @@@ %s{filter_clause}
+    ORDER BY bm25_score DESC, id
+    LIMIT %s OFFSET %s
     """
 
     cleaned_query = clean_text(query)
-    cursor.execute(search_query, (cleaned_query, limit))
+    cursor.execute(search_query, (cleaned_query, *filter_params, limit, offset))
     results = cursor.fetchall()
     cursor.close()
 
     return [(row[0], float(row[1])) for row in results]
 
 
-def vector_search(conn, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+def vector_search(
+    conn,
+    query: str,
+    limit: int = 20,
+    query_embedding: list = None,
+    offset: int = 0,
+    filters: dict = None,
+    quantization: str = "none",
+    dimensions: int = EMBEDDING_DIMENSIONS
+) -> List[Tuple[str, float]]:
     """
     벡터 유사도 검색
     코사인 유사도 사용 (1 - cosine_distance)
+    query_embedding을 주면 임베딩 API 호출을 생략합니다.
+    offset을 주면 그 순위 이후부터 조회합니다.
+    filters는 WHERE 절에 추가되는 구조화 필드 조건입니다 (search_filters.py 참고).
+    quantization/dimensions를 주면 해당 식 인덱스(schema.migrate_quantized_index)로
+    (offset + limit) * VECTOR_RESCORE_FACTOR개 후보를 뽑은 뒤 원본 float 벡터로 재점수화합니다.
     Returns: [(product_id, similarity), ...]
     """
-    cursor = conn.cursor()
+    filter_clause, filter_params = filter_sql(filters)
 
     # 쿼리 임베딩 생성
-    query_embedding = get_embedding(query)
+    if query_embedding is None:
+        query_embedding = get_embedding(query)
+
+    if is_quantized(quantization, dimensions):
+        return _quantized_vector_search(
+            conn, query_embedding, limit, offset, filter_clause, filter_params, quantization, dimensions
+        )
+
+    cursor = conn.cursor()
 
     # 벡터 검색 (코사인 유사도)
-    search_query = """
+    search_query = f"""
     SELECT
         id,
         1 - (searchable_text_embedding <=> %s::vector) as similarity
     FROM loan_products
-    WHERE searchable_text_embedding IS NOT NULL
+    WHERE searchable_text_embedding IS NOT NULL{filter_clause}
     ORDER BY searchable_text_embedding <=> %s::vector
-    LIMIT %s
+    LIMIT %s OFFSET %s
+    """
+
+    cursor.execute(search_query, (query_embedding, *filter_params, query_embedding, limit, offset))
+    results = cursor.fetchall()
+    cursor.close()
+
+    return [(row[0], float(row[1])) for row in results]
+
+
+def _quantized_vector_search(
+    conn,
+    query_embedding: list,
+    limit: int,
+    offset: int,
+    filter_clause: str,
+    filter_params: list,
+    quantization: str,
+    dimensions: int
+) -> List[Tuple[str, float]]:
+    """
+    양자화 인덱스로 후보 조회 후 원본 벡터 코사인 유사도로 재정렬
+    HNSW 인덱스 스캔은 hnsw.ef_search개(기본값 40)까지만 반환하므로, 후보 수가 더 많으면 이 트랜잭션에서만
+    ef_search를 후보 수로 올립니다 (pgvector 상한 1000, 이미 더 크게 설정되어 있으면 그대로 사용).
     """
+    _, operator = QUANTIZATION_OPS[quantization]
+    column = quantized_expression("searchable_text_embedding", quantization, dimensions)
+    query_vector = quantized_expression("%s::vector", quantization, dimensions)
+    candidates = (offset + limit) * VECTOR_RESCORE_FACTOR
 
-    cursor.execute(search_query, (query_embedding, query_embedding, limit))
+    # 두 문장을 한 번의 왕복으로 실행 (set_config(..., true)는 SET LOCAL과 같이 트랜잭션이 끝나면 원래 값으로 복원)
+    search_query = f"""
+    SELECT set_config(
+        'hnsw.ef_search',
+        LEAST(GREATEST(current_setting('hnsw.ef_search', true)::int, %s), {HNSW_MAX_EF_SEARCH})::text,
+        true
+    );
+    SELECT
+        id,
+        1 - (searchable_text_embedding <=> %s::vector) as similarity
+    FROM (
+        SELECT id, searchable_text_embedding
+        FROM loan_products
+        WHERE searchable_text_embedding IS NOT NULL{filter_clause}
+        ORDER BY {column} {operator} {query_vector}
+        LIMIT %s
+    ) candidates
+    ORDER BY similarity DESC
+    LIMIT %s OFFSET %s
+    """
+
+    cursor = conn.cursor()
+    cursor.execute(search_query, (
+        candidates, query_embedding, *filter_params, query_embedding, candidates, limit, offset
+    ))
     results = cursor.fetchall()
     cursor.close()
 
     return [(row[0], float(row[1])) for row in results]
 
 
+def chunk_bm25_search(
+    conn,
+    query: str,
+    limit: int = 60,
+    offset: int = 0,
+    filters: dict = None
+) -> List[Tuple[str, float]]:
+    """
+    청크 BM25 검색 (loan_product_chunks.cleaned_content)
+    filters가 있으면 상품 테이블과 조인하여 구조화 필드 조건을 적용합니다.
+    Returns: [(chunk_id, score), ...]
+    """
+    cursor = conn.cursor()
+    filter_clause, filter_params = filter_sql(filters)
+    join = "JOIN loan_products ON loan_products.id = c.product_id" if filter_clause else ""
+
+    search_query = f"""
+    SELECT
+        c.id,
+        paradedb.score(c.id) as bm25_score
+    FROM loan_product_chunks c {join}
+    WHERE c.cleaned_content @@@ %s{filter_clause}
+    ORDER BY bm25_score DESC, c.id
+    LIMIT %s OFFSET %s
+    """
+
+    cursor.execute(search_query, (clean_text(query), *filter_params, limit, offset))
+    results = cursor.fetchall()
+    cursor.close()
+
+    return [(row[0], float(row[1])) for row in results]
+
+
+def chunk_vector_search(
+    conn,
+    query_embedding: list,
+    limit: int = 60,
+    offset: int = 0,
+    filters: dict = None
+) -> List[Tuple[str, float]]:
+    """
+    청크 벡터 검색 (코사인 유사도)
+    Returns: [(chunk_id, similarity), ...]
+    """
+    cursor = conn.cursor()
+    filter_clause, filter_params = filter_sql(filters)
+    join = "JOIN loan_products ON loan_products.id = c.product_id" if filter_clause else ""
+
+    search_query = f"""
+    SELECT
+        c.id,
+        1 - (c.embedding <=> %s::vector) as similarity
+    FROM loan_product_chunks c {join}
+    WHERE c.embedding IS NOT NULL{filter_clause}
+    ORDER BY c.embedding <=> %s::vector
+    LIMIT %s OFFSET %s
+    """
+
+    cursor.execute(search_query, (query_embedding, *filter_params, query_embedding, limit, offset))
+    results = cursor.fetchall()
+    cursor.close()
+
+    return [(row[0], float(row[1])) for row in results]
+
+
+def fetch_chunks(conn, chunk_ids: List[str]) -> Dict[str, Tuple[str, str, str]]:
+    """청크 내용 조회 → {chunk_id: (product_id, field, content)}"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, product_id, field, content
+        FROM loan_product_chunks
+        WHERE id = ANY(%s)
+    """, (chunk_ids,))
+    chunks = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+    cursor.close()
+    return chunks
+
+
+def collapse_chunks(
+    fused: List[Tuple[str, float]],
+    chunks: Dict[str, Tuple[str, str, str]],
+    passages_per_product: int = None
+) -> Tuple[List[Tuple[str, float]], Dict[str, List[Dict]]]:
+    """
+    청크 단위 결합 결과를 상품 단위로 묶기
+    상품 점수는 가장 높은 청크의 점수이고, 상품마다 상위 passages_per_product개 구간을 남깁니다.
+    Returns: ([(product_id, score), ...], {product_id: [{'field', 'content', 'score'}, ...]})
+    """
+    if passages_per_product is None:
+        passages_per_product = CHUNK_PASSAGES_PER_PRODUCT
+
+    product_results, passages = [], {}
+    for chunk_id, score in fused:
+        if chunk_id not in chunks:
+            continue
+        product_id, field, content = chunks[chunk_id]
+        if product_id not in passages:
+            product_results.append((product_id, score))
+            passages[product_id] = []
+        if len(passages[product_id]) < passages_per_product:
+            passages[product_id].append({'field': field, 'content': content, 'score': score})
+    return product_results, passages
+
+
 def reciprocal_rank_fusion(
     bm25_results: List[Tuple[str, float]],
     vector_results: List[Tuple[str, float]],
@@ -151,55 +438,483 @@ def reciprocal_rank_fusion(
     return sorted_results
 
 
-def hybrid_search(query: str, limit: int = 10) -> List[Dict]:
+def _get_executor() -> ThreadPoolExecutor:
+    """동시 실행 모드용 스레드 풀 (최초 호출 시 생성)"""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=HYBRID_SEARCH_WORKERS,
+                    thread_name_prefix="hybrid-search"
+                )
+    return _executor
+
+
+def local_bm25_search(
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    allowed_ids: set = None,
+    conn=None
+) -> List[Tuple[str, float]]:
+    """
+    프로세스 내 BM25 검색 (bm25_search()와 같은 형식)
+    인덱스는 최초 호출 시 로드되고, 카탈로그 버전이 바뀌면 다시 로드됩니다.
+    allowed_ids를 주면 그 상품만 후보로 사용합니다 (검색 필터).
+    conn을 주면 인덱스 로드/갱신에 그 연결을 사용합니다 (연결을 쥔 채 풀에서 하나 더 빌리지 않도록).
+    """
+    # NumPy는 로컬 백엔드에서만 필요하므로 사용할 때 임포트
+    from bm25_index import get_bm25_index
+    return get_bm25_index(conn).search(clean_text(query), offset + limit, allowed_ids=allowed_ids)[offset:]
+
+
+def memory_vector_search(
+    query_embedding: list,
+    limit: int = 20,
+    offset: int = 0,
+    allowed_ids: set = None,
+    conn=None
+) -> List[Tuple[str, float]]:
+    """
+    프로세스 내 벡터 인덱스 검색 (vector_search()와 같은 형식)
+    인덱스는 최초 호출 시 로드되고, 카탈로그 버전이 바뀌면 다시 로드됩니다.
+    allowed_ids를 주면 그 상품만 후보로 사용합니다 (검색 필터).
+    conn을 주면 인덱스 로드/갱신에 그 연결을 사용합니다 (연결을 쥔 채 풀에서 하나 더 빌리지 않도록).
+    """
+    # NumPy는 메모리 백엔드에서만 필요하므로 사용할 때 임포트
+    from vector_index import get_vector_index
+    return get_vector_index(conn).search(query_embedding, offset + limit, allowed_ids=allowed_ids)[offset:]
+
+
+def _bm25_slice(conn, query: str, offset: int, count: int, options: dict) -> List[Tuple[str, float]]:
+    """BM25 레그의 [offset, offset + count) 순위 구간 조회"""
+    name = "bm25.local" if options['keyword_backend'] == "local" else "db.bm25"
+    with span(name, granularity=options['granularity']):
+        if options['granularity'] == "chunk":
+            return chunk_bm25_search(
+                conn, query, limit=count * CHUNK_DEPTH_FACTOR, offset=offset * CHUNK_DEPTH_FACTOR, filters=options['filters']
+            )
+        if options['keyword_backend'] == "local":
+            return local_bm25_search(query, limit=count, offset=offset, allowed_ids=options.get('allowed_ids'), conn=conn)
+        return bm25_search(conn, query, limit=count, offset=offset, filters=options['filters'])
+
+
+def _vector_slice(conn, query: str, query_embedding: list, offset: int, count: int, options: dict) -> List[Tuple[str, float]]:
+    """벡터 레그의 [offset, offset + count) 순위 구간 조회"""
+    name = "vector.memory" if options['vector_backend'] == "memory" else "db.vector"
+    with span(name, granularity=options['granularity']):
+        if options['granularity'] == "chunk":
+            return chunk_vector_search(
+                conn, query_embedding, limit=count * CHUNK_DEPTH_FACTOR, offset=offset * CHUNK_DEPTH_FACTOR, filters=options['filters']
+            )
+        if options['vector_backend'] == "memory":
+            return memory_vector_search(query_embedding, limit=count, offset=offset, allowed_ids=options.get('allowed_ids'), conn=conn)
+        return vector_search(
+            conn, query, limit=count, query_embedding=query_embedding, offset=offset, filters=options['filters'],
+            quantization=options['quantization'], dimensions=options['dimensions']
+        )
+
+
+def _bm25_leg(query: str, offset: int, count: int, use_pool: bool, options: dict) -> List[Tuple[str, float]]:
+    """BM25 레그: 별도 연결(또는 로컬 인덱스)에서 키워드 검색"""
+    if options['keyword_backend'] == "local":
+        return _bm25_slice(None, query, offset, count, options)
+    with get_connection(pooled=use_pool) as conn:
+        return _bm25_slice(conn, query, offset, count, options)
+
+
+def _vector_leg(
+    query: str,
+    offset: int,
+    count: int,
+    use_pool: bool,
+    options: dict,
+    query_embedding: list = None
+) -> List[Tuple[str, float]]:
+    """벡터 레그: 임베딩 생성 후 별도 연결(또는 메모리 인덱스)에서 벡터 검색"""
+    # 임베딩 API를 기다리는 동안 연결을 점유하지 않도록 먼저 생성
+    if query_embedding is None:
+        query_embedding = get_embedding(query)
+    if options['vector_backend'] == "memory":
+        return _vector_slice(None, query, query_embedding, offset, count, options)
+    with get_connection(pooled=use_pool) as conn:
+        return _vector_slice(conn, query, query_embedding, offset, count, options)
+
+
+def _extend(results: List[Tuple[str, float]], new_results: List[Tuple[str, float]]):
+    """다음 구간 결과를 이어 붙이기 (구간 경계에서 동점 순서가 바뀌어 중복된 문서는 제외)"""
+    seen = {product_id for product_id, _ in results}
+    results.extend(item for item in new_results if item[0] not in seen)
+
+
+def _collect_candidates(fetch, limit: int, options: dict) -> List[Tuple[str, float]]:
+    """
+    레그별 후보 조회 후 결합
+    fetch(offset, count)는 두 레그의 해당 순위 구간 (bm25, vector)를 반환합니다.
+
+    고정 모드: depth개를 한 번에 조회
+    적응형 모드: max(ADAPTIVE_MIN_DEPTH, limit * ADAPTIVE_DEPTH_FACTOR)개로 시작하여 두 배씩 늘리며,
+    다음 중 하나면 중단합니다.
+    - RRF 계열: 더 깊이 조회해도 상위 limit개의 순서가 바뀔 수 없음이 보장될 때 (rank_fusion_is_final)
+    - 점수 기반 결합: 상위 limit개가 직전 라운드와 같을 때
+    - 두 레그 모두 결과가 더 없거나 depth에 도달했을 때
+    """
+    depth = options['depth']
+    fusion, fusion_params = options['fusion'], options['fusion_params']
+
+    if not options['adaptive_depth']:
+        bm25_results, vector_results = fetch(0, depth)
+        print(f"  BM25: {len(bm25_results)} results, Vector: {len(vector_results)} results (depth {depth})", file=sys.stderr)
+        _record_depth(depth, rounds=1, early_stop=False)
+        return fuse(bm25_results, vector_results, fusion, **fusion_params)
+
+    bm25_results, vector_results = [], []
+    fetched, rounds, previous_top = 0, 0, None
+    step = min(depth, max(ADAPTIVE_MIN_DEPTH, limit * ADAPTIVE_DEPTH_FACTOR))
+    while True:
+        count = min(step, depth - fetched)
+        new_bm25, new_vector = fetch(fetched, count)
+        _extend(bm25_results, new_bm25)
+        _extend(vector_results, new_vector)
+        fetched += count
+        rounds += 1
+        fused = fuse(bm25_results, vector_results, fusion, **fusion_params)
+
+        bm25_exhausted = len(new_bm25) < count
+        vector_exhausted = len(new_vector) < count
+        if fetched >= depth or (bm25_exhausted and vector_exhausted):
+            early_stop = False
+            break
+        if fusion in RANK_FUSIONS:
+            early_stop = rank_fusion_is_final(
+                fused, bm25_results, vector_results, limit,
+                bm25_exhausted=bm25_exhausted, vector_exhausted=vector_exhausted, **fusion_params
+            )
+        else:
+            top = [product_id for product_id, _ in fused[:limit]]
+            early_stop = top == previous_top
+            previous_top = top
+        if early_stop:
+            break
+        step *= 2
+
+    print(
+        f"  BM25: {len(bm25_results)} results, Vector: {len(vector_results)} results "
+        f"(adaptive depth {fetched}/{depth}, {rounds} rounds{', early stop' if early_stop else ''})",
+        file=sys.stderr
+    )
+    _record_depth(fetched, rounds=rounds, early_stop=early_stop)
+    return fused
+
+
+def _record_depth(depth: int, rounds: int, early_stop: bool):
+    with _depth_stats_lock:
+        _depth_stats['queries'] += 1
+        _depth_stats['total_depth'] += depth
+        _depth_stats['rounds'] += rounds
+        _depth_stats['early_stops'] += int(early_stop)
+        _depth_stats['last_depth'] = depth
+
+
+def depth_stats() -> dict:
+    """레그별 후보 수 통계 (쿼리 수, 평균/마지막 후보 수, 평균 라운드, 조기 종료 횟수)"""
+    with _depth_stats_lock:
+        queries = _depth_stats['queries']
+        return {
+            'queries': queries,
+            'avg_depth': _depth_stats['total_depth'] / queries if queries else 0.0,
+            'last_depth': _depth_stats['last_depth'],
+            'avg_rounds': _depth_stats['rounds'] / queries if queries else 0.0,
+            'early_stops': _depth_stats['early_stops'],
+        }
+
+
+def hybrid_search(
+    query: str,
+    limit: int = 10,
+    use_pool: bool = True,
+    concurrent: bool = None,
+    engine: str = None,
+    vector_backend: str = None,
+    keyword_backend: str = None,
+    fusion: str = None,
+    fusion_params: dict = None,
+    depth: int = None,
+    adaptive_depth: bool = None,
+    use_cache: bool = None,
+    rerank: str = None,
+    filters: dict = None,
+    granularity: str = None,
+    quantization: str = None,
+    dimensions: int = None
+) -> List[Dict]:
     """
     하이브리드 검색 실행
     BM25와 벡터 검색을 RRF로 결합
+
+    use_pool=True이면 모듈 단위 커넥션 풀(db_pool)의 연결을 재사용하고,
+    False이면 기존처럼 매번 새로 연결합니다.
+
+    concurrent=True이면 BM25 레그와 임베딩+벡터 레그를 서로 다른 연결에서 동시에 실행하여
+    전체 지연시간이 두 레그의 합이 아니라 느린 쪽에 가까워집니다.
+    None이면 HYBRID_SEARCH_CONCURRENT 환경변수를 따릅니다.
+
+    engine="sql"이면 RRF 결합과 상세 조회까지 SQL 한 문장으로 처리합니다 (hybrid_search_sql 참고).
+    None이면 HYBRID_SEARCH_ENGINE 환경변수를 따릅니다.
+
+    vector_backend="memory"이면 벡터 레그를 DB 대신 프로세스 내 NumPy 인덱스로 계산합니다 (python 엔진 전용).
+    None이면 HYBRID_SEARCH_VECTOR_BACKEND 환경변수를 따릅니다.
+
+    keyword_backend="local"이면 BM25 레그를 pg_search 대신 프로세스 내 n-gram BM25 인덱스로 계산합니다 (python 엔진 전용).
+    None이면 HYBRID_SEARCH_KEYWORD_BACKEND 환경변수를 따릅니다.
+
+    fusion은 결합 전략 이름(rrf, weighted_rrf, minmax, zscore, convex)이고,
+    fusion_params는 전략별 파라미터입니다 (예: {"alpha": 0.3}, {"bm25_weight": 2.0}).
+    None이면 HYBRID_SEARCH_FUSION 환경변수를 따릅니다.
+
+    depth는 레그별 후보 수입니다 (None이면 HYBRID_SEARCH_DEPTH, 기본값 20).
+    adaptive_depth=True이면 limit에 맞춰 작게 조회하고 상위 limit개가 확정되면 멈춥니다 (python 엔진 전용).
+    None이면 HYBRID_SEARCH_ADAPTIVE_DEPTH 환경변수를 따릅니다. 사용한 후보 수는 depth_stats()로 확인합니다.
+
+    rerank="cross_encoder" 또는 "llm"이면 결합 상위 RERANK_CANDIDATES개를 한 번의 호출로 다시 점수화하여
+    상위 limit개를 고릅니다. RERANK_BUDGET_MS를 넘거나 실패하면 결합 순서를 사용합니다 (rerank.py 참고).
+    None이면 HYBRID_SEARCH_RERANK 환경변수를 따릅니다.
+
+    filters는 구조화 필드 필터입니다 (예: {"can_apply_mobile": True, "max_interest_rate_lte": 5.0}).
+    BM25/벡터 SQL의 WHERE 절에 들어가므로 필터에 맞는 상품만 후보가 됩니다 (search_filters.py 참고).
+
+    granularity="chunk"이면 상품 설명/유의사항/필요 서류 청크로 검색하고 청크 결과를 상품 단위로 묶습니다.
+    각 상품에는 일치한 구간이 passages([{'field', 'content', 'score'}, ...])로 붙습니다 (python 엔진, pg 백엔드 전용).
+    None이면 HYBRID_SEARCH_GRANULARITY 환경변수를 따릅니다.
+
+    quantization="halfvec" 또는 "binary", dimensions=512처럼 주면 pgvector 레그가 양자화/축소 차원 인덱스로
+    후보를 뽑은 뒤 원본 벡터로 재점수화합니다 (python 엔진 상품 검색 전용, schema.migrate_quantized_index 참고).
+    None이면 HYBRID_SEARCH_VECTOR_QUANTIZATION / HYBRID_SEARCH_VECTOR_DIMENSIONS 환경변수를 따릅니다.
+
+    use_cache=True이면 (정제된 쿼리, limit, 검색 옵션)이 같은 결과를 result_cache에서 반환하여
+    BM25/벡터 레그와 임베딩 호출을 모두 생략합니다. None이면 캐시가 켜져 있을 때(SEARCH_RESULT_CACHE_SIZE > 0) 사용합니다.
     """
-    conn = psycopg2.connect(DATABASE_URL)
+    if concurrent is None:
+        concurrent = HYBRID_SEARCH_CONCURRENT
+    if engine is None:
+        engine = HYBRID_SEARCH_ENGINE
+    options = {
+        'vector_backend': vector_backend or HYBRID_SEARCH_VECTOR_BACKEND,
+        'keyword_backend': keyword_backend or HYBRID_SEARCH_KEYWORD_BACKEND,
+        'fusion': fusion or HYBRID_SEARCH_FUSION,
+        'fusion_params': dict(fusion_params or {}),
+        'depth': depth or HYBRID_SEARCH_DEPTH,
+        'adaptive_depth': HYBRID_SEARCH_ADAPTIVE_DEPTH if adaptive_depth is None else adaptive_depth,
+        'rerank': rerank or HYBRID_SEARCH_RERANK,
+        'filters': normalize_filters(filters),
+        'granularity': granularity or HYBRID_SEARCH_GRANULARITY,
+        'quantization': quantization or HYBRID_SEARCH_VECTOR_QUANTIZATION,
+        'dimensions': dimensions or HYBRID_SEARCH_VECTOR_DIMENSIONS,
+    }
+    if engine not in SEARCH_ENGINES:
+        raise ValueError(f"Unknown search engine: {engine} (choose from {SEARCH_ENGINES})")
+    if options['vector_backend'] not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend: {options['vector_backend']} (choose from {VECTOR_BACKENDS})")
+    if options['keyword_backend'] not in KEYWORD_BACKENDS:
+        raise ValueError(f"Unknown keyword backend: {options['keyword_backend']} (choose from {KEYWORD_BACKENDS})")
+    if options['fusion'] not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {options['fusion']} (choose from {tuple(FUSION_METHODS)})")
+    if options['rerank'] not in RERANK_METHODS:
+        raise ValueError(f"Unknown reranker: {options['rerank']} (choose from {RERANK_METHODS})")
+    if options['granularity'] not in GRANULARITIES:
+        raise ValueError(f"Unknown search granularity: {options['granularity']} (choose from {GRANULARITIES})")
+    # 알 수 없는 양자화 이름이나 범위를 벗어난 차원은 여기서 ValueError
+    quantized_expression("searchable_text_embedding", options['quantization'], options['dimensions'])
+    quantized = is_quantized(options['quantization'], options['dimensions'])
+
+    if engine == "sql":
+        if (options['vector_backend'], options['keyword_backend']) != ("pgvector", "pg_search"):
+            raise ValueError("sql 엔진은 pgvector/pg_search 백엔드만 지원합니다.")
+        if options['fusion'] != "rrf" or set(options['fusion_params']) - {"k"}:
+            raise ValueError("sql 엔진은 rrf 결합(k 파라미터)만 지원합니다.")
+        if options['adaptive_depth']:
+            raise ValueError("sql 엔진은 적응형 후보 수를 지원하지 않습니다.")
+        if quantized:
+            raise ValueError("sql 엔진은 벡터 양자화를 지원하지 않습니다.")
+
+    if options['granularity'] == "chunk":
+        if engine != "python" or (options['vector_backend'], options['keyword_backend']) != ("pgvector", "pg_search"):
+            raise ValueError("청크 검색은 python 엔진과 pgvector/pg_search 백엔드만 지원합니다.")
+        if options['adaptive_depth']:
+            # 상위 limit개 청크가 확정되어도 상위 limit개 상품이 확정되지는 않음
+            raise ValueError("청크 검색은 적응형 후보 수를 지원하지 않습니다.")
+        if quantized:
+            raise ValueError("청크 검색은 벡터 양자화를 지원하지 않습니다.")
 
-    # BM25 검색
-    print("Running BM25 search...")
-    bm25_results = bm25_search(conn, query, limit=20)
-    print(f"  Found {len(bm25_results)} results")
+    if use_cache is None:
+        use_cache = result_cache.enabled
+    with span("search", engine=engine) as attributes:
+        if not use_cache:
+            return _search(query, limit, use_pool, concurrent, engine, options)[0]
+        return _cached_search(query, limit, use_pool, concurrent, engine, options, attributes)
 
-    # 벡터 검색
-    print("Running vector search...")
-    vector_results = vector_search(conn, query, limit=20)
-    print(f"  Found {len(vector_results)} results")
 
-    # RRF 결합
-    print("Combining with RRF...")
-    rrf_results = reciprocal_rank_fusion(bm25_results, vector_results)
+def _cached_search(
+    query: str,
+    limit: int,
+    use_pool: bool,
+    concurrent: bool,
+    engine: str,
+    options: dict,
+    attributes: dict
+) -> List[Dict]:
+    """result_cache를 거쳐 검색 (적중 여부는 search span의 result_cache_hit에 기록)"""
+    # 동시 실행 여부와 연결 방식은 결과에 영향이 없으므로 키에서 제외
+    key = result_cache.make_key(clean_text(query), limit, {
+        **options,
+        'engine': engine,
+        'fusion_params': sorted(options['fusion_params'].items()),
+        'filters': sorted(options['filters'].items()),
+    })
+    results = result_cache.get(key)
+    attributes['result_cache_hit'] = results is not None
+    if results is not None:
+        print("Result cache hit", file=sys.stderr)
+        return results
+
+    results, cacheable = _search(query, limit, use_pool, concurrent, engine, options)
+    if cacheable:
+        result_cache.set(key, results)
+    return results
+
+
+def _search(
+    query: str,
+    limit: int,
+    use_pool: bool,
+    concurrent: bool,
+    engine: str,
+    options: dict
+) -> Tuple[List[Dict], bool]:
+    """
+    검색 후 (선택) 재정렬
+    Returns: (상품 목록, 캐시 가능 여부) - 재정렬이 fallback된 결과는 다음 호출에서 다시 시도하도록 캐시하지 않음
+    """
+    if options['rerank'] == "none":
+        return _retrieve(query, limit, use_pool, concurrent, engine, options), True
 
-    # 상위 limit개 결과의 상세 정보 조회
+    candidates = _retrieve(query, max(limit, RERANK_CANDIDATES), use_pool, concurrent, engine, options)
+    print(f"Reranking {len(candidates)} candidates with {options['rerank']}...", file=sys.stderr)
+    with span("rerank", method=options['rerank']) as attributes:
+        # 재정렬기 생성(모델 로드)도 지연시간 한도와 fallback 안에서 실행되도록 이름으로 전달
+        results, reranked = rerank_products(query, candidates, options['rerank'], limit)
+        attributes['reranked'] = reranked
+    return results, reranked
+
+
+def _retrieve(query: str, limit: int, use_pool: bool, concurrent: bool, engine: str, options: dict) -> List[Dict]:
+    """검증된 옵션으로 엔진별 검색 실행"""
+    if engine == "sql":
+        # 임베딩 API를 기다리는 동안 연결을 점유하지 않도록 먼저 생성
+        query_embedding = get_embedding(query)
+        _record_depth(options['depth'], rounds=1, early_stop=False)
+        with get_connection(pooled=use_pool) as conn, span("db.hybrid_sql"):
+            return hybrid_search_sql(
+                conn, query, limit,
+                depth=options['depth'],
+                k=options['fusion_params'].get("k", 60),
+                query_embedding=query_embedding,
+                filters=options['filters']
+            )
+
+    # 로컬/메모리 인덱스에는 구조화 필드가 없으므로 필터를 통과하는 id 집합을 한 번 조회해 둠
+    if options['filters'] and (options['keyword_backend'] == "local" or options['vector_backend'] == "memory"):
+        with get_connection(pooled=use_pool) as conn:
+            options = {**options, 'allowed_ids': filtered_ids(conn, options['filters'])}
+
+    if concurrent:
+        return _hybrid_search_concurrent(query, limit, use_pool, options)
+
+    with get_connection(pooled=use_pool) as conn:
+        return _hybrid_search(conn, query, limit, options)
+
+
+def _hybrid_search(conn, query: str, limit: int, options: dict) -> List[Dict]:
+    """주어진 연결로 BM25 → 벡터 → 결합 → 상세 조회를 순차 수행"""
+    print("Running BM25 and vector search...", file=sys.stderr)
+    # 적응형 모드에서 라운드마다 다시 만들지 않도록 임베딩은 한 번만 생성
+    query_embedding = get_embedding(query)
+
+    def fetch(offset: int, count: int):
+        return (
+            _bm25_slice(conn, query, offset, count, options),
+            _vector_slice(conn, query, query_embedding, offset, count, options),
+        )
+
+    # 결합 (기본 RRF)
+    print(f"Combining with {options['fusion']}...", file=sys.stderr)
+    rrf_results = _collect_candidates(fetch, limit, options)
+
+    return _fetch_results(conn, rrf_results, limit, options)
+
+
+def _hybrid_search_concurrent(query: str, limit: int, use_pool: bool, options: dict) -> List[Dict]:
+    """BM25 레그와 벡터 레그를 스레드 풀에서 동시에 실행"""
+    executor = _get_executor()
+    query_embedding = None
+
+    def vector_leg(offset: int, count: int):
+        # 첫 라운드의 벡터 레그는 임베딩 생성까지 BM25 레그와 겹쳐서 실행하고, 이후 라운드는 재사용
+        nonlocal query_embedding
+        if query_embedding is None:
+            query_embedding = get_embedding(query)
+        return _vector_leg(query, offset, count, use_pool, options, query_embedding)
+
+    def fetch(offset: int, count: int):
+        # 스레드 풀은 컨텍스트를 넘기지 않으므로 레그마다 복사하여 현재 trace에 span을 기록
+        bm25_future = executor.submit(contextvars.copy_context().run, _bm25_leg, query, offset, count, use_pool, options)
+        vector_future = executor.submit(contextvars.copy_context().run, vector_leg, offset, count)
+        return bm25_future.result(), vector_future.result()
+
+    print("Running BM25 and vector search concurrently...", file=sys.stderr)
+    # 결합 (기본 RRF)
+    print(f"Combining with {options['fusion']}...", file=sys.stderr)
+    rrf_results = _collect_candidates(fetch, limit, options)
+
+    with get_connection(pooled=use_pool) as conn:
+        return _fetch_results(conn, rrf_results, limit, options)
+
+
+def _fetch_results(conn, rrf_results: List[Tuple[str, float]], limit: int, options: dict) -> List[Dict]:
+    """결합 결과의 상세 조회 (청크 모드에서는 상품 단위로 묶고 일치 구간을 붙임)"""
+    with span("db.fetch", granularity=options['granularity']):
+        if options['granularity'] != "chunk":
+            return fetch_products(conn, rrf_results, limit)
+
+        product_results, passages = collapse_chunks(rrf_results, fetch_chunks(conn, [chunk_id for chunk_id, _ in rrf_results]))
+        print(f"  Collapsed {len(rrf_results)} chunks into {len(product_results)} products", file=sys.stderr)
+        results = fetch_products(conn, product_results, limit)
+        for result in results:
+            result['passages'] = passages[result['id']]
+        return results
+
+
+def fetch_products(conn, rrf_results: List[Tuple[str, float]], limit: int) -> List[Dict]:
+    """
+    결합 결과 상위 limit개의 상세 정보 조회
+    Returns: 결합 순서대로 정렬된 상품 딕셔너리 목록 (rrf_score에 결합 점수 저장)
+    """
     top_ids = [product_id for product_id, _ in rrf_results[:limit]]
 
     cursor = conn.cursor()
-    detail_query = """
-    SELECT
-        id, product_code, product_name, product_summary,
-        target_description, loan_limit_description
+    detail_query = f"""
+    SELECT {', '.join(PRODUCT_COLUMNS)}
     FROM loan_products
     WHERE id = ANY(%s)
     """
     cursor.execute(detail_query, (top_ids,))
     products = cursor.fetchall()
     cursor.close()
-    conn.close()
 
     # 결과를 딕셔너리로 변환
-    product_dict = {
-        row[0]: {
-            'id': row[0],
-            'product_code': row[1],
-            'product_name': row[2],
-            'product_summary': row[3],
-            'target_description': row[4],
-            'loan_limit_description': row[5]
-        }
-        for row in products
-    }
+    product_dict = {row[0]: dict(zip(PRODUCT_COLUMNS, row)) for row in products}
 
     # RRF 순서대로 결과 반환
     results = []
@@ -212,6 +927,105 @@ def hybrid_search(query: str, limit: int = 10) -> List[Dict]:
     return results
 
 
+# BM25 랭킹, 벡터 랭킹, RRF 결합, 상세 조인을 한 번에 처리하는 SQL
+# ParadeDB 가이드 참조: https://docs.paradedb.com/documentation/guides/hybrid
+# Python 경로(bm25_search → vector_search → reciprocal_rank_fusion → fetch_products)와
+# 같은 결과가 나오도록 다음을 맞춥니다.
+# - 순위는 ROW_NUMBER (Python의 enumerate와 동일하게 동점도 서로 다른 순위, BM25 동점은 bm25_search()처럼 id 순서)
+# - 점수는 float8로 BM25 항 + 벡터 항 순서로 합산
+# - 동점일 때는 BM25 결과에 먼저 등장한 순서, 그다음 벡터 결과 순서 (Python 안정 정렬과 동일)
+# - {filters}에는 두 레그에 같은 구조화 필드 조건이 들어감 (search_filters.filter_sql)
+HYBRID_SQL = f"""
+WITH bm25_ranked AS (
+    SELECT id, ROW_NUMBER() OVER (ORDER BY bm25_score DESC, id) AS rank
+    FROM (
+        SELECT id, paradedb.score(id) AS bm25_score
+        FROM loan_products
+        WHERE cleaned_searchable_text @@@ %(bm25_query)s{{filters}}
+        ORDER BY bm25_score DESC, id
+        LIMIT %(depth)s
+    ) AS bm25_candidates
+),
+vector_ranked AS (
+    SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+    FROM (
+        SELECT id, searchable_text_embedding <=> %(embedding)s::vector AS distance
+        FROM loan_products
+        WHERE searchable_text_embedding IS NOT NULL{{filters}}
+        ORDER BY searchable_text_embedding <=> %(embedding)s::vector
+        LIMIT %(depth)s
+    ) AS vector_candidates
+),
+fused AS (
+    SELECT
+        COALESCE(b.id, v.id) AS id,
+        COALESCE(1.0::float8 / (%(k)s + b.rank), 0.0::float8)
+            + COALESCE(1.0::float8 / (%(k)s + v.rank), 0.0::float8) AS rrf_score,
+        b.rank AS bm25_rank,
+        v.rank AS vector_rank
+    FROM bm25_ranked b
+    FULL OUTER JOIN vector_ranked v ON b.id = v.id
+)
+SELECT {', '.join('p.' + column for column in PRODUCT_COLUMNS)}, f.rrf_score
+FROM fused f
+JOIN loan_products p ON p.id = f.id
+ORDER BY f.rrf_score DESC, f.bm25_rank IS NULL, f.bm25_rank, f.vector_rank
+LIMIT %(limit)s
+"""
+
+
+def hybrid_search_sql(
+    conn,
+    query: str,
+    limit: int = 10,
+    depth: int = 20,
+    k: int = 60,
+    query_embedding: list = None,
+    filters: dict = None
+) -> List[Dict]:
+    """
+    단일 SQL 하이브리드 검색
+    BM25/벡터 랭킹 CTE, RRF 결합, 상품 상세 조인을 한 번의 왕복으로 처리합니다.
+    depth: 각 레그의 후보 개수 (Python 경로의 limit=20과 동일)
+    filters: 두 랭킹 CTE의 WHERE 절에 추가되는 구조화 필드 조건
+    Returns: hybrid_search()와 동일한 형식의 상품 딕셔너리 목록
+    """
+    if query_embedding is None:
+        query_embedding = get_embedding(query)
+
+    filter_clause, filter_params = filter_sql(filters, named=True)
+    cursor = conn.cursor()
+    cursor.execute(HYBRID_SQL.format(filters=filter_clause), {
+        'bm25_query': clean_text(query),
+        'embedding': query_embedding,
+        'depth': depth,
+        'k': k,
+        'limit': limit,
+        **filter_params,
+    })
+    rows = cursor.fetchall()
+    cursor.close()
+
+    results = []
+    for row in rows:
+        result = dict(zip(PRODUCT_COLUMNS, row))
+        result['rrf_score'] = float(row[len(PRODUCT_COLUMNS)])
+        results.append(result)
+
+    return results
+
+
+def parse_fusion_params(values: List[str]) -> dict:
+    """CLI의 NAME=VALUE 목록을 결합 파라미터 딕셔너리로 변환 (k는 정수, 나머지는 실수)"""
+    params = {}
+    for value in values:
+        name, _, number = value.partition("=")
+        if not number:
+            raise ValueError(f"결합 파라미터는 NAME=VALUE 형식이어야 합니다: {value}")
+        params[name] = int(number) if name == "k" else float(number)
+    return params
+
+
 def print_results(results: List[Dict]):
     """검색 결과 출력"""
     print(f"\n{'='*80}")
@@ -222,21 +1036,69 @@ def print_results(results: List[Dict]):
         print(f"{i}. {result['product_name']}")
         print(f"   상품코드: {result['product_code']}")
         print(f"   RRF 점수: {result['rrf_score']:.4f}")
+        if 'rerank_score' in result:
+            print(f"   재정렬 점수: {result['rerank_score']:.4f}")
         print(f"   요약: {result['product_summary'][:100]}...")
         print(f"   대상: {result['target_description'][:100] if result['target_description'] else 'N/A'}...")
         print(f"   한도: {result['loan_limit_description'][:100] if result['loan_limit_description'] else 'N/A'}...")
+        for passage in result.get('passages', []):
+            print(f"   [{FIELD_LABELS.get(passage['field'], passage['field'])}] {passage['content'][:100]}...")
         print()
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    from schema import verify_search_indexes
+
+    parser = argparse.ArgumentParser(description="농협 대출 상품 하이브리드 검색")
+    parser.add_argument("query", type=str, help="검색어")
+    parser.add_argument("--limit", type=int, default=10, help="반환할 결과 개수")
+    parser.add_argument("--concurrent", action="store_true", help="BM25/벡터 레그 동시 실행")
+    parser.add_argument("--engine", choices=SEARCH_ENGINES, default=None, help="검색 엔진 (python: 3회 왕복, sql: 단일 SQL)")
+    parser.add_argument("--vector-backend", choices=VECTOR_BACKENDS, default=None, help="벡터 레그 백엔드 (memory: 프로세스 내 NumPy 인덱스)")
+    parser.add_argument("--keyword-backend", choices=KEYWORD_BACKENDS, default=None, help="BM25 레그 백엔드 (local: 프로세스 내 n-gram BM25)")
+    parser.add_argument("--fusion", choices=list(FUSION_METHODS), default=None, help="결과 결합 전략 (기본값: rrf)")
+    parser.add_argument("--fusion-param", action="append", default=[], metavar="NAME=VALUE", help="결합 파라미터 (예: alpha=0.3, bm25_weight=2)")
+    parser.add_argument("--depth", type=int, default=None, help="레그별 후보 수 (적응형 모드에서는 최대값, 기본값: 20)")
+    parser.add_argument("--adaptive-depth", action="store_true", help="상위 결과가 확정되면 후보 조회 중단")
+    parser.add_argument("--no-result-cache", action="store_true", help="검색 결과 캐시 사용 안 함")
+    parser.add_argument("--rerank", choices=RERANK_METHODS, default=None, help="결합 상위 후보 재정렬 (기본값: none)")
+    parser.add_argument("--filter", action="append", default=[], metavar="NAME=VALUE", help="구조화 필드 필터 (예: can_apply_mobile=true, max_interest_rate_lte=5)")
+    parser.add_argument("--granularity", choices=GRANULARITIES, default=None, help="검색 단위 (chunk: 긴 필드 청크로 검색, 기본값: product)")
+    parser.add_argument("--quantization", choices=VECTOR_QUANTIZATIONS, default=None, help="벡터 양자화 인덱스 사용 (halfvec, binary)")
+    parser.add_argument("--dimensions", type=int, default=None, help="벡터 검색에 사용할 앞쪽 차원 수 (기본값: 1536)")
+    args = parser.parse_args()
 
-    if len(sys.argv) < 2:
-        print("Usage: uv run python hybrid_search.py \"검색어\"")
-        sys.exit(1)
+    # 인덱스가 없으면 검색 전에 즉시 중단 (양자화 검색이면 식 인덱스도 확인)
+    verify_search_indexes(
+        quantization=args.quantization or HYBRID_SEARCH_VECTOR_QUANTIZATION,
+        dimensions=args.dimensions or HYBRID_SEARCH_VECTOR_DIMENSIONS
+    )
 
-    query = sys.argv[1]
-    print(f"검색어: {query}\n")
+    print(f"검색어: {args.query}\n")
 
-    results = hybrid_search(query)
+    results = hybrid_search(
+        args.query,
+        limit=args.limit,
+        concurrent=args.concurrent or None,
+        engine=args.engine,
+        vector_backend=args.vector_backend,
+        keyword_backend=args.keyword_backend,
+        fusion=args.fusion,
+        fusion_params=parse_fusion_params(args.fusion_param),
+        depth=args.depth,
+        adaptive_depth=args.adaptive_depth or None,
+        use_cache=False if args.no_result_cache else None,
+        rerank=args.rerank,
+        filters=parse_filter_args(args.filter),
+        granularity=args.granularity,
+        quantization=args.quantization,
+        dimensions=args.dimensions
+    )
     print_results(results)
+    print(f"후보 수: {depth_stats()['last_depth']}")
+
+    stats = embedding_cache.stats()
+    print(f"임베딩 캐시: hit(메모리) {stats['memory_hits']}, hit(디스크) {stats['disk_hits']}, miss {stats['misses']}")
+    stats = result_cache.stats()
+    print(f"결과 캐시: hit {stats['hits']}, miss {stats['misses']}, hit rate {stats['hit_rate']:.1%}")
@@ -1,23 +1,84 @@
 """
 Langgraph 기반 Routing RAG CLI
 질문 분석 → 검색 필요 여부 판단 → Hybrid Search → 답변 생성
+
+노드는 비동기 함수이며 그래프는 ainvoke()/astream()으로 실행합니다.
+--stream을 주면 생성 토큰을 받는 즉시 출력하므로 첫 글자가 전체 답변 완료 전에 보입니다.
+--batch를 주면 JSONL 질문 목록을 한 프로세스에서 그래프를 한 번만 컴파일하여 동시에 답변합니다.
+--trace/--trace-summary를 주면 노드와 단계(LLM, 임베딩, BM25/벡터, 상세 조회)별 span을 기록합니다 (tracing.py).
 """
 import os
 import sys
+import json
+import time
+import asyncio
 import argparse
+import threading
 from datetime import datetime
-from typing import TypedDict, Literal
+from typing import Callable, List, TextIO, TypedDict, Literal
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, START, END
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
-from hybrid_search import hybrid_search
+from langchain_core.runnables import RunnableConfig
+from hybrid_search import (
+    hybrid_search, embedding_cache, result_cache, parse_fusion_params, parse_filter_args, depth_stats,
+    SEARCH_ENGINES, VECTOR_BACKENDS, KEYWORD_BACKENDS, FUSION_METHODS, RERANK_METHODS, GRANULARITIES,
+    HYBRID_SEARCH_VECTOR_QUANTIZATION, HYBRID_SEARCH_VECTOR_DIMENSIONS
+)
+from rerank import rerank_stats
+from router import FastRouter
+from fields import FIELD_LABELS
+from schema import verify_search_indexes, SchemaError
+from tracing import Trace, span, start_trace, export_spans, print_summary
 
 # 환경변수 로드
 load_dotenv()
 
-# LLM 초기화 (GPT-5-mini)
-llm = ChatOpenAI(model="gpt-5-mini", temperature=0)
+# LLM 초기화 (GPT-5-mini, 스트리밍 중에도 토큰 사용량을 받도록 stream_usage 사용)
+llm = ChatOpenAI(model="gpt-5-mini", temperature=0, stream_usage=True)
+
+# 답변 생성 요청의 프롬프트 캐시 키 (같은 키의 요청은 같은 캐시로 라우팅됨)
+RAG_PROMPT_CACHE_KEY = os.getenv("RAG_PROMPT_CACHE_KEY", "nh-loan-rag-generate")
+
+# 답변 생성 토큰 사용량 (prompt_cache_stats()로 조회)
+_prompt_cache_stats = {'calls': 0, 'input_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0}
+_prompt_cache_lock = threading.Lock()
+
+# 라우터 기본값
+# - "fast": 규칙/임베딩 유사도로 먼저 판단하고 확신이 없을 때만 LLM 호출 (router.py)
+# - "llm": 매 질문마다 LLM으로 판단
+RAG_ROUTER = os.getenv("RAG_ROUTER", "fast")
+ROUTERS = ("fast", "llm")
+fast_router = FastRouter()
+
+# LLM 라우팅 프롬프트
+ROUTE_PROMPT = """당신은 질문을 분석하는 전문가입니다.
+사용자의 질문이 농협 대출 상품에 대한 구체적인 정보를 요구하는지 판단하세요.
+
+- 대출 상품 검색이 필요한 경우: "search"
+- 일반적인 질문이나 인사말: "direct"
+
+예시:
+- "의사 전용 대출이 있나요?" → search
+- "공무원 대출 한도는?" → search
+- "안녕하세요" → direct
+- "대출이란 무엇인가요?" → direct
+
+반드시 "search" 또는 "direct" 중 하나만 답변하세요."""
+
+# 생성 프롬프트에 넣을 검색 문서 수 (재정렬을 켜면 2개로 줄여도 상위 문서 품질 유지)
+RAG_RETRIEVE_LIMIT = int(os.getenv("RAG_RETRIEVE_LIMIT", "3"))
+
+# 추측 검색: 라우팅과 동시에 hybrid_search()를 시작하고, direct로 판단되면 결과를 버림
+RAG_SPECULATIVE_RETRIEVAL = os.getenv("RAG_SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+
+# 배치 모드 동시 실행 질문 수 (검색 DB 연결은 DB_POOL_MAX_SIZE를 넘지 않도록 대기)
+RAG_BATCH_WORKERS = int(os.getenv("RAG_BATCH_WORKERS", "4"))
+
+# 추측 검색 통계 (speculation_stats()로 조회)
+_speculation_stats = {'speculated': 0, 'used': 0, 'wasted': 0, 'saved_ms': 0.0, 'wasted_ms': 0.0}
+_speculation_lock = threading.Lock()
 
 
 # ===== 개선된 시스템 프롬프트 =====
@@ -80,85 +141,238 @@ DISCLAIMER_TEMPLATE = """
 """
 
 
+# 검색 결과 형식 설명 (build_search_messages()가 만드는 사용자 메시지의 구조와 필드 의미)
+CONTEXT_FORMAT_PROMPT = """
+[검색 결과 읽는 법]
+사용자 메시지는 [검색 정보] → [검색된 대출 상품 정보] → [사용자 질문] → [기준일] 순서로 주어집니다.
+1. [검색 정보]에는 검색 방법, 검색된 상품 수, 최고 관련도, 검색 신뢰도(높음/보통/낮음), 참고사항이 있습니다.
+2. [검색된 대출 상품 정보]의 각 상품은 [상품N] 상품명으로 시작하며 다음 항목을 가집니다.
+   - 상품코드: 농협 내부 상품 식별자 (고객에게 안내할 필요는 없음)
+   - 요약: 상품의 핵심 특징
+   - 대상: 신청할 수 있는 고객과 자격 조건
+   - 한도: 대출 한도와 한도 산정 기준
+   - 관련 내용(상품 설명/유의사항/필요 서류): 긴 필드 중 질문과 일치한 구간 (있을 때만)
+   - 검색 관련도(RRF): 검색 순위를 합친 상대 점수 (고객에게 숫자를 그대로 안내하지 마세요)
+3. 항목 값이 "정보 없음"이면 그 내용은 "제공된 정보에서 확인되지 않습니다"라고 답하세요.
+4. [상품N]의 번호는 검색 순위이며, 출처 표시에 그대로 사용합니다.
+"""
+
+# 검색 신뢰도와 질문 유형별 답변 방법
+ANSWER_GUIDE_PROMPT = """
+[검색 신뢰도별 답변 방법]
+- 높음: 검색된 상품 정보로 바로 답변하세요.
+- 보통: 답변하되, 질문과 조건이 다를 수 있으니 상품의 대상과 한도를 함께 확인하도록 안내하세요.
+- 낮음: 질문과 정확히 맞는 상품을 찾지 못했을 수 있다고 먼저 밝히고,
+  직업, 대출 목적, 필요한 금액처럼 더 구체적인 정보를 넣은 질문 예시를 하나 제안하세요.
+
+[질문 유형별 답변 구성]
+- 상품 추천/존재 여부: 상품명, 대상, 한도, 특징을 상품별 목록으로 정리하세요.
+- 자격/신청 대상: 필수 조건과 우대 조건을 나눠서 정리하세요.
+- 한도/금리: 문서의 수치와 조건을 그대로 인용하고, 계산하거나 추정하지 마세요.
+- 필요 서류: 서류 목록을 항목별로 나열하고, 상황에 따라 추가 서류가 있을 수 있다고 안내하세요.
+- 여러 상품 비교: 대상, 한도, 특징을 항목별로 비교하고 핵심 차이점을 먼저 요약하세요.
+- 검색 결과에 답이 없는 질문: 확인되지 않는 부분을 밝히고 콜센터(1588-2100) 상담을 안내하세요.
+
+[금지 사항]
+- 검색 결과에 없는 금리, 한도, 기간을 추정하거나 만들어내지 마세요.
+- 대출 승인이나 특정 금리를 보장하는 표현("무조건 승인", "확정 금리")을 쓰지 마세요.
+- 다른 금융회사의 상품을 추천하거나 비교하지 마세요.
+- 주민등록번호, 계좌번호 같은 개인정보를 묻지 마세요.
+"""
+
+# 답변 생성 시스템 메시지 (요청마다 바뀌지 않는 앞부분, 프롬프트 캐시 대상)
+# OpenAI는 1024 토큰 이상인 앞부분만 캐시하므로, 지시문과 형식 설명, 안내사항 문구를 모두 여기에 두고
+# 요청마다 바뀌는 검색 정보, 문서, 질문, 기준일만 사용자 메시지에 둡니다.
+GENERATE_STATIC_PROMPT = f"""{SYSTEM_PROMPT}
+{FEW_SHOT_EXAMPLES}
+{CITATION_PROMPT}
+{CONTEXT_FORMAT_PROMPT}
+{ANSWER_GUIDE_PROMPT}
+[답변 작성 지침]
+사용자 메시지의 검색 정보와 대출 상품 정보를 바탕으로 정확하고 친절하게 답변해주세요.
+반드시 출처([상품N])를 명시하고, 아래 [중요 안내사항]을 답변 마지막에 그대로 포함하세요.
+안내사항의 (기준일)은 사용자 메시지 끝의 [기준일] 날짜로 바꿔 쓰세요.
+{DISCLAIMER_TEMPLATE.format(current_date="(기준일)")}"""
+
+
 # State 정의
 class State(TypedDict):
     """RAG 워크플로우 상태"""
     question: str
     route_decision: str  # "search" or "direct"
+    route_method: str  # 판단 방법: "rule", "embedding", "llm" (fast 라우터의 fallback 포함)
+    router: str  # "fast" 또는 "llm" (없으면 RAG_ROUTER)
+    speculative: bool  # 라우팅과 동시에 검색 시작 (없으면 RAG_SPECULATIVE_RETRIEVAL)
+    prefetch: object  # 추측 검색 asyncio.Task (retrieve_node가 결과를 사용)
     documents: list
     answer: str
     debug: bool
+    search_options: dict  # hybrid_search()에 전달할 추가 옵션 (예: {"concurrent": True})
+    timings: dict  # 노드별 소요 시간(ms) (예: {"route": 12.3, "retrieve": 230.1, "generate": 1800.5})
 
 
-def route_node(state: State) -> State:
+async def route_node(state: State, config: RunnableConfig = None) -> State:
     """
     Route 노드: 질문을 분석하여 검색 필요 여부 판단
+    fast 라우터는 규칙/임베딩으로 먼저 판단하고, 확신이 없을 때만 LLM을 호출합니다.
     """
     question = state["question"]
     debug = state.get("debug", False)
+    router = state.get("router") or RAG_ROUTER
+    speculative = state.get("speculative")
+    if speculative is None:
+        speculative = RAG_SPECULATIVE_RETRIEVAL
 
     if debug:
-        print("\n[DEBUG] Route Node: Analyzing question...")
+        print(f"\n[DEBUG] Route Node: Analyzing question ({router} router)...", file=sys.stderr)
+
+    # 대부분의 질문은 search로 판단되므로 판단을 기다리지 않고 검색을 먼저 시작
+    prefetch = None
+    if speculative:
+        prefetch = asyncio.create_task(_speculative_search(question, state.get("search_options") or {}))
+
+    try:
+        route_decision, route_method = None, "llm"
+        if router == "fast":
+            # 임베딩 API 호출이 있을 수 있으므로 스레드에서 실행
+            with span("router.fast") as attributes:
+                route_decision, route_method = await asyncio.to_thread(fast_router.classify, question)
+                attributes['method'] = route_method
+        if route_decision is None:
+            route_decision, route_method = await llm_route(question, config), "llm"
+    except BaseException:
+        # 라우팅이 실패하면 추측 검색을 취소하고, 이미 끝났으면 결과/예외를 회수하여 버림
+        if prefetch is not None:
+            _record_speculation('speculated')
+            prefetch.cancel()
+            prefetch.add_done_callback(_discard_prefetch)
+        raise
 
-    # LLM으로 질문 분석
-    messages = [
-        SystemMessage(content="""당신은 질문을 분석하는 전문가입니다.
-사용자의 질문이 농협 대출 상품에 대한 구체적인 정보를 요구하는지 판단하세요.
+    if debug:
+        print(f"[DEBUG] Route Decision: {route_decision} ({route_method})", file=sys.stderr)
+        if router == "fast":
+            stats = fast_router.stats()
+            print(f"[DEBUG] Router: {stats['fallback']}/{stats['total']} LLM fallbacks ({stats['fallback_rate']:.1%})", file=sys.stderr)
 
-- 대출 상품 검색이 필요한 경우: "search"
-- 일반적인 질문이나 인사말: "direct"
+    if prefetch is not None:
+        _record_speculation('speculated')
+        if route_decision != "search":
+            # 검색 스레드는 중단할 수 없으므로 끝나면 낭비된 시간만 기록
+            prefetch.add_done_callback(_discard_prefetch)
+            prefetch = None
+            if debug:
+                print("[DEBUG] Speculative retrieval discarded (direct route)", file=sys.stderr)
+
+    return {**state, "route_decision": route_decision, "route_method": route_method, "prefetch": prefetch}
 
-예시:
-- "의사 전용 대출이 있나요?" → search
-- "공무원 대출 한도는?" → search
-- "안녕하세요" → direct
-- "대출이란 무엇인가요?" → direct
 
-반드시 "search" 또는 "direct" 중 하나만 답변하세요."""),
+async def llm_route(question: str, config: RunnableConfig = None) -> str:
+    """LLM으로 질문 분석 ("search" 또는 "direct")"""
+    messages = [
+        SystemMessage(content=ROUTE_PROMPT),
         HumanMessage(content=question)
     ]
 
-    response = llm.invoke(messages)
+    with span("llm.route") as attributes:
+        response = await llm.ainvoke(messages, config)
+        attributes.update(_usage_attributes(getattr(response, "usage_metadata", None)))
     route_decision = response.content.strip().lower()
 
     # "search" 또는 "direct"만 허용
     if "search" in route_decision:
-        route_decision = "search"
-    else:
-        route_decision = "direct"
+        return "search"
+    return "direct"
 
-    if debug:
-        print(f"[DEBUG] Route Decision: {route_decision}")
-
-    return {**state, "route_decision": route_decision}
 
-
-def retrieve_node(state: State) -> State:
+async def retrieve_node(state: State, config: RunnableConfig = None) -> State:
     """
-    Retrieve 노드: Hybrid Search로 top-3 문서 검색
+    Retrieve 노드: Hybrid Search로 top-k 문서 검색 (RAG_RETRIEVE_LIMIT, 기본값 3)
+    hybrid_search()는 동기 DB/API 호출이므로 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
     """
     question = state["question"]
     debug = state.get("debug", False)
 
     if debug:
-        print("\n[DEBUG] Retrieve Node: Running hybrid search...")
-
-    # Hybrid Search 실행 (top-3)
-    results = hybrid_search(question, limit=3)
+        print("\n[DEBUG] Retrieve Node: Running hybrid search...", file=sys.stderr)
+
+    # Hybrid Search 실행 (top-k), 추측 검색이 있으면 그 결과를 기다림
+    prefetch = state.get("prefetch")
+    if prefetch is not None:
+        wait_start = time.perf_counter()
+        results, duration = await prefetch
+        saved = max(0.0, duration - (time.perf_counter() - wait_start))
+        _record_speculation('used', saved_ms=saved * 1000)
+        if debug:
+            print(f"[DEBUG] Speculative retrieval used ({saved * 1000:.0f}ms overlapped with routing)", file=sys.stderr)
+    else:
+        results, _ = await _timed_search(question, state.get("search_options") or {})
 
     if debug:
-        print(f"[DEBUG] Found {len(results)} documents")
+        print(f"[DEBUG] Found {len(results)} documents", file=sys.stderr)
         for i, doc in enumerate(results, 1):
-            print(f"  {i}. {doc['product_name']} (score: {doc['rrf_score']:.4f})")
-
-    return {**state, "documents": results}
+            print(f"  {i}. {doc['product_name']} (score: {doc['rrf_score']:.4f})", file=sys.stderr)
+        cache_stats = embedding_cache.stats()
+        print(f"[DEBUG] Embedding cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, {cache_stats['misses']} misses", file=sys.stderr)
+        print(f"[DEBUG] Candidate depth used: {depth_stats()['last_depth']}", file=sys.stderr)
+        result_stats = result_cache.stats()
+        print(f"[DEBUG] Result cache: {result_stats['hits']} hits, {result_stats['misses']} misses (hit rate {result_stats['hit_rate']:.1%})", file=sys.stderr)
+        stats = rerank_stats()
+        if stats['calls']:
+            print(f"[DEBUG] Rerank: {stats['reranked']}/{stats['calls']} applied, avg {stats['avg_latency_ms']:.0f}ms", file=sys.stderr)
+
+    return {**state, "documents": results, "prefetch": None}
+
+
+async def _speculative_search(question: str, search_options: dict) -> tuple:
+    """추측 검색 (route 노드 아래가 아니라 trace 최상위 아래의 별도 span으로 기록)"""
+    with span("retrieve.speculative", detached=True):
+        return await _timed_search(question, search_options)
+
+
+async def _timed_search(question: str, search_options: dict) -> tuple:
+    """hybrid_search()를 스레드에서 실행 → (결과, 소요 시간(초))"""
+    start = time.perf_counter()
+    results = await asyncio.to_thread(hybrid_search, question, limit=RAG_RETRIEVE_LIMIT, **search_options)
+    return results, time.perf_counter() - start
+
+
+def _discard_prefetch(task: asyncio.Task):
+    """버린 추측 검색의 소요 시간 기록 (실패했으면 예외만 확인하고 무시)"""
+    if task.cancelled() or task.exception() is not None:
+        _record_speculation('wasted')
+        return
+    _, duration = task.result()
+    _record_speculation('wasted', wasted_ms=duration * 1000)
+
+
+def _record_speculation(outcome: str, saved_ms: float = 0.0, wasted_ms: float = 0.0):
+    with _speculation_lock:
+        _speculation_stats[outcome] += 1
+        _speculation_stats['saved_ms'] += saved_ms
+        _speculation_stats['wasted_ms'] += wasted_ms
+
+
+def speculation_stats() -> dict:
+    """추측 검색 횟수, 사용/낭비 횟수, 낭비 비율, 사용 시 평균 절감 시간(ms), 낭비된 검색 시간 합계(ms)"""
+    with _speculation_lock:
+        speculated = _speculation_stats['speculated']
+        used = _speculation_stats['used']
+        return {
+            'speculated': speculated,
+            'used': used,
+            'wasted': _speculation_stats['wasted'],
+            'waste_rate': _speculation_stats['wasted'] / speculated if speculated else 0.0,
+            'avg_saved_ms': _speculation_stats['saved_ms'] / used if used else 0.0,
+            'wasted_ms': _speculation_stats['wasted_ms'],
+        }
 
 
-def generate_node(state: State) -> State:
+async def generate_node(state: State, config: RunnableConfig = None) -> State:
     """
     Generate 노드: 답변 생성
     검색이 필요한 경우 문서 기반 답변, 아니면 직접 답변
     개선된 프롬프트 적용 (Few-shot, Citation, Disclaimer)
+    astream(stream_mode="messages")로 실행하면 LLM 토큰이 노드 완료 전에 스트리밍됩니다.
     """
     question = state["question"]
     route_decision = state["route_decision"]
@@ -166,40 +380,98 @@ def generate_node(state: State) -> State:
     debug = state.get("debug", False)
 
     if debug:
-        print("\n[DEBUG] Generate Node: Creating answer...")
+        print("\n[DEBUG] Generate Node: Creating answer...", file=sys.stderr)
 
     if route_decision == "search":
         # 검색된 문서 기반 답변 생성
         if not documents:
             answer = "죄송합니다. 관련 대출 상품을 찾을 수 없습니다. 다른 검색어로 다시 시도해주세요."
         else:
-            # 문서 정보를 개선된 컨텍스트로 구성
-            context_parts = []
-            for i, doc in enumerate(documents, 1):
-                context_parts.append(f"""
+            messages = build_search_messages(question, documents)
+            answer = await _generate(messages, config, prompt_cache_key=RAG_PROMPT_CACHE_KEY)
+    else:
+        # 직접 답변
+        messages = [
+            SystemMessage(content="당신은 친절한 농협 대출 상담사입니다. 사용자의 질문에 간단하고 친절하게 답변하세요."),
+            HumanMessage(content=question)
+        ]
+
+        answer = await _generate(messages, config)
+
+    if debug:
+        print(f"[DEBUG] Answer generated: {len(answer)} characters", file=sys.stderr)
+        stats = prompt_cache_stats()
+        print(f"[DEBUG] Prompt cache: {stats['cached_tokens']}/{stats['input_tokens']} input tokens cached ({stats['cached_ratio']:.1%})", file=sys.stderr)
+
+    return {**state, "answer": answer}
+
+
+def build_search_messages(question: str, documents: list, current_date: str = None) -> list:
+    """
+    검색 문서 기반 답변 프롬프트
+    매 요청 같은 지시문(GENERATE_STATIC_PROMPT, 안내사항 문구 포함)을 시스템 메시지로 먼저 두어
+    질문이 달라도 프롬프트 캐시가 적중하게 하고, 검색 정보, 문서, 질문, 기준일만 뒤의 사용자 메시지에 둡니다.
+    """
+    metadata, context = format_search_context(documents)
+
+    # 현재 날짜 (안내사항 문구는 시스템 메시지에 있고, 날짜가 바뀌어도 캐시된 앞부분에 영향이 없도록 날짜만 맨 뒤에 둠)
+    if current_date is None:
+        current_date = datetime.now().strftime("%Y년 %m월 %d일")
+
+    # 가변 부분: 검색 정보 → 문서 → 질문 → 기준일
+    user_prompt = f"""
+{metadata}
+
+[검색된 대출 상품 정보]
+{context}
+
+[사용자 질문]
+{question}
+
+[기준일]
+{current_date}
+""".strip()
+
+    return [
+        SystemMessage(content=GENERATE_STATIC_PROMPT),
+        HumanMessage(content=user_prompt)
+    ]
+
+
+def format_search_context(documents: list) -> tuple:
+    """검색 문서 → ([검색 정보] 블록, [상품N] 블록들)"""
+    # 문서 정보를 개선된 컨텍스트로 구성
+    # 청크 검색 결과는 긴 필드 전체 대신 질문과 일치한 구간만 포함
+    context_parts = []
+    for i, doc in enumerate(documents, 1):
+        passages = "".join(
+            f"\n- 관련 내용({FIELD_LABELS.get(passage['field'], passage['field'])}): {passage['content']}"
+            for passage in doc.get('passages', [])
+        )
+        context_parts.append(f"""
 [상품{i}] {doc['product_name']}
 - 상품코드: {doc['product_code']}
 - 요약: {doc['product_summary']}
 - 대상: {doc.get('target_description', '정보 없음')}
-- 한도: {doc.get('loan_limit_description', '정보 없음')}
+- 한도: {doc.get('loan_limit_description', '정보 없음')}{passages}
 - 검색 관련도(RRF): {doc['rrf_score']:.4f}
 """.strip())
 
-            context = "\n\n".join(context_parts)
-
-            # 검색 메타데이터 추가
-            max_score = max([doc['rrf_score'] for doc in documents])
-            if max_score > 0.05:
-                confidence = "높음"
-                confidence_note = "검색 결과가 질문과 매우 관련성이 높습니다."
-            elif max_score > 0.02:
-                confidence = "보통"
-                confidence_note = "검색 결과가 질문과 어느 정도 관련이 있습니다."
-            else:
-                confidence = "낮음"
-                confidence_note = "검색 결과의 관련성이 낮을 수 있습니다. 보다 구체적인 질문이나 다른 검색어를 시도해보세요."
-
-            metadata = f"""
+    context = "\n\n".join(context_parts)
+
+    # 검색 메타데이터 추가
+    max_score = max([doc['rrf_score'] for doc in documents])
+    if max_score > 0.05:
+        confidence = "높음"
+        confidence_note = "검색 결과가 질문과 매우 관련성이 높습니다."
+    elif max_score > 0.02:
+        confidence = "보통"
+        confidence_note = "검색 결과가 질문과 어느 정도 관련이 있습니다."
+    else:
+        confidence = "낮음"
+        confidence_note = "검색 결과의 관련성이 낮을 수 있습니다. 보다 구체적인 질문이나 다른 검색어를 시도해보세요."
+
+    metadata = f"""
 [검색 정보]
 - 검색 방법: 하이브리드 검색 (BM25 키워드 + 벡터 유사도)
 - 검색된 상품 수: {len(documents)}
@@ -208,51 +480,52 @@ def generate_node(state: State) -> State:
 - 참고사항: {confidence_note}
 """.strip()
 
-            # 현재 날짜 및 면책 사항
-            current_date = datetime.now().strftime("%Y년 %m월 %d일")
-            disclaimer = DISCLAIMER_TEMPLATE.format(current_date=current_date)
+    return metadata, context
 
-            # 최종 프롬프트 구성
-            user_prompt = f"""
-{FEW_SHOT_EXAMPLES}
-
-{CITATION_PROMPT}
-
-{metadata}
-
-[검색된 대출 상품 정보]
-{context}
 
-[사용자 질문]
-{question}
-
-위 정보를 바탕으로 정확하고 친절하게 답변해주세요.
-반드시 출처([상품N])를 명시하고, 아래 안내사항을 답변 마지막에 포함하세요.
-
-{disclaimer}
-""".strip()
-
-            messages = [
-                SystemMessage(content=SYSTEM_PROMPT),
-                HumanMessage(content=user_prompt)
-            ]
+async def _generate(messages: list, config: RunnableConfig = None, prompt_cache_key: str = None) -> str:
+    """
+    답변 생성 LLM 호출
+    prompt_cache_key를 주면(문서 기반 답변) 그 키로 보내고 토큰 사용량을 prompt_cache_stats()에 기록합니다.
+    """
+    kwargs = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else {}
+    with span("llm.generate") as attributes:
+        response = await llm.ainvoke(messages, config, **kwargs)
+        usage = getattr(response, "usage_metadata", None)
+        attributes.update(_usage_attributes(usage))
+    if prompt_cache_key:
+        _record_prompt_usage(usage)
+    return response.content
+
+
+def _usage_attributes(usage: dict) -> dict:
+    """LLM 응답의 usage_metadata → span 속성 (입력/캐시된 입력/출력 토큰 수)"""
+    if not usage:
+        return {}
+    return {
+        'llm.input_tokens': usage.get("input_tokens", 0),
+        'llm.cached_tokens': (usage.get("input_token_details") or {}).get("cache_read", 0) or 0,
+        'llm.output_tokens': usage.get("output_tokens", 0),
+    }
 
-            response = llm.invoke(messages)
-            answer = response.content
-    else:
-        # 직접 답변
-        messages = [
-            SystemMessage(content="당신은 친절한 농협 대출 상담사입니다. 사용자의 질문에 간단하고 친절하게 답변하세요."),
-            HumanMessage(content=question)
-        ]
 
-        response = llm.invoke(messages)
-        answer = response.content
+def _record_prompt_usage(usage: dict):
+    if not usage:
+        return
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    with _prompt_cache_lock:
+        _prompt_cache_stats['calls'] += 1
+        _prompt_cache_stats['input_tokens'] += usage.get("input_tokens", 0)
+        _prompt_cache_stats['cached_tokens'] += cached
+        _prompt_cache_stats['output_tokens'] += usage.get("output_tokens", 0)
 
-    if debug:
-        print(f"[DEBUG] Answer generated: {len(answer)} characters")
 
-    return {**state, "answer": answer}
+def prompt_cache_stats() -> dict:
+    """문서 기반 답변 생성 호출 수, 입력/캐시된 입력/출력 토큰 수, 캐시된 입력 비율 (직접 답변은 제외)"""
+    with _prompt_cache_lock:
+        stats = dict(_prompt_cache_stats)
+    stats['cached_ratio'] = stats['cached_tokens'] / stats['input_tokens'] if stats['input_tokens'] else 0.0
+    return stats
 
 
 def should_retrieve(state: State) -> Literal["retrieve", "generate"]:
@@ -265,6 +538,19 @@ def should_retrieve(state: State) -> Literal["retrieve", "generate"]:
     return "generate"
 
 
+def _timed_node(name: str, node: Callable) -> Callable:
+    """노드 실행 시간(ms)을 state["timings"][name]에 기록하고, trace가 있으면 노드 span으로 감싸는 래퍼"""
+    async def timed(state: State, config: RunnableConfig) -> State:
+        start = time.perf_counter()
+        with span(name):
+            result = await node(state, config)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        return {**result, "timings": {**(state.get("timings") or {}), name: elapsed_ms}}
+
+    timed.__name__ = node.__name__
+    return timed
+
+
 def build_graph() -> StateGraph:
     """
     Langgraph 워크플로우 구성
@@ -272,10 +558,10 @@ def build_graph() -> StateGraph:
     # StateGraph 생성
     workflow = StateGraph(State)
 
-    # 노드 추가
-    workflow.add_node("route", route_node)
-    workflow.add_node("retrieve", retrieve_node)
-    workflow.add_node("generate", generate_node)
+    # 노드 추가 (노드별 소요 시간을 state["timings"]에 기록)
+    workflow.add_node("route", _timed_node("route", route_node))
+    workflow.add_node("retrieve", _timed_node("retrieve", retrieve_node))
+    workflow.add_node("generate", _timed_node("generate", generate_node))
 
     # 엣지 정의
     workflow.add_edge(START, "route")
@@ -300,26 +586,249 @@ def build_graph() -> StateGraph:
     return workflow.compile()
 
 
+async def stream_answer(app, initial_state: dict, on_token: Callable[[str], None]) -> dict:
+    """
+    그래프를 실행하며 generate 노드의 LLM 토큰을 받는 즉시 on_token으로 전달
+    route 노드의 LLM 출력("search"/"direct")은 전달하지 않습니다.
+    Returns: 최종 상태 (첫 토큰까지 걸린 시간(초)은 first_token_seconds, 토큰이 없었으면 None)
+    """
+    start = time.perf_counter()
+    first_token_seconds = None
+    final_state = initial_state
+    async for mode, payload in app.astream(initial_state, stream_mode=["messages", "values"]):
+        if mode == "values":
+            final_state = payload
+            continue
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") != "generate" or not chunk.content:
+            continue
+        if first_token_seconds is None:
+            first_token_seconds = time.perf_counter() - start
+        on_token(chunk.content)
+    return {**final_state, "first_token_seconds": first_token_seconds}
+
+
+def read_questions(stream: TextIO) -> List[dict]:
+    """
+    JSONL 질문 목록 읽기 (한 줄에 {"question": ..., "id": ...} 또는 질문 문자열)
+    id가 없으면 줄 번호를 사용하고, 빈 줄은 건너뜁니다. 형식이 잘못된 줄이 있으면 ValueError
+    """
+    items = []
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+        if isinstance(item, str):
+            item = {"question": item}
+        if not isinstance(item, dict) or not str(item.get("question") or "").strip():
+            raise ValueError(f"Line {line_number} has no question")
+        items.append({**item, "id": item.get("id", line_number)})
+    return items
+
+
+def batch_record(item: dict, result: dict, elapsed: float) -> dict:
+    """배치 결과 한 줄 (답변, 라우팅 판단, 검색 문서, 노드별 소요 시간)"""
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "answer": result["answer"],
+        "route_decision": result["route_decision"],
+        "route_method": result.get("route_method", ""),
+        "documents": [
+            {"id": doc["id"], "product_name": doc["product_name"], "rrf_score": doc["rrf_score"]}
+            for doc in result.get("documents", [])
+        ],
+        "timings": {**(result.get("timings") or {}), "total": round(elapsed * 1000, 1)},
+    }
+
+
+async def answer_batch(
+    app,
+    items: List[dict],
+    base_state: dict,
+    on_result: Callable[[dict], None],
+    workers: int = None,
+    on_trace: Callable[[Trace], None] = None
+) -> dict:
+    """
+    컴파일된 그래프 하나로 질문들을 최대 workers개씩 동시에 답변
+    질문마다 완료되는 즉시 on_result(결과 한 줄)를 호출하므로 출력 순서는 완료 순서입니다 (id로 구분).
+    실패한 질문은 error 필드만 기록하고 나머지 질문은 계속 진행합니다.
+    질문마다 trace를 하나씩 기록하여 on_trace로 넘기며, 결과 한 줄에는 trace_id가 들어갑니다.
+    Returns: {'questions', 'failed', 'elapsed_seconds'}
+    """
+    workers = workers or RAG_BATCH_WORKERS
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1: {workers}")
+    semaphore = asyncio.Semaphore(workers)
+    failed = 0
+    batch_start = time.perf_counter()
+
+    async def answer(item: dict):
+        nonlocal failed
+        async with semaphore:
+            start = time.perf_counter()
+            with start_trace() as trace:
+                try:
+                    with span("rag"):
+                        result = await app.ainvoke({**base_state, "question": item["question"], "timings": {}})
+                    record = batch_record(item, result, time.perf_counter() - start)
+                except Exception as e:
+                    failed += 1
+                    record = {"id": item["id"], "question": item["question"], "error": f"{type(e).__name__}: {e}"}
+            on_result({**record, "trace_id": trace.trace_id})
+            if on_trace is not None:
+                on_trace(trace)
+
+    await asyncio.gather(*(answer(item) for item in items))
+    return {'questions': len(items), 'failed': failed, 'elapsed_seconds': time.perf_counter() - batch_start}
+
+
+def run_batch(app, args, base_state: dict, on_trace: Callable[[Trace], None] = None):
+    """--batch 실행: 질문 JSONL(파일 또는 표준 입력 "-")을 읽어 결과 JSONL(파일 또는 표준 출력 "-")로 기록"""
+    if args.batch == "-":
+        items = read_questions(sys.stdin)
+    else:
+        with open(args.batch, 'r', encoding='utf-8') as f:
+            items = read_questions(f)
+
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    try:
+        def write(record: dict):
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+        summary = asyncio.run(answer_batch(app, items, base_state, write, args.workers, on_trace))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    # 진행 요약은 결과 JSONL과 섞이지 않도록 표준 에러로 출력
+    elapsed = summary['elapsed_seconds']
+    print(
+        f"Answered {summary['questions'] - summary['failed']}/{summary['questions']} questions "
+        f"in {elapsed:.1f}s ({summary['questions'] / elapsed if elapsed else 0:.2f} questions/s, "
+        f"{summary['failed']} failed)",
+        file=sys.stderr
+    )
+
+
 def main():
     """CLI 진입점"""
     parser = argparse.ArgumentParser(description="Langgraph Routing RAG CLI")
-    parser.add_argument("question", type=str, help="질문 입력")
+    parser.add_argument("question", type=str, nargs="?", help="질문 입력 (--batch를 주면 생략)")
     parser.add_argument("--debug", action="store_true", help="디버그 모드")
+    parser.add_argument("--concurrent", action="store_true", help="BM25/벡터 검색 동시 실행")
+    parser.add_argument("--engine", choices=SEARCH_ENGINES, default=None, help="검색 엔진 (python: 3회 왕복, sql: 단일 SQL)")
+    parser.add_argument("--vector-backend", choices=VECTOR_BACKENDS, default=None, help="벡터 레그 백엔드 (memory: 프로세스 내 NumPy 인덱스)")
+    parser.add_argument("--keyword-backend", choices=KEYWORD_BACKENDS, default=None, help="BM25 레그 백엔드 (local: 프로세스 내 n-gram BM25)")
+    parser.add_argument("--fusion", choices=list(FUSION_METHODS), default=None, help="결과 결합 전략 (기본값: rrf)")
+    parser.add_argument("--fusion-param", action="append", default=[], metavar="NAME=VALUE", help="결합 파라미터 (예: alpha=0.3, bm25_weight=2)")
+    parser.add_argument("--depth", type=int, default=None, help="레그별 후보 수 (적응형 모드에서는 최대값, 기본값: 20)")
+    parser.add_argument("--adaptive-depth", action="store_true", help="상위 결과가 확정되면 후보 조회 중단")
+    parser.add_argument("--no-result-cache", action="store_true", help="검색 결과 캐시 사용 안 함")
+    parser.add_argument("--rerank", choices=RERANK_METHODS, default=None, help="결합 상위 후보 재정렬 (기본값: none)")
+    parser.add_argument("--filter", action="append", default=[], metavar="NAME=VALUE", help="구조화 필드 필터 (예: can_apply_mobile=true, max_interest_rate_lte=5)")
+    parser.add_argument("--granularity", choices=GRANULARITIES, default=None, help="검색 단위 (chunk: 긴 필드 청크로 검색, 기본값: product)")
+    parser.add_argument("--stream", action="store_true", help="답변 토큰을 생성되는 대로 출력")
+    parser.add_argument("--router", choices=ROUTERS, default=None, help="라우터 (fast: 규칙/임베딩 후 LLM fallback, 기본값: RAG_ROUTER)")
+    parser.add_argument("--speculative", action="store_true", help="라우팅과 동시에 검색 시작 (direct면 결과 버림)")
+    parser.add_argument("--batch", metavar="FILE", default=None, help="질문 JSONL 파일을 한 번에 답변 (\"-\"이면 표준 입력)")
+    parser.add_argument("--output", metavar="FILE", default="-", help="--batch 결과 JSONL 경로 (기본값: 표준 출력)")
+    parser.add_argument("--workers", type=int, default=None, help=f"--batch 동시 실행 질문 수 (기본값: {RAG_BATCH_WORKERS})")
+    parser.add_argument("--trace", metavar="FILE", default=None, help="단계별 span을 JSONL로 기록 (OpenTelemetry 형식 필드)")
+    parser.add_argument("--trace-summary", action="store_true", help="끝나면 단계별 p50/p95 지연시간과 토큰/캐시 요약을 표준 에러로 출력")
 
     args = parser.parse_args()
+    if (args.question is None) == (args.batch is None):
+        parser.error("질문 또는 --batch 중 하나만 지정하세요")
+    if args.batch and args.stream:
+        parser.error("--batch와 --stream은 함께 사용할 수 없습니다")
+
+    # 검색 인덱스 확인 (없으면 LLM 호출 전에 즉시 중단)
+    try:
+        verify_search_indexes(quantization=HYBRID_SEARCH_VECTOR_QUANTIZATION, dimensions=HYBRID_SEARCH_VECTOR_DIMENSIONS)
+    except SchemaError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
     # 그래프 빌드
     app = build_graph()
 
+    # hybrid_search() 옵션 (지정한 것만 전달하고 나머지는 환경변수 기본값 사용)
+    search_options = {}
+    if args.concurrent:
+        search_options["concurrent"] = True
+    if args.engine:
+        search_options["engine"] = args.engine
+    if args.vector_backend:
+        search_options["vector_backend"] = args.vector_backend
+    if args.keyword_backend:
+        search_options["keyword_backend"] = args.keyword_backend
+    if args.fusion:
+        search_options["fusion"] = args.fusion
+    if args.fusion_param:
+        search_options["fusion_params"] = parse_fusion_params(args.fusion_param)
+    if args.depth:
+        search_options["depth"] = args.depth
+    if args.adaptive_depth:
+        search_options["adaptive_depth"] = True
+    if args.no_result_cache:
+        search_options["use_cache"] = False
+    if args.rerank:
+        search_options["rerank"] = args.rerank
+    if args.filter:
+        search_options["filters"] = parse_filter_args(args.filter)
+    if args.granularity:
+        search_options["granularity"] = args.granularity
+
     # 초기 상태
     initial_state = {
         "question": args.question,
         "route_decision": "",
+        "route_method": "",
+        "router": args.router or RAG_ROUTER,
+        "speculative": args.speculative or RAG_SPECULATIVE_RETRIEVAL,
         "documents": [],
         "answer": "",
-        "debug": args.debug
+        "debug": args.debug,
+        "search_options": search_options,
+        "timings": {}
     }
 
+    # 계측: 질문마다 trace 하나 (span은 --trace 파일에 기록하고, 요약용으로 모아 둠)
+    traces = []
+    trace_file = open(args.trace, 'a', encoding='utf-8') if args.trace else None
+
+    def collect(trace: Trace):
+        traces.append(trace)
+        if trace_file is not None:
+            export_spans(trace, trace_file)
+
+    try:
+        if args.batch:
+            try:
+                run_batch(app, args, initial_state, collect if args.trace or args.trace_summary else None)
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            with start_trace() as trace, span("rag"):
+                answer_question(app, args, initial_state)
+            collect(trace)
+    finally:
+        if trace_file is not None:
+            trace_file.close()
+
+    if args.trace_summary and traces:
+        print_summary(traces, file=sys.stderr)
+
+
+def answer_question(app, args, initial_state: dict):
+    """질문 하나 답변 (--stream이면 토큰을 생성되는 대로 출력)"""
     # 워크플로우 실행
     if args.debug:
         print("="*80)
@@ -327,14 +836,27 @@ def main():
         print("="*80)
         print(f"\n질문: {args.question}\n")
 
-    result = app.invoke(initial_state)
+    if not args.stream:
+        result = asyncio.run(app.ainvoke(initial_state))
+
+        # 결과 출력
+        print("\n" + "="*80)
+        print("답변")
+        print("="*80)
+        print(result["answer"])
+        print()
+        return
 
-    # 결과 출력
     print("\n" + "="*80)
     print("답변")
     print("="*80)
-    print(result["answer"])
-    print()
+    result = asyncio.run(stream_answer(app, initial_state, lambda token: print(token, end="", flush=True)))
+    # LLM을 호출하지 않은 답변(검색 결과 없음)은 스트리밍되지 않으므로 한 번에 출력
+    if result["first_token_seconds"] is None:
+        print(result["answer"], end="")
+    print("\n")
+    if args.debug and result["first_token_seconds"] is not None:
+        print(f"[DEBUG] Time to first token: {result['first_token_seconds'] * 1000:.0f}ms", file=sys.stderr)
 
 
 if __name__ == "__main__":
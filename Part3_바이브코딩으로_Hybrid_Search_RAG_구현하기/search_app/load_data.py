@@ -5,10 +5,25 @@ loan_products.json 파일을 읽어서 PostgreSQL에 저장하고 임베딩을 
 import json
 import os
 import re
+import time
+import hashlib
+import itertools
+import random
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, List
 import psycopg2
+from psycopg2.extras import execute_values
+import openai
 from openai import OpenAI
 from dotenv import load_dotenv
+from schema import (
+    migrate, migrate_chunks, migrate_quantized_index, ensure_ingest_columns, ensure_chunk_table,
+    bump_catalog_version, VECTOR_INDEX_NAMES, VECTOR_QUANTIZATIONS, EMBEDDING_DIMENSIONS
+)
 
 # 환경변수 로드
 load_dotenv()
@@ -19,6 +34,51 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # OpenAI 클라이언트 초기화
 client = OpenAI(api_key=OPENAI_API_KEY)
 
+# 배치 임베딩 재시도 설정
+EMBEDDING_MAX_RETRIES = 6
+EMBEDDING_BACKOFF_BASE = 1.0  # 초
+EMBEDDING_BACKOFF_MAX = 60.0  # 초
+
+# 재시도할 OpenAI 오류 (레이트 리밋, 일시적 네트워크/서버 오류)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+# 병렬 수집 설정: 임베딩 워커 수, 분당 토큰 한도 (0이면 제한 없음)
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+EMBEDDING_TPM_LIMIT = int(os.getenv("EMBEDDING_TPM_LIMIT", "0"))
+
+# loan_products 컬럼 (INSERT 순서)
+PRODUCT_COLUMNS = [
+    'id', 'product_code', 'product_name', 'product_summary', 'product_description',
+    'target_description', 'loan_limit_description', 'loan_period_guide', 'repayment_method',
+    'min_interest_rate', 'max_interest_rate', 'required_documents', 'customer_cost_info',
+    'early_repayment_info', 'overdue_interest_info', 'important_notices',
+    'is_available', 'is_sale_available', 'can_apply_online', 'can_apply_mobile',
+    'can_apply_branch', 'registered_at', 'last_modified_at', 'searchable_text',
+    'cleaned_searchable_text', 'searchable_text_embedding', 'content_hash'
+]
+
+
+def upsert_sql(values_clause: str, update_embedding: bool = True) -> str:
+    """
+    INSERT ... ON CONFLICT (id) DO UPDATE 쿼리 생성
+    update_embedding=False이면 기존 임베딩을 유지하고 나머지 컬럼만 갱신합니다.
+    """
+    updated_columns = [
+        column for column in PRODUCT_COLUMNS
+        if column != 'id' and (update_embedding or column != 'searchable_text_embedding')
+    ]
+    return f"""
+    INSERT INTO loan_products ({', '.join(PRODUCT_COLUMNS)})
+    {values_clause}
+    ON CONFLICT (id) DO UPDATE SET
+        {', '.join(f'{column} = EXCLUDED.{column}' for column in updated_columns)}
+    """
+
 
 def clean_text(text: str) -> str:
     """특수문자를 제거하여 BM25 검색용 텍스트 생성"""
@@ -31,124 +91,580 @@ def clean_text(text: str) -> str:
     return cleaned.strip()
 
 
-def get_embedding(text: str) -> list:
-    """OpenAI API를 사용하여 텍스트 임베딩 생성"""
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
+def get_embeddings(texts: List[str]) -> List[list]:
+    """
+    여러 텍스트의 임베딩을 한 번의 API 호출로 생성
+    레이트 리밋 등 일시적 오류는 지수 백오프(+지터)로 재시도합니다.
+    """
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        try:
+            response = client.embeddings.create(
+                model="text-embedding-3-small",
+                input=texts
+            )
+            # 응답 순서가 입력 순서와 다를 수 있으므로 index로 정렬
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except RETRYABLE_ERRORS as e:
+            if attempt == EMBEDDING_MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"  Embedding API error ({type(e).__name__}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Retry-After 헤더가 있으면 따르고, 없으면 지수 백오프 + 지터"""
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), EMBEDDING_BACKOFF_MAX)
+        except ValueError:
+            pass
+    delay = min(EMBEDDING_BACKOFF_BASE * (2 ** attempt), EMBEDDING_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 근사치 (토크나이저 없이 계산)
+    한글은 대략 글자당 1토큰(UTF-8 3바이트), 영문은 3~4글자당 1토큰이므로 바이트 수 / 3을 사용합니다.
+    """
+    return max(1, len((text or '').encode('utf-8')) // 3)
 
 
-def load_json_data(json_path: str) -> list:
-    """JSON 파일 로드"""
+class TokenBudget:
+    """
+    분당 토큰 한도 (토큰 버킷)
+    여러 임베딩 워커가 공유하며, 한도를 넘으면 토큰이 다시 찰 때까지 대기합니다.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0  # 초당 충전량
+        self.available = self.capacity
+        self.waited_seconds = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """tokens만큼 차감 (부족하면 대기), 대기한 시간(초) 반환"""
+        # 한 요청이 분당 한도보다 크면 버킷이 가득 찰 때까지만 대기
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    self.waited_seconds += waited
+                    return waited
+                delay = (tokens - self.available) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """이터러블을 size개씩 묶어서 반환"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_array(json_path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """
+    JSON 배열 파일을 스트리밍으로 읽기
+    파일을 chunk_size 단위로 읽으면서 배열 원소를 하나씩 디코딩하므로,
+    메모리 사용량이 파일 크기가 아니라 (청크 + 상품 1개) 크기로 제한됩니다.
+    """
+    decoder = json.JSONDecoder()
     with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        buffer = f.read(chunk_size)
+        eof = not buffer
+        pos = 0
+        state = 'start'  # start → first → (item → separator)* → 종료
 
+        while True:
+            # 공백 건너뛰기, 버퍼를 다 썼으면 다음 청크 읽기
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    raise ValueError(f"{json_path}: JSON 배열이 닫히지 않았습니다.")
+                buffer = f.read(chunk_size)
+                eof = not buffer
+                pos = 0
+                continue
 
-def insert_product(conn, product: dict):
-    """제품 데이터를 데이터베이스에 삽입"""
-    cursor = conn.cursor()
+            char = buffer[pos]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError(f"{json_path}: JSON 배열 형식이 아닙니다.")
+                pos += 1
+                state = 'first'
+                continue
+            if state in ('first', 'separator') and char == ']':
+                return
+            if state == 'separator':
+                if char != ',':
+                    raise ValueError(f"{json_path}: 배열 구분자(,)가 필요합니다 (위치 {pos}).")
+                pos += 1
+                state = 'item'
+                continue
+
+            # 원소 디코딩: 청크 경계에서 잘렸으면 다음 청크를 이어 붙여 재시도
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield item
+            pos = end
+            state = 'separator'
+
+
+def iter_json_lines(json_path: str) -> Iterator[dict]:
+    """JSON Lines 파일을 한 줄(상품 1개)씩 읽기"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_products(json_path: str) -> Iterator[dict]:
+    """확장자에 따라 JSON Lines(.jsonl, .ndjson) 또는 JSON 배열을 스트리밍으로 읽기"""
+    if Path(json_path).suffix in ('.jsonl', '.ndjson'):
+        return iter_json_lines(json_path)
+    return iter_json_array(json_path)
+
+
+def _source_fingerprint(json_path: str) -> dict:
+    """체크포인트가 같은 원본 파일에 대한 것인지 확인하기 위한 정보"""
+    stat = os.stat(json_path)
+    return {'source': os.path.abspath(json_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def load_checkpoint(checkpoint_path: str, json_path: str) -> int:
+    """
+    체크포인트에서 이미 처리한 상품 수 읽기
+    원본 파일이 바뀌었거나 체크포인트가 없으면 0
+    """
+    if not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('fingerprint') != _source_fingerprint(json_path):
+        print("Checkpoint is for a different source file, starting from the beginning")
+        return 0
+    return checkpoint.get('processed', 0)
 
-    # searchable_text 정제 및 임베딩 생성
+
+def save_checkpoint(checkpoint_path: str, json_path: str, processed: int):
+    """처리한 상품 수 저장 (임시 파일에 쓴 뒤 교체하여 중간에 죽어도 파일이 깨지지 않음)"""
+    directory = os.path.dirname(checkpoint_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': _source_fingerprint(json_path), 'processed': processed}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def skip_products(products: Iterable[dict], count: int, seen_ids: set = None) -> Iterator[dict]:
+    """앞에서 count개를 건너뛰기 (건너뛴 상품 id도 seen_ids에 기록)"""
+    for i, product in enumerate(products):
+        if i < count:
+            if seen_ids is not None:
+                seen_ids.add(product.get('id'))
+            continue
+        yield product
+
+
+def content_hash(product: dict) -> str:
+    """원본 상품 데이터 전체의 해시 (변경 감지용)"""
+    canonical = json.dumps(product, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    """searchable_text 해시 (DB의 encode(sha256(...), 'hex')와 동일)"""
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def product_row(product: dict, embedding: list) -> tuple:
+    """상품 딕셔너리를 PRODUCT_COLUMNS 순서의 INSERT 값으로 변환"""
     searchable_text = product.get('searchable_text', '')
-    cleaned_searchable_text = clean_text(searchable_text)
-
-    print(f"Processing: {product.get('product_name')} ({product.get('id')})")
-
-    # 임베딩 생성
-    embedding = get_embedding(searchable_text)
-
-    # INSERT 쿼리
-    insert_query = """
-    INSERT INTO loan_products (
-        id, product_code, product_name, product_summary, product_description,
-        target_description, loan_limit_description, loan_period_guide, repayment_method,
-        min_interest_rate, max_interest_rate, required_documents, customer_cost_info,
-        early_repayment_info, overdue_interest_info, important_notices,
-        is_available, is_sale_available, can_apply_online, can_apply_mobile,
-        can_apply_branch, registered_at, last_modified_at, searchable_text,
-        cleaned_searchable_text, searchable_text_embedding
-    ) VALUES (
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-    )
-    ON CONFLICT (id) DO UPDATE SET
-        product_name = EXCLUDED.product_name,
-        searchable_text = EXCLUDED.searchable_text,
-        cleaned_searchable_text = EXCLUDED.cleaned_searchable_text,
-        searchable_text_embedding = EXCLUDED.searchable_text_embedding
-    """
-
-    cursor.execute(insert_query, (
-        product.get('id'),
-        product.get('product_code'),
-        product.get('product_name'),
-        product.get('product_summary'),
-        product.get('product_description'),
-        product.get('target_description'),
-        product.get('loan_limit_description'),
-        product.get('loan_period_guide'),
-        product.get('repayment_method'),
-        product.get('min_interest_rate'),
-        product.get('max_interest_rate'),
-        product.get('required_documents'),
-        product.get('customer_cost_info'),
-        product.get('early_repayment_info'),
-        product.get('overdue_interest_info'),
-        product.get('important_notices'),
-        product.get('is_available'),
-        product.get('is_sale_available'),
-        product.get('can_apply_online'),
-        product.get('can_apply_mobile'),
-        product.get('can_apply_branch'),
-        product.get('registered_at'),
-        product.get('last_modified_at'),
-        searchable_text,
-        cleaned_searchable_text,
-        embedding
-    ))
+    values = {
+        **{column: product.get(column) for column in PRODUCT_COLUMNS},
+        'searchable_text': searchable_text,
+        'cleaned_searchable_text': clean_text(searchable_text),
+        'searchable_text_embedding': embedding,
+        'content_hash': content_hash(product),
+    }
+    return tuple(values[column] for column in PRODUCT_COLUMNS)
 
-    conn.commit()
+
+def insert_products_batch(
+    conn,
+    products: List[dict],
+    embeddings: List[list],
+    metadata_only: List[dict] = ()
+):
+    """
+    배치 단위 삽입
+    execute_values로 여러 행을 한 문장에 담아 하나의 트랜잭션으로 커밋합니다.
+    metadata_only: searchable_text는 그대로이고 다른 필드만 바뀐 상품 (기존 임베딩 유지)
+    """
+    rows = [product_row(product, embedding) for product, embedding in zip(products, embeddings)]
+    metadata_rows = [product_row(product, None) for product in metadata_only]
+
+    cursor = conn.cursor()
+    try:
+        if rows:
+            execute_values(cursor, upsert_sql("VALUES %s"), rows, page_size=len(rows))
+        if metadata_rows:
+            execute_values(
+                cursor, upsert_sql("VALUES %s", update_embedding=False),
+                metadata_rows, page_size=len(metadata_rows)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def fetch_existing_hashes(conn, ids: List[str]) -> dict:
+    """
+    DB에 저장된 상품의 해시 조회
+    Returns: {id: (content_hash, searchable_text 해시)}
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, content_hash, encode(sha256(convert_to(COALESCE(searchable_text, ''), 'UTF8')), 'hex')
+        FROM loan_products
+        WHERE id = ANY(%s)
+    """, (ids,))
+    existing = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
     cursor.close()
+    conn.commit()
+    return existing
+
+
+def plan_batch(batch: List[dict], existing: dict) -> tuple:
+    """
+    증분 수집 계획
+    Returns: (임베딩이 필요한 상품, 메타데이터만 바뀐 상품, 변경 없는 상품 수)
+    - 새 상품 또는 searchable_text가 바뀐 상품 → 재임베딩
+    - searchable_text는 같고 다른 필드만 바뀐 상품 → 임베딩 없이 갱신
+    - 원본 해시가 같은 상품 → 건너뜀
+    """
+    to_embed, metadata_only, unchanged = [], [], 0
+    for product in batch:
+        stored = existing.get(product.get('id'))
+        if stored is None:
+            to_embed.append(product)
+        elif stored[0] == content_hash(product):
+            unchanged += 1
+        elif stored[1] == text_hash(product.get('searchable_text', '')):
+            metadata_only.append(product)
+        else:
+            to_embed.append(product)
+    return to_embed, metadata_only, unchanged
+
+
+def _embed_batch(products: List[dict], budget: TokenBudget = None) -> tuple:
+    """
+    배치 임베딩 (워커 스레드에서 실행)
+    Returns: (임베딩 리스트, API 호출 시간(초))
+    """
+    if not products:
+        return [], 0.0
+    texts = [product.get('searchable_text', '') for product in products]
+    if budget is not None:
+        budget.acquire(sum(estimate_tokens(text) for text in texts))
+    start = time.perf_counter()
+    embeddings = get_embeddings(texts)
+    return embeddings, time.perf_counter() - start
+
+
+def _failed_future(error: Exception) -> Future:
+    """실패한 배치도 순서대로 처리하기 위해 예외를 담은 Future 생성"""
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def ingest_batches(
+    conn,
+    products: Iterable[dict],
+    batch_size: int = 100,
+    incremental: bool = False,
+    seen_ids: set = None,
+    on_batch_done: Callable[[int, bool], None] = None,
+    workers: int = 1,
+    budget: TokenBudget = None
+) -> dict:
+    """
+    배치 수집 파이프라인
+    상품을 batch_size개씩 묶어 배치당 임베딩 API 1회 호출 + DB 트랜잭션 1회로 저장합니다.
+    products는 리스트 또는 이터레이터 모두 가능하며, 메모리에는 진행 중인 배치만 올립니다.
+    incremental=True이면 해시를 비교하여 새 상품과 searchable_text가 바뀐 상품만 재임베딩합니다.
+    seen_ids를 주면 처리한 상품 id를 모두 기록합니다 (삭제 대상 판별용).
+    on_batch_done(배치 크기, 성공 여부)는 배치 순서대로 호출됩니다 (체크포인트 저장용).
+
+    임베딩은 workers개의 스레드에서 동시에 호출하고(budget으로 분당 토큰 제한),
+    DB 접근은 호출한 스레드 하나(단일 writer)에서만 배치 순서대로 수행합니다.
+    Returns: 처리 통계 (rows, embedded, metadata_only, skipped, failed, batches,
+             embed_seconds, db_seconds, throttle_seconds, embed_latencies)
+    """
+    stats = {
+        'rows': 0, 'embedded': 0, 'metadata_only': 0, 'skipped': 0, 'failed': 0,
+        'batches': 0, 'embed_seconds': 0.0, 'db_seconds': 0.0, 'throttle_seconds': 0.0,
+        'embed_latencies': []
+    }
+    workers = max(1, workers)
+    # 워커가 쉬지 않도록 워커 수의 2배까지 미리 제출 (메모리는 이 개수의 배치로 제한)
+    max_pending = workers * 2
+    pending = deque()
+
+    def write(number: int, batch: List[dict], plan: tuple, job: Future):
+        to_embed, metadata_only, unchanged = plan
+        try:
+            embeddings, latency = job.result()
+            if to_embed:
+                stats['embed_seconds'] += latency
+                stats['embed_latencies'].append(latency)
+
+            if to_embed or metadata_only:
+                start = time.perf_counter()
+                insert_products_batch(conn, to_embed, embeddings, metadata_only)
+                stats['db_seconds'] += time.perf_counter() - start
+
+            stats['rows'] += len(to_embed) + len(metadata_only)
+            stats['embedded'] += len(to_embed)
+            stats['metadata_only'] += len(metadata_only)
+            stats['skipped'] += unchanged
+            print(
+                f"  [batch {number}] embedded {len(to_embed)}, "
+                f"metadata-only {len(metadata_only)}, unchanged {unchanged}"
+            )
+            succeeded = True
+        except Exception as e:
+            conn.rollback()
+            stats['failed'] += len(batch)
+            print(f"  [batch {number}] Error: {e}")
+            succeeded = False
+
+        if on_batch_done is not None:
+            on_batch_done(len(batch), succeeded)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding") as executor:
+        for batch in chunked(products, batch_size):
+            stats['batches'] += 1
+            if seen_ids is not None:
+                seen_ids.update(product.get('id') for product in batch)
+
+            plan = (batch, [], 0)
+            try:
+                if incremental:
+                    start = time.perf_counter()
+                    existing = fetch_existing_hashes(conn, [product.get('id') for product in batch])
+                    stats['db_seconds'] += time.perf_counter() - start
+                    plan = plan_batch(batch, existing)
+                job = executor.submit(_embed_batch, plan[0], budget)
+            except Exception as e:
+                job = _failed_future(e)
+            pending.append((stats['batches'], batch, plan, job))
+
+            # 가장 오래된 배치부터 저장하여 체크포인트 순서 유지
+            while len(pending) >= max_pending:
+                write(*pending.popleft())
+
+        while pending:
+            write(*pending.popleft())
+
+    if budget is not None:
+        stats['throttle_seconds'] = budget.waited_seconds
+    return stats
+
+
+def delete_missing_products(conn, source_ids: set) -> int:
+    """원본에 없는 상품을 DB에서 삭제하고 삭제 건수 반환"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM loan_products WHERE NOT (id = ANY(%s))", (list(source_ids),))
+        deleted = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return deleted
+
+
+def print_throughput(stats: dict, elapsed: float):
+    """수집 처리량/지연시간 리포트 출력"""
+    rows_per_second = stats['rows'] / elapsed if elapsed > 0 else 0.0
+    print(f"\n{'='*80}")
+    print("수집 결과")
+    print(f"{'='*80}")
+    print(f"  저장: {stats['rows']}건 (임베딩 {stats['embedded']}건, 메타데이터만 {stats['metadata_only']}건), 실패: {stats['failed']}건, 배치: {stats['batches']}개")
+    print(f"  변경 없음(건너뜀): {stats['skipped']}건")
+    if 'deleted' in stats:
+        print(f"  삭제: {stats['deleted']}건")
+    print(f"  전체 시간: {elapsed:.2f}s (임베딩 누적 {stats['embed_seconds']:.2f}s, DB {stats['db_seconds']:.2f}s)")
+    if stats.get('throttle_seconds'):
+        print(f"  토큰 한도 대기: {stats['throttle_seconds']:.2f}s")
+    latencies = sorted(stats.get('embed_latencies', []))
+    if latencies:
+        p50 = latencies[(len(latencies) - 1) // 2]
+        p95 = latencies[max(0, -(-len(latencies) * 95 // 100) - 1)]
+        print(f"  임베딩 API 지연시간 (배치당): p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms, max {latencies[-1] * 1000:.0f}ms")
+    print(f"  처리량: {rows_per_second:.1f} rows/s")
 
 
 def main():
     """메인 함수"""
-    import sys
+    default_source = Path(__file__).parent.parent / "loan_products.json"
 
-    # JSON 파일 경로
-    json_path = Path(__file__).parent.parent / "loan_products.json"
+    parser = argparse.ArgumentParser(description="대출 상품 데이터 로드")
+    parser.add_argument("limit", type=int, nargs="?", default=None, help="앞에서부터 로드할 상품 개수 (선택)")
+    parser.add_argument("--source", type=str, default=str(default_source), help="상품 파일 경로 (.json 배열 또는 .jsonl)")
+    parser.add_argument("--batch-size", type=int, default=100, help="임베딩 API 1회 호출/트랜잭션 1회당 상품 수")
+    parser.add_argument("--incremental", action="store_true", help="바뀐 상품만 재임베딩하고 원본에 없는 상품 삭제")
+    parser.add_argument("--workers", type=int, default=EMBEDDING_WORKERS, help="동시 임베딩 워커 수")
+    parser.add_argument("--tpm", type=int, default=EMBEDDING_TPM_LIMIT, help="임베딩 분당 토큰 한도 (0이면 제한 없음)")
+    parser.add_argument("--checkpoint", type=str, default=".cache/load_data.checkpoint.json", help="체크포인트 파일 경로")
+    parser.add_argument("--resume", action="store_true", help="체크포인트 이후부터 이어서 수집")
+    parser.add_argument("--skip-migrate", action="store_true", help="로드 후 인덱스 마이그레이션 생략")
+    parser.add_argument("--vector-index", choices=list(VECTOR_INDEX_NAMES), default="hnsw", help="생성할 벡터 인덱스 종류")
+    parser.add_argument("--chunks", action="store_true", help="긴 필드(상품 설명, 유의사항, 필요 서류)를 청크로 색인")
+    parser.add_argument("--quantization", choices=VECTOR_QUANTIZATIONS, default="none", help="양자화 벡터 인덱스 추가 생성 (halfvec, binary)")
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS, help="양자화 인덱스에 사용할 앞쪽 차원 수 (예: 512)")
+    args = parser.parse_args()
 
-    if not json_path.exists():
+    json_path = args.source
+
+    if not os.path.exists(json_path):
         print(f"Error: {json_path} 파일을 찾을 수 없습니다.")
         return
 
-    # JSON 데이터 로드
-    print("Loading JSON data...")
-    products = load_json_data(str(json_path))
-    print(f"Total products: {len(products)}")
+    # 상품 데이터 스트리밍 (파일 전체를 메모리에 올리지 않음)
+    print(f"Streaming products from {json_path}...")
+    products = iter_products(json_path)
 
     # 제한된 개수만 로드 (선택적)
-    limit = None
-    if len(sys.argv) > 1:
-        limit = int(sys.argv[1])
-        products = products[:limit]
-        print(f"Loading only first {limit} products...")
+    if args.limit is not None:
+        products = itertools.islice(products, args.limit)
+        print(f"Loading only first {args.limit} products...")
+
+    # 체크포인트 이후부터 재개
+    seen_ids = set()
+    resumed_from = load_checkpoint(args.checkpoint, json_path) if args.resume else 0
+    if resumed_from:
+        print(f"Resuming after {resumed_from} products (checkpoint: {args.checkpoint})")
+        products = skip_products(products, resumed_from, seen_ids)
 
     # 데이터베이스 연결
     print("\nConnecting to database...")
     conn = psycopg2.connect(DATABASE_URL)
 
-    # 데이터 삽입
-    print("\nInserting products...")
-    for i, product in enumerate(products, 1):
-        try:
-            insert_product(conn, product)
-            print(f"  [{i}/{len(products)}] Inserted successfully")
-        except Exception as e:
-            print(f"  [{i}/{len(products)}] Error: {e}")
-            conn.rollback()
+    # content_hash 컬럼 확인 (증분 수집용)
+    ensure_ingest_columns(conn)
+
+    # 성공한 배치까지만 체크포인트 전진 (실패한 배치가 있으면 재개 시 그 배치부터 다시 처리)
+    progress = {'processed': resumed_from, 'healthy': True}
+
+    def on_batch_done(batch_size: int, succeeded: bool):
+        if not succeeded:
+            progress['healthy'] = False
+        if progress['healthy']:
+            progress['processed'] += batch_size
+            save_checkpoint(args.checkpoint, json_path, progress['processed'])
+
+    # 데이터 삽입 (배치 단위)
+    mode = "incremental" if args.incremental else "full"
+    budget = TokenBudget(args.tpm) if args.tpm > 0 else None
+    print(
+        f"\nInserting products ({mode}, batch size {args.batch_size}, "
+        f"workers {args.workers}, TPM limit {args.tpm or 'none'})..."
+    )
+    start = time.perf_counter()
+    stats = ingest_batches(
+        conn, products,
+        batch_size=args.batch_size,
+        incremental=args.incremental,
+        seen_ids=seen_ids,
+        on_batch_done=on_batch_done,
+        workers=args.workers,
+        budget=budget
+    )
+
+    # 원본에 없는 상품 삭제 (일부만 로드했거나 실패한 배치가 있으면 건너뜀)
+    if args.incremental:
+        if args.limit is not None or stats['failed'] or not seen_ids:
+            print("\nSkipping deletion of missing products (partial load)")
+        else:
+            stats['deleted'] = delete_missing_products(conn, seen_ids)
+
+    print_throughput(stats, time.perf_counter() - start)
+
+    # 청크 색인 (상품 저장 후 실행, 내용이 바뀐 청크만 재임베딩)
+    chunk_stats = {}
+    if args.chunks:
+        # chunking은 load_data의 임베딩 함수를 사용하므로 여기서 import
+        from chunking import ingest_chunks
+
+        ensure_chunk_table(conn)
+        chunk_products = iter_products(json_path)
+        if args.limit is not None:
+            chunk_products = itertools.islice(chunk_products, args.limit)
+        print("\nIndexing product chunks...")
+        chunk_stats = ingest_chunks(conn, chunk_products, batch_size=args.batch_size, budget=budget)
+        print(
+            f"  청크: {chunk_stats['chunks']}개 (임베딩 {chunk_stats['embedded']}, "
+            f"변경 없음 {chunk_stats['unchanged']}, 삭제 {chunk_stats['deleted']}, 실패 상품 {chunk_stats['failed']})"
+        )
+
+    # 상품이 바뀌었으면 카탈로그 버전을 올려 검색 프로세스의 메모리 인덱스가 다시 로드되도록 함
+    if stats['rows'] or stats.get('deleted') or chunk_stats.get('embedded') or chunk_stats.get('deleted'):
+        print(f"Catalog version: {bump_catalog_version(conn)}")
+
+    # 모두 성공하면 체크포인트 삭제
+    if progress['healthy'] and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    # 검색 인덱스 생성 (IVFFlat은 데이터가 있어야 하므로 로드 후 실행)
+    if not args.skip_migrate:
+        print("\nCreating search indexes...")
+        migrate(conn, vector_index=args.vector_index)
+        migrate_quantized_index(conn, args.quantization, args.dimensions)
+        if args.chunks:
+            migrate_chunks(conn)
 
     # 연결 종료
     conn.close()
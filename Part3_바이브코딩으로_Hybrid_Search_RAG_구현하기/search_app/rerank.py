@@ -0,0 +1,219 @@
+"""
+재정렬(rerank) 단계
+결합(RRF 등) 상위 N개 후보를 질문과 함께 다시 점수화하여 상위 limit개의 순서를 개선합니다.
+상위 3개가 더 정확해지면 retrieve_node가 생성 프롬프트에 넘기는 문서 수를 줄일 수 있습니다.
+
+- cross_encoder: 로컬 cross-encoder (sentence-transformers, 선택 의존성)
+- llm: gpt-5-mini에 후보 전체를 한 번에 보내 0~10점으로 채점
+
+모든 후보는 한 번의 호출로 점수화합니다. RERANK_BUDGET_MS 안에 끝나지 않거나 실패하면
+결합 순서를 그대로 사용합니다 (fallback). 재정렬기 생성(모델 로드)도 한도와 fallback 안에서 실행합니다.
+채점 스레드가 모두 사용 중이면(시간 초과된 채점이 아직 실행 중인 경우 포함) 대기열에 쌓지 않고 바로 fallback합니다.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Tuple
+from dotenv import load_dotenv
+
+# 환경변수 로드
+load_dotenv()
+
+# 재정렬할 결합 상위 후보 수
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "10"))
+# 재정렬 지연시간 한도 (밀리초), 넘으면 결합 순서 사용
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "1500"))
+# 다국어(한국어 포함) cross-encoder
+RERANK_CROSS_ENCODER_MODEL = os.getenv("RERANK_CROSS_ENCODER_MODEL", "BAAI/bge-reranker-v2-m3")
+RERANK_LLM_MODEL = os.getenv("RERANK_LLM_MODEL", "gpt-5-mini")
+# gpt-5 계열은 기본 추론 단계 때문에 한도 안에 끝나기 어려우므로 minimal 사용 (빈 값이면 전달하지 않음, 비추론 모델용)
+RERANK_LLM_REASONING_EFFORT = os.getenv("RERANK_LLM_REASONING_EFFORT", "minimal")
+# 동시에 실행할 수 있는 채점 수 (넘으면 대기 없이 fallback)
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "4"))
+
+# 후보 문서 텍스트로 사용할 상품 컬럼
+DOCUMENT_FIELDS = ('product_name', 'product_summary', 'target_description', 'loan_limit_description')
+
+_rerankers = {}
+_rerankers_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+# 실행 중인 채점 수 제한 (채점이 끝나야 반납되므로 시간 초과된 채점도 자리를 차지함)
+_slots = threading.BoundedSemaphore(RERANK_WORKERS)
+
+# 재정렬 통계 (rerank_stats()로 조회)
+_stats = {'calls': 0, 'reranked': 0, 'timeouts': 0, 'errors': 0, 'skipped': 0, 'total_ms': 0.0}
+_stats_lock = threading.Lock()
+
+
+def document_text(product: Dict) -> str:
+    """채점에 사용할 상품 텍스트 (상품명, 요약, 대상, 한도 + 청크 검색의 일치 구간)"""
+    parts = [str(product[field]) for field in DOCUMENT_FIELDS if product.get(field)]
+    parts.extend(passage['content'] for passage in product.get('passages', []))
+    return "\n".join(parts)
+
+
+class CrossEncoderReranker:
+    """로컬 cross-encoder (모델은 최초 사용 시 로드)"""
+
+    def __init__(self, model_name: str = None):
+        # sentence-transformers는 이 재정렬기를 사용할 때만 필요
+        from sentence_transformers import CrossEncoder
+        self.model_name = model_name or RERANK_CROSS_ENCODER_MODEL
+        self.model = CrossEncoder(self.model_name)
+
+    def score(self, query: str, documents: List[str], timeout: float = None) -> List[float]:
+        """(질문, 문서) 쌍 전체를 한 번의 배치로 점수화"""
+        scores = self.model.predict([(query, document) for document in documents])
+        return [float(score) for score in scores]
+
+
+class LLMReranker:
+    """후보 전체를 한 번의 채팅 호출로 채점하는 LLM 재정렬기"""
+
+    PROMPT = """당신은 농협 대출 상품 검색 결과를 평가하는 전문가입니다.
+질문에 대해 각 후보 상품이 얼마나 관련 있는지 0~10점으로 채점하세요.
+10점: 질문이 찾는 상품, 5점: 관련 있지만 조건이 다름, 0점: 관련 없음
+
+반드시 후보 순서대로 JSON으로만 답변하세요: {"scores": [점수, ...]}"""
+
+    def __init__(self, model: str = None, client=None, reasoning_effort: str = None):
+        from openai import OpenAI
+        self.model = model or RERANK_LLM_MODEL
+        self.client = client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.reasoning_effort = RERANK_LLM_REASONING_EFFORT if reasoning_effort is None else reasoning_effort
+
+    def score(self, query: str, documents: List[str], timeout: float = None) -> List[float]:
+        candidates = "\n\n".join(f"[후보 {i}]\n{document}" for i, document in enumerate(documents, 1))
+        options = {"reasoning_effort": self.reasoning_effort} if self.reasoning_effort else {}
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.PROMPT},
+                {"role": "user", "content": f"질문: {query}\n\n{candidates}"},
+            ],
+            response_format={"type": "json_object"},
+            timeout=timeout,
+            **options
+        )
+        scores = json.loads(response.choices[0].message.content)["scores"]
+        return [float(score) for score in scores]
+
+
+# 이름 → 재정렬기 생성 함수 (다른 재정렬기를 추가하려면 여기에 등록)
+RERANKERS: Dict[str, Callable] = {
+    "cross_encoder": CrossEncoderReranker,
+    "llm": LLMReranker,
+}
+
+
+def get_reranker(name: str):
+    """이름으로 재정렬기 반환 (모델 로드 비용이 크므로 프로세스당 한 번만 생성)"""
+    if name not in RERANKERS:
+        raise ValueError(f"Unknown reranker: {name} (choose from {tuple(RERANKERS)})")
+    if name not in _rerankers:
+        with _rerankers_lock:
+            if name not in _rerankers:
+                _rerankers[name] = RERANKERS[name]()
+    return _rerankers[name]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """지연시간 한도를 적용하기 위한 채점 스레드 풀"""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+    return _executor
+
+
+def rerank(
+    query: str,
+    products: List[Dict],
+    reranker,
+    limit: int,
+    budget_ms: float = None
+) -> Tuple[List[Dict], bool]:
+    """
+    결합 순서의 후보 products를 재정렬하여 상위 limit개 반환
+    reranker는 재정렬기 또는 RERANKERS의 이름이며, 이름이면 채점 스레드에서 생성합니다 (최초 모델 로드 포함).
+    budget_ms 안에 채점이 끝나지 않거나 실패하면(재정렬기 생성 실패 포함) 결합 순서의 상위 limit개를 반환합니다.
+    채점 스레드가 모두 사용 중이면 채점하지 않고 결합 순서를 반환합니다.
+    재정렬된 상품에는 rerank_score가 추가되고, rrf_score는 그대로 유지됩니다.
+    Returns: (상품 목록, 성공 여부) - fallback이면 False (후보가 1개 이하면 채점 없이 True)
+    """
+    if budget_ms is None:
+        budget_ms = RERANK_BUDGET_MS
+    if len(products) <= 1:
+        return products[:limit], True
+
+    if not _slots.acquire(blocking=False):
+        _record(0.0, 'skipped')
+        print("Rerank workers busy, using fused order", file=sys.stderr)
+        return products[:limit], False
+
+    budget = budget_ms / 1000
+    start = time.perf_counter()
+    try:
+        future = _get_executor().submit(_score, reranker, query, [document_text(p) for p in products], budget)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        scores = future.result(timeout=budget)
+        if len(scores) != len(products):
+            raise ValueError(f"Expected {len(products)} scores, got {len(scores)}")
+    except FutureTimeoutError:
+        # 채점은 백그라운드에서 끝나도록 두고 결과만 버림
+        _record(time.perf_counter() - start, 'timeouts')
+        print(f"Rerank exceeded {budget_ms:.0f}ms budget, using fused order", file=sys.stderr)
+        return products[:limit], False
+    except Exception as e:
+        _record(time.perf_counter() - start, 'errors')
+        print(f"Rerank failed ({e}), using fused order", file=sys.stderr)
+        return products[:limit], False
+    _record(time.perf_counter() - start, 'reranked')
+
+    # 점수 내림차순, 동점은 결합 순서 유지 (안정 정렬)
+    order = sorted(range(len(products)), key=lambda i: scores[i], reverse=True)
+    results = []
+    for i in order[:limit]:
+        result = products[i].copy()
+        result['rerank_score'] = scores[i]
+        results.append(result)
+    return results, True
+
+
+def _score(reranker, query: str, documents: List[str], timeout: float) -> List[float]:
+    """채점 스레드에서 실행 (이름이면 재정렬기 생성부터)"""
+    if isinstance(reranker, str):
+        reranker = get_reranker(reranker)
+    return reranker.score(query, documents, timeout)
+
+
+def _record(elapsed: float, outcome: str):
+    with _stats_lock:
+        _stats['calls'] += 1
+        _stats[outcome] += 1
+        _stats['total_ms'] += elapsed * 1000
+
+
+def rerank_stats() -> dict:
+    """재정렬 호출 수, 적용/시간 초과/실패/건너뜀(채점 스레드 포화) 횟수, fallback 비율, 평균 지연시간(ms)"""
+    with _stats_lock:
+        calls = _stats['calls']
+        return {
+            'calls': calls,
+            'reranked': _stats['reranked'],
+            'timeouts': _stats['timeouts'],
+            'errors': _stats['errors'],
+            'skipped': _stats['skipped'],
+            'fallback_rate': (calls - _stats['reranked']) / calls if calls else 0.0,
+            'avg_latency_ms': _stats['total_ms'] / calls if calls else 0.0,
+        }
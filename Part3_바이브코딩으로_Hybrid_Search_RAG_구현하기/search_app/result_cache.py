@@ -0,0 +1,148 @@
+"""
+검색 결과 캐시
+Vercel 채팅 앱과 LangGraph CLI에서 반복되는 질문은 BM25/벡터 레그와 임베딩 호출 없이 바로 응답합니다.
+
+- 키: clean_text(query) + limit + 결과에 영향을 주는 검색 옵션(엔진, 백엔드, 결합 전략, 후보 수)
+- 값: 결합 순서대로 정렬된 상품 딕셔너리 목록
+- 프로세스 내 LRU 캐시 (TTL 적용, 최대 항목 수 제한)
+- 무효화: load_data.py가 상품을 바꾸면 카탈로그 버전(schema.bump_catalog_version)이 올라가고,
+  캐시는 RESULT_CACHE_VERSION_CHECK_INTERVAL초마다 버전을 확인하여 바뀌었으면 전체를 비웁니다.
+  같은 프로세스에서 즉시 비우려면 invalidate()를 호출합니다.
+"""
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+class SearchResultCache:
+    """
+    TTL + LRU 검색 결과 캐시
+    version_source를 주면 check_interval마다 호출하여 카탈로그 버전이 바뀌었을 때 캐시를 비웁니다.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: float = 300,
+        version_source: Optional[Callable[[], int]] = None,
+        check_interval: float = 30,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version_source = version_source
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (ids, products, expires_at)
+        self._version = None
+        self._checked_at = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, version_source: Optional[Callable[[], int]] = None) -> "SearchResultCache":
+        """
+        환경변수로 캐시 생성
+        - SEARCH_RESULT_CACHE_SIZE: LRU 최대 항목 수 (0이면 비활성화, 기본값 256)
+        - SEARCH_RESULT_CACHE_TTL: 항목 TTL 초 (기본값 300)
+        - RESULT_CACHE_VERSION_CHECK_INTERVAL: 카탈로그 버전 확인 주기 초 (기본값 30)
+        """
+        return cls(
+            max_size=int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("SEARCH_RESULT_CACHE_TTL", "300")),
+            version_source=version_source,
+            check_interval=float(os.getenv("RESULT_CACHE_VERSION_CHECK_INTERVAL", "30"))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(cleaned_query: str, limit: int, options: Optional[dict] = None) -> str:
+        """정제된 쿼리 + limit + 검색 옵션 (옵션은 이름순으로 고정하여 같은 옵션이면 같은 키)"""
+        options = options or {}
+        parts = [f"{name}={options[name]!r}" for name in sorted(options)]
+        return "|".join([cleaned_query, str(limit)] + parts)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """캐시된 상품 목록 (호출자가 수정해도 캐시는 그대로 유지되도록 복사본 반환), 없으면 None"""
+        if not self.enabled:
+            return None
+        self._check_version()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                products, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(products)
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def set(self, key: str, products: List[Dict]):
+        """저장하고 초과분은 가장 오래 안 쓴 항목부터 제거"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(products), self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """모든 항목 제거 (상품이 바뀌었을 때 호출, 통계는 유지)"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def _check_version(self):
+        """check_interval마다 카탈로그 버전을 확인하고, 바뀌었으면 전체 무효화"""
+        if self.version_source is None:
+            return
+        now = self._clock()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            # 다른 스레드가 같은 시점에 중복 확인하지 않도록 먼저 기록
+            self._checked_at = now
+
+        version = self.version_source()
+        with self._lock:
+            if self._version is not None and version != self._version and self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def clear(self):
+        """캐시 항목과 통계 초기화"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def stats(self) -> dict:
+        """히트/미스/제거/무효화 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+            }
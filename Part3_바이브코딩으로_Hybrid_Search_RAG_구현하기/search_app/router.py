@@ -0,0 +1,182 @@
+"""
+빠른 질문 라우터
+route_node가 매번 gpt-5-mini를 호출하지 않도록 규칙과 임베딩 유사도로 먼저 "search"/"direct"를 판단합니다.
+
+1. 규칙: 상품명이 들어간 질문은 search, 대출 상품의 조건(한도, 금리, 서류 등)을 묻는 질문은 search,
+   인사/감사 같은 일상 대화와 용어 설명 질문은 direct.
+   "감사합니다. 공무원 대출 한도는?"처럼 direct 규칙과 search 규칙이 모두 맞으면 규칙으로 정하지 않고 다음 단계로 넘김
+   (잘못된 direct는 상품 정보 없이 답변을 지어내므로 더 비싼 오류)
+2. 임베딩: 라벨링된 예시 질문과의 코사인 유사도로 분류 (라벨별 최고 유사도 차이가 ROUTER_MARGIN 이상일 때만)
+3. 둘 다 확신이 없으면 None을 반환하고, 호출자가 LLM으로 판단합니다 (fallback)
+
+질문 임베딩은 hybrid_search.get_embedding()(쿼리 임베딩 캐시)으로 만들므로, 검색으로 라우팅되면
+벡터 레그는 같은 임베딩을 캐시에서 재사용합니다.
+"""
+import os
+import re
+import threading
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+# 환경변수 로드
+load_dotenv()
+
+# 임베딩 분류를 신뢰하는 최소 유사도 차이 (search 최고 유사도 - direct 최고 유사도의 절댓값)
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.05"))
+
+# 상품명/상품 종류 (가장 먼저 확인, "햇살론이란?"도 검색)
+PRODUCT_PATTERNS = [
+    r"(햇살론|전세자금|주택담보|신용대출|생활안정자금|운전자금|정책자금|마이너스\s*통장)",
+]
+
+# 일상 대화와 일반 용어 설명 (상품 검색 불필요)
+DIRECT_PATTERNS = [
+    r"^(안녕|반가워|반갑습니다|하이)",
+    r"^(hello|hi)\b",
+    r"(고마워|고맙습니다|감사합니다|감사해요)",
+    r"(누구세요|누구야|뭐 할 수 있|무엇을 할 수 있)",
+    r"(이란|란|이 뭐|가 뭐)\s*(무엇|뭔가요|뭐예요|뭐에요|무엇인가요)",
+    r"(뜻이|의미가|차이가)\s*(뭐|무엇)",
+]
+
+# 대출 상품 정보가 필요한 질문 (대출/자금/상품 + 조건, 존재 여부, 추천)
+SEARCH_PATTERNS = [
+    r"(대출|자금|상품).*(한도|금리|이자율|자격|조건|대상|서류|수수료|기간|우대)",
+    r"(대출|자금|상품)\s*(이|가|은|는)?\s*(있|추천|알려|찾|종류|신청)",
+]
+
+# 임베딩 분류용 라벨링된 예시 질문
+EXEMPLARS = {
+    "search": [
+        "의사 전용 대출이 있나요?",
+        "공무원 대출 한도는?",
+        "농업인 운전자금 대출 금리 알려주세요",
+        "햇살론 신청 자격이 어떻게 되나요?",
+        "전세자금대출 필요 서류는 뭔가요?",
+        "모바일로 신청 가능한 신용대출 추천해주세요",
+        "청년 대상 대출 상품 있어?",
+        "중도상환 수수료 없는 대출 찾고 있어요",
+        "귀농 자금 지원 대출 상품",
+        "직장인 마이너스 통장 조건",
+    ],
+    "direct": [
+        "안녕하세요",
+        "대출이란 무엇인가요?",
+        "고마워요",
+        "신용점수는 어떻게 올리나요?",
+        "금리가 오르면 왜 이자가 늘어나나요?",
+        "당신은 누구인가요?",
+        "오늘 날씨 어때?",
+        "원리금균등상환과 원금균등상환의 차이를 설명해줘",
+        "상담 시간이 어떻게 되나요?",
+        "도와줘서 감사합니다",
+    ],
+}
+
+
+class FastRouter:
+    """
+    규칙 → 임베딩 유사도 순서로 판단하는 라우터
+    embed(text)와 embed_many(texts)를 주입할 수 있습니다 (테스트, 다른 임베딩 모델).
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], list] = None,
+        embed_many: Callable[[List[str]], List[list]] = None,
+        exemplars: dict = None,
+        margin: float = None
+    ):
+        self._embed = embed
+        self._embed_many = embed_many
+        self.exemplars = exemplars or EXEMPLARS
+        self.margin = ROUTER_MARGIN if margin is None else margin
+        self._product = [re.compile(pattern) for pattern in PRODUCT_PATTERNS]
+        self._direct = [re.compile(pattern, re.IGNORECASE) for pattern in DIRECT_PATTERNS]
+        self._search = [re.compile(pattern, re.IGNORECASE) for pattern in SEARCH_PATTERNS]
+        self._matrices = None
+        self._lock = threading.Lock()
+        self._stats = {'rule': 0, 'embedding': 0, 'fallback': 0}
+
+    def classify(self, question: str) -> Tuple[Optional[str], str]:
+        """
+        Returns: (판단, 방법) - 방법은 "rule", "embedding", "fallback"
+        fallback이면 판단은 None이며 호출자가 LLM으로 결정합니다.
+        """
+        decision = self.rule_decision(question)
+        method = "rule"
+        if decision is None:
+            decision = self.embedding_decision(question)
+            method = "embedding" if decision is not None else "fallback"
+        with self._lock:
+            self._stats[method] += 1
+        return decision, method
+
+    def rule_decision(self, question: str) -> Optional[str]:
+        """
+        규칙으로 판단 (맞는 규칙이 없거나 direct/search 규칙이 함께 맞으면 None)
+        상품명이 들어가면 인사/용어 질문 형태여도 search ("햇살론이란 무엇인가요?")
+        """
+        text = question.strip()
+        if any(pattern.search(text) for pattern in self._product):
+            return "search"
+        direct = any(pattern.search(text) for pattern in self._direct)
+        search = any(pattern.search(text) for pattern in self._search)
+        if direct and search:
+            return None
+        if direct:
+            return "direct"
+        if search:
+            return "search"
+        return None
+
+    def embedding_decision(self, question: str) -> Optional[str]:
+        """예시 질문과의 코사인 유사도로 판단 (라벨별 최고 유사도 차이가 margin 미만이면 None)"""
+        matrices = self._exemplar_matrices()
+        query = _normalize(np.asarray(self._get_embed()(question), dtype=np.float32))
+        best = {label: float(np.max(matrix @ query)) for label, matrix in matrices.items()}
+        difference = best["search"] - best["direct"]
+        if abs(difference) < self.margin:
+            return None
+        return "search" if difference > 0 else "direct"
+
+    def _exemplar_matrices(self) -> dict:
+        """예시 질문 임베딩 (최초 한 번 배치로 생성, 행 단위 정규화)"""
+        if self._matrices is None:
+            with self._lock:
+                if self._matrices is None:
+                    embed_many = self._embed_many or _default_embed_many
+                    self._matrices = {
+                        label: _normalize(np.asarray(embed_many(texts), dtype=np.float32))
+                        for label, texts in self.exemplars.items()
+                    }
+        return self._matrices
+
+    def _get_embed(self) -> Callable[[str], list]:
+        if self._embed is None:
+            # 검색 경로와 같은 쿼리 임베딩 캐시 사용
+            from hybrid_search import get_embedding
+            self._embed = get_embedding
+        return self._embed
+
+    def stats(self) -> dict:
+        """방법별 판단 횟수와 LLM fallback 비율"""
+        with self._lock:
+            total = sum(self._stats.values())
+            return {
+                **self._stats,
+                'total': total,
+                'fallback_rate': self._stats['fallback'] / total if total else 0.0,
+            }
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _default_embed_many(texts: List[str]) -> List[list]:
+    # 예시 질문은 한 번의 API 호출로 임베딩 (load_data의 재시도 로직 사용)
+    from load_data import get_embeddings
+    return get_embeddings(texts)
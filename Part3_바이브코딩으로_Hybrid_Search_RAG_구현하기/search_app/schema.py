@@ -0,0 +1,388 @@
+"""
+검색 인덱스 마이그레이션
+BM25(pg_search)와 벡터(pgvector) 인덱스를 한 번만 생성합니다.
+검색 경로(hybrid_search.py)는 인덱스가 이미 있다고 가정하므로, 데이터 로드 후 반드시 실행해야 합니다.
+
+사용법:
+    uv run python schema.py                          # HNSW 벡터 인덱스 생성
+    uv run python schema.py --vector-index ivfflat   # IVFFlat 벡터 인덱스 생성
+    uv run python schema.py --check                  # 인덱스 존재 여부만 확인
+    uv run python schema.py --chunks                 # 청크 테이블(loan_product_chunks) 인덱스까지 생성
+    uv run python schema.py --quantization halfvec --dimensions 512   # 양자화/축소 차원 벡터 인덱스 추가
+"""
+import sys
+import argparse
+from psycopg2 import errors
+from db_pool import get_connection
+
+BM25_INDEX_NAME = "idx_loan_products_bm25"
+VECTOR_INDEX_NAMES = {
+    "hnsw": "idx_loan_products_embedding_hnsw",
+    "ivfflat": "idx_loan_products_embedding_ivfflat",
+}
+
+# 벡터 양자화 (원본 float 컬럼은 그대로 두고 식 인덱스만 압축, 검색은 원본 벡터로 재점수화)
+# - "none": float32 그대로 (dimensions < EMBEDDING_DIMENSIONS일 때만 별도 인덱스)
+# - "halfvec": float16 (인덱스 크기 약 1/2)
+# - "binary": 차원당 1비트 (binary_quantize, 해밍 거리, 인덱스 크기 약 1/32)
+# dimensions를 줄이면 앞쪽 dimensions개 차원만 사용합니다. text-embedding-3 임베딩은 앞부분을 잘라도
+# 코사인 유사도가 유지되도록 학습되어 있어 API의 dimensions 파라미터와 같은 효과입니다.
+EMBEDDING_DIMENSIONS = 1536
+VECTOR_QUANTIZATIONS = ("none", "halfvec", "binary")
+# 양자화별 (opclass, 거리 연산자)
+QUANTIZATION_OPS = {
+    "none": ("vector_cosine_ops", "<=>"),
+    "halfvec": ("halfvec_cosine_ops", "<=>"),
+    "binary": ("bit_hamming_ops", "<~>"),
+}
+
+# 동시에 여러 프로세스가 마이그레이션을 실행해도 한 번만 생성되도록 advisory lock 사용
+MIGRATION_LOCK_ID = 7301
+
+# ngram 토크나이저 사용: 한글 검색을 위해 필수 (BM25_ISSUE_REPORT.md 참고)
+BM25_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS {BM25_INDEX_NAME}
+ON loan_products
+USING bm25(id, cleaned_searchable_text)
+WITH (key_field='id', text_fields='{{"cleaned_searchable_text": {{"tokenizer": {{"type": "ngram", "min_gram": 2, "max_gram": 3, "prefix_only": false}}}}}}');
+"""
+
+# 코사인 거리(<=>) 검색에 맞춰 vector_cosine_ops 사용
+HNSW_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAMES['hnsw']}
+ON loan_products
+USING hnsw (searchable_text_embedding vector_cosine_ops)
+WITH (m = %(m)s, ef_construction = %(ef_construction)s);
+"""
+
+IVFFLAT_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAMES['ivfflat']}
+ON loan_products
+USING ivfflat (searchable_text_embedding vector_cosine_ops)
+WITH (lists = %(lists)s);
+"""
+
+
+# 긴 필드(상품 설명, 유의사항, 필요 서류) 청크 테이블 (chunking.py, load_data.py --chunks)
+# 상품이 삭제되면 청크도 함께 삭제됩니다.
+CHUNK_BM25_INDEX_NAME = "idx_loan_product_chunks_bm25"
+CHUNK_VECTOR_INDEX_NAME = "idx_loan_product_chunks_embedding_hnsw"
+
+CHUNKS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS loan_product_chunks (
+    id TEXT PRIMARY KEY,
+    product_id TEXT NOT NULL REFERENCES loan_products(id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    cleaned_content TEXT NOT NULL,
+    embedding vector(1536),
+    content_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_loan_product_chunks_product_id ON loan_product_chunks (product_id);
+"""
+
+CHUNK_BM25_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS {CHUNK_BM25_INDEX_NAME}
+ON loan_product_chunks
+USING bm25(id, cleaned_content)
+WITH (key_field='id', text_fields='{{"cleaned_content": {{"tokenizer": {{"type": "ngram", "min_gram": 2, "max_gram": 3, "prefix_only": false}}}}}}');
+"""
+
+CHUNK_HNSW_INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS {CHUNK_VECTOR_INDEX_NAME}
+ON loan_product_chunks
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = %(m)s, ef_construction = %(ef_construction)s);
+"""
+
+
+def quantized_expression(vector_sql: str, quantization: str, dimensions: int) -> str:
+    """벡터 SQL 식(컬럼 또는 %s::vector)을 양자화/축소 차원 식으로 변환 (인덱스와 쿼리가 같은 식을 사용해야 함)"""
+    if quantization not in VECTOR_QUANTIZATIONS:
+        raise ValueError(f"Unknown vector quantization: {quantization} (choose from {VECTOR_QUANTIZATIONS})")
+    if not 0 < dimensions <= EMBEDDING_DIMENSIONS:
+        raise ValueError(f"dimensions must be between 1 and {EMBEDDING_DIMENSIONS}: {dimensions}")
+    truncated = f"subvector({vector_sql}, 1, {int(dimensions)})"
+    if quantization == "binary":
+        return f"binary_quantize({truncated})::bit({int(dimensions)})"
+    if quantization == "halfvec":
+        return f"{truncated}::halfvec({int(dimensions)})"
+    return f"{truncated}::vector({int(dimensions)})"
+
+
+def quantized_index_name(quantization: str, dimensions: int) -> str:
+    return f"idx_loan_products_embedding_hnsw_{quantization}_{int(dimensions)}"
+
+
+def is_quantized(quantization: str, dimensions: int) -> bool:
+    """원본 float 컬럼 인덱스 대신 식 인덱스 + 재점수화를 사용하는지 여부"""
+    return quantization != "none" or dimensions != EMBEDDING_DIMENSIONS
+
+
+# 증분 수집에 사용하는 컬럼 (원본 상품 데이터 해시)
+INGEST_COLUMNS_SQL = """
+ALTER TABLE loan_products ADD COLUMN IF NOT EXISTS content_hash TEXT;
+"""
+
+# 카탈로그 버전 (load_data.py가 상품을 바꿀 때마다 1 증가)
+# 검색 프로세스의 메모리 인덱스/캐시가 이 값을 보고 다시 로드할지 판단합니다.
+CATALOG_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS search_catalog_state (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+INSERT INTO search_catalog_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+"""
+
+
+class SchemaError(RuntimeError):
+    """검색에 필요한 인덱스가 없을 때 발생"""
+
+
+def migrate(
+    conn,
+    vector_index: str = "hnsw",
+    m: int = 16,
+    ef_construction: int = 64,
+    lists: int = None
+):
+    """
+    확장과 검색 인덱스 생성 (이미 있으면 건너뜀)
+    IVFFlat은 데이터로 클러스터를 학습하므로 데이터 로드 후에 실행해야 합니다.
+    lists를 생략하면 pgvector 권장값(행 수 / 1000, 최소 1)을 사용합니다.
+    """
+    if vector_index not in VECTOR_INDEX_NAMES:
+        raise ValueError(f"Unknown vector index type: {vector_index}")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+
+        print("Ensuring extensions (vector, pg_search)...")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_search")
+
+        print(f"Ensuring BM25 index ({BM25_INDEX_NAME})...")
+        cursor.execute(BM25_INDEX_SQL)
+
+        print(f"Ensuring {vector_index.upper()} vector index ({VECTOR_INDEX_NAMES[vector_index]})...")
+        if vector_index == "hnsw":
+            cursor.execute(HNSW_INDEX_SQL, {'m': m, 'ef_construction': ef_construction})
+        else:
+            if lists is None:
+                cursor.execute("SELECT count(*) FROM loan_products")
+                lists = max(1, cursor.fetchone()[0] // 1000)
+            cursor.execute(IVFFLAT_INDEX_SQL, {'lists': lists})
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    print("Migration completed!")
+
+
+def migrate_quantized_index(
+    conn,
+    quantization: str,
+    dimensions: int = EMBEDDING_DIMENSIONS,
+    m: int = 16,
+    ef_construction: int = 64
+):
+    """양자화/축소 차원 HNSW 식 인덱스 생성 (이미 있으면 건너뜀, 원본 float 인덱스와 함께 둘 수 있음)"""
+    if not is_quantized(quantization, dimensions):
+        return
+    opclass, _ = QUANTIZATION_OPS[quantization]
+    expression = quantized_expression("searchable_text_embedding", quantization, dimensions)
+    index_name = quantized_index_name(quantization, dimensions)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        print(f"Ensuring {quantization} vector index ({index_name})...")
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {index_name}
+            ON loan_products
+            USING hnsw (({expression}) {opclass})
+            WITH (m = %(m)s, ef_construction = %(ef_construction)s)
+        """, {'m': m, 'ef_construction': ef_construction})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def ensure_chunk_table(conn):
+    """청크 테이블 생성 (이미 있으면 건너뜀, 인덱스는 migrate_chunks()에서 생성)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        cursor.execute(CHUNKS_TABLE_SQL)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate_chunks(conn, m: int = 16, ef_construction: int = 64):
+    """청크 테이블과 BM25/HNSW 인덱스 생성 (이미 있으면 건너뜀)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_search")
+        cursor.execute(CHUNKS_TABLE_SQL)
+
+        print(f"Ensuring chunk BM25 index ({CHUNK_BM25_INDEX_NAME})...")
+        cursor.execute(CHUNK_BM25_INDEX_SQL)
+        print(f"Ensuring chunk HNSW vector index ({CHUNK_VECTOR_INDEX_NAME})...")
+        cursor.execute(CHUNK_HNSW_INDEX_SQL, {'m': m, 'ef_construction': ef_construction})
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    print("Chunk migration completed!")
+
+
+def ensure_ingest_columns(conn):
+    """수집 파이프라인에 필요한 컬럼과 카탈로그 버전 테이블 추가 (이미 있으면 건너뜀)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(INGEST_COLUMNS_SQL)
+        cursor.execute(CATALOG_STATE_SQL)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def bump_catalog_version(conn) -> int:
+    """상품 데이터가 바뀌었음을 기록하고 새 버전 반환"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE search_catalog_state
+            SET version = version + 1, updated_at = now()
+            WHERE id = 1
+            RETURNING version
+        """)
+        version = cursor.fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return version
+
+
+def get_catalog_version(conn) -> int:
+    """현재 카탈로그 버전 (버전 테이블이 아직 없으면 0)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT version FROM search_catalog_state WHERE id = 1")
+        row = cursor.fetchone()
+    except errors.UndefinedTable:
+        conn.rollback()
+        return 0
+    finally:
+        cursor.close()
+    return row[0] if row else 0
+
+
+def missing_search_indexes(conn, quantization: str = "none", dimensions: int = EMBEDDING_DIMENSIONS) -> list:
+    """
+    검색에 필요한데 없는 인덱스 이름 목록 반환
+    양자화/축소 차원 검색을 쓰면 해당 식 인덱스도 확인합니다 (없으면 경고 없이 순차 스캔이 되므로).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT indexname FROM pg_indexes
+        WHERE tablename = 'loan_products'
+    """)
+    existing = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+
+    missing = []
+    if BM25_INDEX_NAME not in existing:
+        missing.append(BM25_INDEX_NAME)
+    if not existing & set(VECTOR_INDEX_NAMES.values()):
+        missing.append(" 또는 ".join(VECTOR_INDEX_NAMES.values()))
+    if is_quantized(quantization, dimensions) and quantized_index_name(quantization, dimensions) not in existing:
+        missing.append(quantized_index_name(quantization, dimensions))
+    return missing
+
+
+def verify_search_indexes(conn=None, quantization: str = "none", dimensions: int = EMBEDDING_DIMENSIONS):
+    """
+    시작 시점 인덱스 확인
+    인덱스가 없으면 첫 검색 요청에서 실패하기 전에 SchemaError로 즉시 중단합니다.
+    quantization/dimensions에는 검색에 사용할 벡터 양자화 설정을 넘깁니다 (식 인덱스 확인).
+    """
+    if conn is None:
+        with get_connection() as pooled_conn:
+            return verify_search_indexes(pooled_conn, quantization, dimensions)
+
+    missing = missing_search_indexes(conn, quantization, dimensions)
+    if missing:
+        command = "uv run python schema.py"
+        if is_quantized(quantization, dimensions):
+            command += f" --quantization {quantization} --dimensions {dimensions}"
+        raise SchemaError(
+            f"검색 인덱스가 없습니다: {', '.join(missing)}\n"
+            f"먼저 `{command}`를 실행하세요."
+        )
+
+
+def main():
+    """CLI 진입점"""
+    parser = argparse.ArgumentParser(description="검색 인덱스 마이그레이션")
+    parser.add_argument("--vector-index", choices=list(VECTOR_INDEX_NAMES), default="hnsw", help="벡터 인덱스 종류")
+    parser.add_argument("--m", type=int, default=16, help="HNSW m (노드당 연결 수)")
+    parser.add_argument("--ef-construction", type=int, default=64, help="HNSW ef_construction")
+    parser.add_argument("--lists", type=int, default=None, help="IVFFlat lists (기본값: 행 수 / 1000, 최소 1)")
+    parser.add_argument("--check", action="store_true", help="인덱스 존재 여부만 확인")
+    parser.add_argument("--chunks", action="store_true", help="청크 테이블 인덱스도 생성")
+    parser.add_argument("--quantization", choices=VECTOR_QUANTIZATIONS, default="none", help="양자화 벡터 인덱스 추가 생성")
+    parser.add_argument("--dimensions", type=int, default=EMBEDDING_DIMENSIONS, help="양자화 인덱스에 사용할 앞쪽 차원 수")
+    args = parser.parse_args()
+
+    with get_connection() as conn:
+        if args.check:
+            missing = missing_search_indexes(conn, quantization=args.quantization, dimensions=args.dimensions)
+            if missing:
+                print(f"❌ 누락된 인덱스: {', '.join(missing)}")
+                sys.exit(1)
+            print("✅ 검색 인덱스가 모두 존재합니다.")
+            return
+
+        migrate(
+            conn,
+            vector_index=args.vector_index,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            lists=args.lists
+        )
+        migrate_quantized_index(
+            conn, args.quantization, args.dimensions, m=args.m, ef_construction=args.ef_construction
+        )
+        if args.chunks:
+            migrate_chunks(conn, m=args.m, ef_construction=args.ef_construction)
+
+
+if __name__ == "__main__":
+    main()
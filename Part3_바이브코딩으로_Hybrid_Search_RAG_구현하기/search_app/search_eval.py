@@ -0,0 +1,207 @@
+"""
+검색 품질 오프라인 평가
+라벨링된 질의 세트로 BM25 단독 / 벡터 단독 / RRF 결합의 recall@k, MRR, nDCG@k와
+단계별 지연시간(BM25, 임베딩, 벡터, 결합)을 측정합니다.
+
+- MemoryCatalog: loan_products.json을 메모리에 올리고 결정적 가짜 임베딩 사용 (DB/API 불필요)
+- PostgresCatalog: 실제 DB의 bm25_search()/vector_search()와 OpenAI 임베딩 사용
+
+실행은 benchmarks/benchmark_relevance.py를 사용합니다.
+"""
+import json
+import math
+import time
+import hashlib
+from typing import Dict, List, Tuple
+
+from hybrid_search import clean_text, get_embedding, bm25_search, vector_search
+from fusion import fuse
+from db_pool import get_connection
+from vector_index import InMemoryVectorIndex
+from bm25_index import LocalBM25Index, ngram_tokens
+
+SEARCH_MODES = ("bm25", "vector", "rrf")
+LATENCY_STAGES = ("bm25", "embedding", "vector", "fusion")
+
+# 결합 전략 비교 세트 (이름 → (fusion.py 전략, 파라미터))
+DEFAULT_FUSIONS = {"rrf": ("rrf", {})}
+FUSION_COMPARISON = {
+    "rrf": ("rrf", {}),
+    "rrf k=20": ("rrf", {"k": 20}),
+    "wrrf bm25x2": ("weighted_rrf", {"bm25_weight": 2.0}),
+    "wrrf vecx2": ("weighted_rrf", {"vector_weight": 2.0}),
+    "minmax": ("minmax", {}),
+    "zscore": ("zscore", {}),
+    "convex a=0.3": ("convex", {"alpha": 0.3}),
+    "convex a=0.5": ("convex", {"alpha": 0.5}),
+    "convex a=0.7": ("convex", {"alpha": 0.7}),
+}
+
+
+# ============================================================
+# 평가 지표
+# ============================================================
+
+def recall_at_k(ranked_ids: List[str], relevant: Dict[str, int], k: int) -> float:
+    """상위 k개 안에 들어온 정답 비율"""
+    if not relevant:
+        return 0.0
+    found = sum(1 for product_id in ranked_ids[:k] if relevant.get(product_id, 0) > 0)
+    return found / len(relevant)
+
+
+def reciprocal_rank(ranked_ids: List[str], relevant: Dict[str, int]) -> float:
+    """첫 정답 순위의 역수 (정답이 없으면 0)"""
+    for rank, product_id in enumerate(ranked_ids, 1):
+        if relevant.get(product_id, 0) > 0:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_ids: List[str], relevant: Dict[str, int], k: int) -> float:
+    """
+    nDCG@k (relevant 값을 등급으로 사용, gain = 2^등급 - 1)
+    정답 2 = 질문이 찾는 상품, 1 = 관련 상품
+    """
+    def dcg(grades: List[int]) -> float:
+        return sum((2 ** grade - 1) / math.log2(rank + 1) for rank, grade in enumerate(grades, 1))
+
+    ideal = dcg(sorted(relevant.values(), reverse=True)[:k])
+    if ideal == 0:
+        return 0.0
+    return dcg([relevant.get(product_id, 0) for product_id in ranked_ids[:k]]) / ideal
+
+
+# ============================================================
+# 메모리 카탈로그 (DB/API 없이 평가)
+# ============================================================
+
+def fake_embedding(text: str, dimensions: int = 256) -> List[float]:
+    """
+    결정적 가짜 임베딩
+    n-gram을 해시하여 고정 차원 벡터에 더한 뒤 정규화합니다 (같은 텍스트 → 항상 같은 벡터).
+    실제 임베딩의 의미 유사도는 없지만, 글자가 겹칠수록 코사인 유사도가 높아집니다.
+    """
+    vector = [0.0] * dimensions
+    for token in ngram_tokens(clean_text(text)):
+        digest = hashlib.md5(token.encode('utf-8')).digest()
+        index = int.from_bytes(digest[:4], 'little') % dimensions
+        vector[index] += 1.0 if digest[4] % 2 == 0 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+class MemoryCatalog:
+    """
+    DB 대신 사용하는 메모리 카탈로그
+    BM25는 LocalBM25Index(bm25_index.py, pg_search와 같은 n-gram 토큰),
+    벡터 검색은 가짜 임베딩을 올린 InMemoryVectorIndex(vector_index.py)로 계산합니다.
+    """
+
+    def __init__(self, products: List[dict]):
+        ids = [product['id'] for product in products]
+        cleaned = [clean_text(product.get('searchable_text', '')) for product in products]
+        self.bm25_index = LocalBM25Index.build(ids, cleaned)
+        self.vector_index = InMemoryVectorIndex(ids, [fake_embedding(text) for text in cleaned])
+
+    @classmethod
+    def from_json(cls, json_path: str) -> "MemoryCatalog":
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def bm25(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        return self.bm25_index.search(clean_text(query), limit)
+
+    def embed(self, query: str) -> List[float]:
+        return fake_embedding(query)
+
+    def vector(self, query_embedding: List[float], limit: int) -> List[Tuple[str, float]]:
+        return self.vector_index.search(query_embedding, limit)
+
+
+class PostgresCatalog:
+    """실제 DB 검색 (hybrid_search.py의 BM25/벡터 검색을 그대로 사용)"""
+
+    def embed(self, query: str) -> List[float]:
+        return get_embedding(query)
+
+    def bm25(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        with get_connection() as conn:
+            return bm25_search(conn, query, limit=limit)
+
+    def vector(self, query_embedding: List[float], limit: int) -> List[Tuple[str, float]]:
+        with get_connection() as conn:
+            return vector_search(conn, "", limit=limit, query_embedding=query_embedding)
+
+
+# ============================================================
+# 평가 실행
+# ============================================================
+
+def load_queries(path: str) -> List[dict]:
+    """라벨링된 질의 세트 로드 ([{"query": ..., "relevant": {product_id: 등급}}, ...])"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def evaluate(catalog, queries: List[dict], k: int = 10, depth: int = 20, fusions: dict = None) -> dict:
+    """
+    질의 세트 평가
+    depth는 각 검색 레그의 후보 수 (hybrid_search()의 기본 depth=20과 동일)
+    fusions는 비교할 결합 전략 {이름: (전략, 파라미터)} (기본값: RRF만)
+    Returns: {
+        'modes': ['bm25', 'vector', 결합 이름, ...],
+        'metrics': {mode: {'recall', 'mrr', 'ndcg'}},   # 질의 평균
+        'per_query': [{'query', mode: {...}}, ...],
+        'latencies': {stage: [ms, ...]}                  # fusion은 모든 결합 전략의 합
+    }
+    """
+    fusions = fusions or DEFAULT_FUSIONS
+    modes = ['bm25', 'vector'] + list(fusions)
+    latencies = {stage: [] for stage in LATENCY_STAGES}
+    per_query = []
+
+    for item in queries:
+        query, relevant = item['query'], item['relevant']
+
+        start = time.perf_counter()
+        bm25_results = catalog.bm25(query, depth)
+        after_bm25 = time.perf_counter()
+        query_embedding = catalog.embed(query)
+        after_embedding = time.perf_counter()
+        vector_results = catalog.vector(query_embedding, depth)
+        after_vector = time.perf_counter()
+        fused = {
+            name: fuse(bm25_results, vector_results, method, **params)
+            for name, (method, params) in fusions.items()
+        }
+        after_fusion = time.perf_counter()
+
+        latencies['bm25'].append((after_bm25 - start) * 1000)
+        latencies['embedding'].append((after_embedding - after_bm25) * 1000)
+        latencies['vector'].append((after_vector - after_embedding) * 1000)
+        latencies['fusion'].append((after_fusion - after_vector) * 1000)
+
+        rankings = {
+            'bm25': [product_id for product_id, _ in bm25_results],
+            'vector': [product_id for product_id, _ in vector_results],
+        }
+        for name, results in fused.items():
+            rankings[name] = [product_id for product_id, _ in results]
+        result = {'query': query}
+        for mode, ranked_ids in rankings.items():
+            result[mode] = {
+                'recall': recall_at_k(ranked_ids, relevant, k),
+                'mrr': reciprocal_rank(ranked_ids, relevant),
+                'ndcg': ndcg_at_k(ranked_ids, relevant, k),
+            }
+        per_query.append(result)
+
+    metrics = {}
+    for mode in modes:
+        metrics[mode] = {
+            name: sum(result[mode][name] for result in per_query) / len(per_query) if per_query else 0.0
+            for name in ('recall', 'mrr', 'ndcg')
+        }
+
+    return {'modes': modes, 'metrics': metrics, 'per_query': per_query, 'latencies': latencies}
@@ -0,0 +1,89 @@
+"""
+구조화 필드 기반 검색 필터
+loan_products의 금리/신청 채널/판매 여부 컬럼으로 후보를 DB에서 먼저 좁힙니다.
+BM25/벡터 SQL의 WHERE 절에 그대로 들어가므로 필터에 맞지 않는 상품은 후보 depth를 차지하지 않습니다.
+
+필터는 {이름: 값} 딕셔너리이며, 값이 None인 항목은 무시합니다.
+- min_interest_rate_lte: 최저금리가 이 값(%) 이하인 상품
+- max_interest_rate_lte: 최고금리가 이 값(%) 이하인 상품
+- can_apply_online, can_apply_mobile, is_available, is_sale_available: 해당 여부가 값과 같은 상품
+금리 필터를 주면 금리 정보가 없는 상품은 제외됩니다.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+
+# 필터 이름 → (SQL 조건, 값 변환 함수)
+FILTER_FIELDS = {
+    'min_interest_rate_lte': ("min_interest_rate::numeric <= {}", float),
+    'max_interest_rate_lte': ("max_interest_rate::numeric <= {}", float),
+    'can_apply_online': ("can_apply_online = {}", bool),
+    'can_apply_mobile': ("can_apply_mobile = {}", bool),
+    'is_available': ("is_available = {}", bool),
+    'is_sale_available': ("is_sale_available = {}", bool),
+}
+
+
+def normalize_filters(filters: Optional[dict]) -> Dict:
+    """
+    필터 검증 및 정리 (None 값 제거, 이름순 정렬, 타입 변환)
+    알 수 없는 필터 이름이면 ValueError
+    """
+    normalized = {}
+    for name in sorted(filters or {}):
+        if name not in FILTER_FIELDS:
+            raise ValueError(f"Unknown search filter: {name} (choose from {tuple(FILTER_FIELDS)})")
+        value = filters[name]
+        if value is None:
+            continue
+        _, convert = FILTER_FIELDS[name]
+        if convert is bool and not isinstance(value, bool):
+            raise ValueError(f"Search filter {name} must be true or false: {value!r}")
+        normalized[name] = convert(value)
+    return normalized
+
+
+def filter_sql(filters: Optional[dict], named: bool = False) -> Tuple[str, object]:
+    """
+    WHERE 절에 이어 붙일 조건 (" AND ..." 형식)과 파라미터
+    named=False: (조건, [값, ...]) - %s 자리표시자
+    named=True: (조건, {"filter_이름": 값}) - %(filter_이름)s 자리표시자 (HYBRID_SQL용)
+    """
+    filters = normalize_filters(filters)
+    conditions = []
+    params = {} if named else []
+    for name, value in filters.items():
+        condition, _ = FILTER_FIELDS[name]
+        if named:
+            conditions.append(condition.format(f"%(filter_{name})s"))
+            params[f"filter_{name}"] = value
+        else:
+            conditions.append(condition.format("%s"))
+            params.append(value)
+    return "".join(f" AND {condition}" for condition in conditions), params
+
+
+def allowed_ids(conn, filters: dict) -> Set[str]:
+    """필터를 통과하는 상품 id 집합 (DB에 필드가 없는 로컬/메모리 인덱스에서 사용)"""
+    clause, params = filter_sql(filters)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id FROM loan_products WHERE TRUE{clause}", params)
+    ids = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return ids
+
+
+def parse_filter_args(values: List[str]) -> Dict:
+    """CLI의 NAME=VALUE 목록을 필터 딕셔너리로 변환 (예: can_apply_mobile=true, max_interest_rate_lte=5)"""
+    filters = {}
+    for value in values:
+        name, _, text = value.partition("=")
+        if not text:
+            raise ValueError(f"검색 필터는 NAME=VALUE 형식이어야 합니다: {value}")
+        if name not in FILTER_FIELDS:
+            raise ValueError(f"Unknown search filter: {name} (choose from {tuple(FILTER_FIELDS)})")
+        if FILTER_FIELDS[name][1] is bool:
+            if text.lower() not in ("true", "false"):
+                raise ValueError(f"Search filter {name} must be true or false: {text}")
+            filters[name] = text.lower() == "true"
+        else:
+            filters[name] = float(text)
+    return filters
@@ -0,0 +1,85 @@
+"""
+로컬 BM25 인덱스 테스트 (DB 불필요)
+"""
+import math
+from contextlib import contextmanager
+
+import bm25_index
+
+DOCS = {
+    "p1": "NH햇살론119 서민금융 지원",
+    "p2": "공무원 가계자금 대출",
+    "p3": "NH햇살론뱅크 햇살론 이용 고객",
+    "p4": "의료인 전용 신용대출",
+}
+
+
+@contextmanager
+def fake_connection(pooled=True):
+    yield object()
+
+
+def build_index(**kwargs):
+    return bm25_index.LocalBM25Index.build(list(DOCS), list(DOCS.values()), **kwargs)
+
+
+def test_ngram_tokens():
+    """pg_search ngram(2~3) 토크나이저와 같은 토큰"""
+    assert bm25_index.ngram_tokens("햇살론") == ["햇살", "햇살론", "살론"]
+    assert bm25_index.ngram_tokens("NH 대출")[:3] == ["nh", "nh ", "h "]
+
+
+def test_korean_single_word_query():
+    """BM25_ISSUE_REPORT.md에서 0건이던 단일 한글 단어도 검색"""
+    results = build_index().search("햇살론", limit=10)
+
+    assert [product_id for product_id, _ in results] == ["p3", "p1"]
+    assert build_index().search("서민금융", limit=10)[0][0] == "p1"
+    assert build_index().search("주택", limit=10) == []
+
+
+def test_score_matches_bm25_formula():
+    """역색인 점수가 BM25 공식으로 직접 계산한 값과 같은지 확인"""
+    index = build_index()
+    k1, b = 1.2, 0.75
+    docs = {product_id: bm25_index.ngram_tokens(text) for product_id, text in DOCS.items()}
+    avg_length = sum(len(tokens) for tokens in docs.values()) / len(docs)
+
+    expected = 0.0
+    for term in set(bm25_index.ngram_tokens("공무원")):
+        df = sum(1 for tokens in docs.values() if term in tokens)
+        tf = docs["p2"].count(term)
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        expected += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(docs["p2"]) / avg_length))
+
+    [(product_id, score)] = index.search("공무원", limit=10)
+    assert product_id == "p2"
+    assert abs(score - expected) < 1e-4
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "bm25.npz")
+    index = build_index(catalog_version=3)
+    index.save(path)
+
+    loaded = bm25_index.LocalBM25Index.load(path)
+
+    assert loaded.catalog_version == 3
+    assert loaded.search("햇살론 서민금융", limit=5) == index.search("햇살론 서민금융", limit=5)
+
+
+def test_get_bm25_index_reuses_file_for_same_catalog_version(tmp_path, monkeypatch):
+    """디스크 인덱스의 카탈로그 버전이 같으면 DB에서 다시 만들지 않음"""
+    path = str(tmp_path / "bm25.npz")
+    build_index(catalog_version=5).save(path)
+
+    def fail_from_db(conn, catalog_version=0):
+        raise AssertionError("DB에서 인덱스를 다시 만들었습니다.")
+
+    monkeypatch.setattr(bm25_index, "BM25_INDEX_PATH", path)
+    monkeypatch.setattr(bm25_index, "get_connection", fake_connection)
+    monkeypatch.setattr(bm25_index, "get_catalog_version", lambda conn: 5)
+    monkeypatch.setattr(bm25_index.LocalBM25Index, "from_db", staticmethod(fail_from_db))
+    monkeypatch.setattr(bm25_index, "_index", None)
+
+    assert len(bm25_index.get_bm25_index()) == len(DOCS)
@@ -0,0 +1,58 @@
+"""
+긴 필드 청크 분할/수집 테스트
+
+OpenAI API와 DB 대신 가짜 구현을 사용합니다.
+"""
+import os
+
+import pytest
+
+# OpenAI 클라이언트는 import 시점에 키를 요구하므로 테스트용 값 설정
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import chunking
+
+
+def test_split_passages_overlaps_windows():
+    """각 구간은 window 이하이고, 다음 구간은 이전 구간 끝 단어를 다시 포함"""
+    text = " ".join(f"w{i}" for i in range(20))
+    # 단어마다 1토큰으로 계산
+    passages = chunking.split_passages(text, window_tokens=5, overlap_tokens=2, count_tokens=lambda word: 1)
+
+    assert passages[0] == "w0 w1 w2 w3 w4"
+    assert passages[1].startswith("w3 w4 ")
+    assert all(len(passage.split()) <= 5 for passage in passages)
+    assert passages[-1].endswith("w19")
+    assert chunking.split_passages("", window_tokens=5, overlap_tokens=2) == []
+    with pytest.raises(ValueError):
+        chunking.split_passages(text, window_tokens=5, overlap_tokens=5)
+
+
+def test_product_chunks_ids_and_fields():
+    product = {'id': 'p1', 'product_description': '설명 ' * 10, 'important_notices': None, 'required_documents': '신분증'}
+
+    chunks = chunking.product_chunks(product, window_tokens=4, overlap_tokens=1)
+
+    assert {chunk['field'] for chunk in chunks} == {'product_description', 'required_documents'}
+    assert chunks[0]['id'] == "p1:product_description:0"
+    assert chunks[-1]['id'] == "p1:required_documents:0"
+
+
+def test_ingest_chunks_embeds_only_changed_and_deletes_stale(monkeypatch):
+    """내용 해시가 같은 청크는 건너뛰고, 원본에서 사라진 청크는 삭제"""
+    product = {'id': 'p1', 'product_description': '새 설명', 'required_documents': '신분증'}
+    unchanged = chunking.product_chunks(product)[1]
+    monkeypatch.setattr(chunking, "fetch_chunk_hashes", lambda conn, ids: {
+        unchanged['id']: unchanged['content_hash'],
+        'p1:important_notices:0': 'old',
+    })
+    embedded_texts = []
+    monkeypatch.setattr(chunking, "get_embeddings", lambda texts: embedded_texts.extend(texts) or [[0.0]] * len(texts))
+    writes = []
+    monkeypatch.setattr(chunking, "write_chunks", lambda conn, chunks, embeddings, stale: writes.append((chunks, stale)))
+
+    stats = chunking.ingest_chunks(None, [product])
+
+    assert embedded_texts == ['새 설명']
+    assert writes[0][1] == ['p1:important_notices:0']
+    assert stats == {'products': 1, 'chunks': 2, 'embedded': 1, 'unchanged': 1, 'deleted': 1, 'failed': 0}
@@ -0,0 +1,90 @@
+"""
+쿼리 임베딩 캐시 테스트
+"""
+from embedding_cache import EmbeddingCache, SQLiteEmbeddingStore, normalize_query
+
+MODEL = "text-embedding-3-small"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    """공백, 대소문자, 끝 문장부호 차이는 같은 키로 취급"""
+    assert normalize_query("  공무원   대출? ") == "공무원 대출"
+    assert normalize_query("NH 햇살론!") == normalize_query("nh 햇살론")
+
+
+def test_memory_hit_and_counters():
+    """두 번째 호출은 API를 호출하지 않고 캐시에서 반환"""
+    calls = []
+    cache = EmbeddingCache(max_size=10)
+
+    def create(text):
+        calls.append(text)
+        return [0.1, 0.2]
+
+    assert cache.get_or_create("공무원 대출", MODEL, create) == [0.1, 0.2]
+    assert cache.get_or_create("공무원 대출?", MODEL, create) == [0.1, 0.2]
+
+    assert calls == ["공무원 대출"]
+    stats = cache.stats()
+    assert stats['memory_hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_model_is_part_of_key():
+    """모델이 다르면 캐시를 공유하지 않음"""
+    cache = EmbeddingCache(max_size=10)
+    cache.set("공무원 대출", MODEL, [1.0])
+
+    assert cache.get("공무원 대출", "other-model") is None
+
+
+def test_lru_eviction():
+    """최대 크기를 넘으면 가장 오래 사용하지 않은 항목부터 제거"""
+    cache = EmbeddingCache(max_size=2)
+    cache.set("a", MODEL, [1.0])
+    cache.set("b", MODEL, [2.0])
+    cache.get("a", MODEL)
+    cache.set("c", MODEL, [3.0])
+
+    assert cache.get("b", MODEL) is None
+    assert cache.get("a", MODEL) == [1.0]
+    assert cache.get("c", MODEL) == [3.0]
+
+
+def test_ttl_expiry():
+    """TTL이 지난 항목은 미스로 처리"""
+    clock = FakeClock()
+    cache = EmbeddingCache(max_size=10, ttl=60, clock=clock)
+    cache.set("공무원 대출", MODEL, [1.0])
+
+    clock.now = 59
+    assert cache.get("공무원 대출", MODEL) == [1.0]
+    clock.now = 61
+    assert cache.get("공무원 대출", MODEL) is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    """SQLite 캐시는 새 프로세스(새 캐시 인스턴스)에서도 재사용"""
+    path = str(tmp_path / "embeddings.sqlite")
+    embedding = [0.123456789, -1.5, 2.0]
+
+    first = EmbeddingCache(store=SQLiteEmbeddingStore(path))
+    first.set("햇살론", MODEL, embedding)
+    first.store.close()
+
+    second = EmbeddingCache(store=SQLiteEmbeddingStore(path))
+    assert second.get("햇살론", MODEL) == embedding
+    assert second.get("햇살론", MODEL) == embedding
+
+    stats = second.stats()
+    assert stats['disk_hits'] == 1
+    assert stats['memory_hits'] == 1
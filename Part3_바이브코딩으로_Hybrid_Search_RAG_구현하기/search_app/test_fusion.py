@@ -0,0 +1,79 @@
+"""
+결과 결합 전략 테스트
+"""
+import os
+import pytest
+
+# OpenAI 클라이언트는 import 시점에 키를 요구하므로 테스트용 값 설정
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import fusion
+import hybrid_search as hs
+
+BM25 = [("a", 8.0), ("b", 4.0), ("c", 2.0)]
+VECTOR = [("c", 0.9), ("d", 0.8), ("a", 0.1)]
+
+
+def test_rrf_matches_reciprocal_rank_fusion():
+    """가중치 1의 RRF는 기존 reciprocal_rank_fusion()과 점수, 순서 모두 같음"""
+    assert fusion.fuse(BM25, VECTOR, "rrf") == hs.reciprocal_rank_fusion(BM25, VECTOR)
+
+
+def test_weighted_rrf_prefers_weighted_leg():
+    """벡터 가중치 3: d(벡터 2위)가 b(BM25 2위)보다 위로 올라감"""
+    equal = [pid for pid, _ in fusion.fuse(BM25, VECTOR, "weighted_rrf")]
+    weighted = [pid for pid, _ in fusion.fuse(BM25, VECTOR, "weighted_rrf", vector_weight=3.0)]
+
+    assert equal == ["a", "c", "b", "d"]
+    assert weighted == ["c", "a", "d", "b"]
+
+
+def test_minmax_fusion():
+    """min-max: a = 0.5*1 + 0.5*0, c = 0.5*0 + 0.5*1, 동점은 BM25 순서"""
+    results = dict(fusion.fuse(BM25, VECTOR, "minmax"))
+
+    assert results["a"] == pytest.approx(0.5)
+    assert results["c"] == pytest.approx(0.5)
+    assert results["d"] == pytest.approx(0.5 * 0.875)
+    assert [product_id for product_id, _ in fusion.fuse(BM25, VECTOR, "minmax")][:2] == ["a", "c"]
+
+
+def test_zscore_fusion_uses_leg_minimum_for_missing():
+    """한쪽 레그에 없는 문서는 그 레그의 최저 z-score를 받음"""
+    bm25_z = fusion.zscore_normalize(BM25)
+    vector_z = fusion.zscore_normalize(VECTOR)
+    results = dict(fusion.fuse(BM25, VECTOR, "zscore", bm25_weight=1.0, vector_weight=1.0))
+
+    assert results["d"] == pytest.approx(min(bm25_z.values()) + vector_z["d"])
+    assert results["b"] == pytest.approx(bm25_z["b"] + min(vector_z.values()))
+
+
+def test_convex_fusion():
+    """alpha=1이면 BM25 순서, alpha=0이면 코사인 순서"""
+    assert [pid for pid, _ in fusion.fuse(BM25, VECTOR, "convex", alpha=1.0)][:3] == ["a", "b", "c"]
+    assert [pid for pid, _ in fusion.fuse(BM25, VECTOR, "convex", alpha=0.0)][:3] == ["c", "d", "a"]
+    with pytest.raises(ValueError):
+        fusion.fuse(BM25, VECTOR, "convex", alpha=1.5)
+
+
+def test_unknown_fusion_method():
+    with pytest.raises(ValueError):
+        fusion.fuse(BM25, VECTOR, "borda")
+    with pytest.raises(ValueError):
+        hs.hybrid_search("햇살론", fusion="borda")
+    with pytest.raises(ValueError):
+        hs.hybrid_search("햇살론", engine="sql", fusion="convex")
+
+
+def test_rank_fusion_is_final():
+    """아직 조회하지 않은 순위의 최대 점수로 상위 결과가 확정되었는지 판단"""
+    agree = [(f"p{i}", 1.0) for i in range(6)]
+    fused = fusion.fuse(agree, agree, "rrf")
+    assert fusion.rank_fusion_is_final(fused, agree, agree, limit=3)
+
+    # 레그가 서로 다르면 한쪽에만 있는 문서가 다른 레그에서 나중에 나타나 역전할 수 있음
+    other = [(f"q{i}", 1.0) for i in range(6)]
+    fused = fusion.fuse(agree, other, "rrf")
+    assert not fusion.rank_fusion_is_final(fused, agree, other, limit=3)
+    # 두 레그가 모두 끝났으면 확정
+    assert fusion.rank_fusion_is_final(fused, agree, other, limit=3, bm25_exhausted=True, vector_exhausted=True)
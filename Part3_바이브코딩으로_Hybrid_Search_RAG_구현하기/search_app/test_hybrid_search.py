@@ -0,0 +1,418 @@
+"""
+하이브리드 검색 로직 테스트
+
+DB와 OpenAI API 없이 실행할 수 있도록 연결/검색 함수를 가짜 구현으로 대체합니다.
+"""
+import os
+import sys
+import time
+import subprocess
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+# OpenAI 클라이언트는 import 시점에 키를 요구하므로 테스트용 값 설정
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import hybrid_search as hs
+import rerank
+from result_cache import SearchResultCache
+from embedding_cache import EmbeddingCache
+from tracing import start_trace
+
+
+@pytest.fixture(autouse=True)
+def no_result_cache(monkeypatch):
+    """테스트마다 가짜 검색 결과가 달라지므로 결과 캐시는 기본적으로 끔"""
+    monkeypatch.setattr(hs, "result_cache", SearchResultCache(max_size=0))
+
+
+@contextmanager
+def fake_connection(pooled=True):
+    yield object()
+
+
+def fake_fetch_products(conn, rrf_results, limit):
+    return [{'id': product_id, 'rrf_score': score} for product_id, score in rrf_results[:limit]]
+
+
+def test_reciprocal_rank_fusion():
+    """두 검색 결과에 모두 등장한 문서가 상위로 올라오는지 확인"""
+    bm25 = [("a", 3.0), ("b", 2.0)]
+    vector = [("b", 0.9), ("c", 0.8)]
+
+    results = hs.reciprocal_rank_fusion(bm25, vector, k=60)
+
+    assert [product_id for product_id, _ in results] == ["b", "a", "c"]
+    assert results[0][1] == 1 / 62 + 1 / 61
+
+
+def test_concurrent_mode_overlaps_legs(monkeypatch):
+    """동시 실행 모드에서 전체 시간이 두 레그의 합이 아니라 느린 레그에 가까운지 확인"""
+    delay = 0.2
+
+    def slow_bm25(conn, query, limit=20, offset=0, filters=None):
+        time.sleep(delay)
+        return [("a", 1.0), ("b", 0.5)]
+
+    def slow_embedding(text):
+        time.sleep(delay)
+        return [0.0]
+
+    def fake_vector(conn, query, limit=20, query_embedding=None, offset=0, filters=None, quantization="none", dimensions=1536):
+        assert query_embedding == [0.0]
+        return [("b", 0.9)]
+
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "bm25_search", slow_bm25)
+    monkeypatch.setattr(hs, "get_embedding", slow_embedding)
+    monkeypatch.setattr(hs, "vector_search", fake_vector)
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    start = time.perf_counter()
+    results = hs.hybrid_search("공무원 대출", limit=3, concurrent=True)
+    elapsed = time.perf_counter() - start
+
+    assert [r['id'] for r in results] == ["b", "a"]
+    assert elapsed < delay * 1.8
+
+
+def test_memory_vector_backend_skips_pgvector(monkeypatch):
+    """vector_backend="memory"이면 DB 벡터 검색 대신 메모리 인덱스 사용"""
+    def fail_vector(*args, **kwargs):
+        raise AssertionError("pgvector 검색이 호출되었습니다.")
+
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "bm25_search", lambda conn, query, limit=20, offset=0, filters=None: [("a", 1.0)])
+    monkeypatch.setattr(hs, "get_embedding", lambda text: [1.0, 0.0])
+    monkeypatch.setattr(hs, "vector_search", fail_vector)
+    monkeypatch.setattr(hs, "memory_vector_search", lambda embedding, limit=20, offset=0, allowed_ids=None, conn=None: [("b", 0.9), ("a", 0.5)])
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    for concurrent in (False, True):
+        results = hs.hybrid_search("햇살론", limit=3, concurrent=concurrent, vector_backend="memory")
+        assert [r['id'] for r in results] == ["a", "b"]
+
+
+def test_sql_engine_rejects_memory_vector_backend():
+    with pytest.raises(ValueError):
+        hs.hybrid_search("햇살론", engine="sql", vector_backend="memory")
+
+
+def test_local_keyword_backend_skips_pg_search(monkeypatch):
+    """keyword_backend="local"이면 pg_search 대신 로컬 BM25 인덱스 사용"""
+    def fail_bm25(*args, **kwargs):
+        raise AssertionError("pg_search 검색이 호출되었습니다.")
+
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "bm25_search", fail_bm25)
+    monkeypatch.setattr(hs, "local_bm25_search", lambda query, limit=20, offset=0, allowed_ids=None, conn=None: [("a", 2.0)])
+    monkeypatch.setattr(hs, "get_embedding", lambda text: [1.0])
+    monkeypatch.setattr(hs, "vector_search", lambda conn, query, limit=20, query_embedding=None, offset=0, filters=None, quantization="none", dimensions=1536: [("b", 0.9)])
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    for concurrent in (False, True):
+        results = hs.hybrid_search("햇살론", limit=3, concurrent=concurrent, keyword_backend="local")
+        assert [r['id'] for r in results] == ["a", "b"]
+
+
+def test_in_process_indexes_load_with_callers_connection(monkeypatch):
+    """메모리/로컬 인덱스 최초 로드는 검색이 잡고 있는 연결을 사용 (연결을 쥔 채 풀에서 하나 더 빌리지 않음)"""
+    import bm25_index
+    import vector_index
+
+    held = []
+
+    @contextmanager
+    def single_connection(pooled=True):
+        # 풀에 연결이 하나뿐인 상황: 이미 빌린 연결이 있으면 교착 대신 실패
+        assert not held, "연결을 쥔 채 풀에서 연결을 하나 더 빌렸습니다."
+        held.append(object())
+        try:
+            yield held[0]
+        finally:
+            held.clear()
+
+    loaded = []
+    monkeypatch.setattr(hs, "get_connection", single_connection)
+    monkeypatch.setattr(vector_index, "get_connection", single_connection)
+    monkeypatch.setattr(bm25_index, "get_connection", single_connection)
+    monkeypatch.setattr(vector_index, "get_catalog_version", lambda conn: 1)
+    monkeypatch.setattr(bm25_index, "get_catalog_version", lambda conn: 1)
+    monkeypatch.setattr(vector_index, "_index", None)
+    monkeypatch.setattr(bm25_index, "_index", None)
+    monkeypatch.setattr(bm25_index, "BM25_INDEX_PATH", None)
+    monkeypatch.setattr(
+        vector_index.InMemoryVectorIndex, "from_db",
+        staticmethod(lambda conn: loaded.append(conn) or vector_index.InMemoryVectorIndex(["b"], [[1.0]]))
+    )
+    monkeypatch.setattr(
+        bm25_index.LocalBM25Index, "from_db",
+        staticmethod(lambda conn, catalog_version=0: loaded.append(conn) or bm25_index.LocalBM25Index.build(["a"], ["햇살론"]))
+    )
+    monkeypatch.setattr(hs, "get_embedding", lambda text: [1.0])
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    results = hs.hybrid_search("햇살론", limit=3, concurrent=False, vector_backend="memory", keyword_backend="local")
+
+    assert {r['id'] for r in results} == {"a", "b"}
+    assert len(loaded) == 2 and loaded[0] is loaded[1]
+
+
+def test_adaptive_depth_stops_early_with_same_top_results(monkeypatch):
+    """두 레그의 순위가 일치하면 적응형 모드는 적은 후보로 멈추고 고정 depth와 같은 상위 결과를 반환"""
+    ranked = [(f"p{i:03d}", 1.0 - i / 100) for i in range(100)]
+    requested = []
+
+    def fake_bm25(conn, query, limit=20, offset=0, filters=None):
+        requested.append(offset + limit)
+        return ranked[offset:offset + limit]
+
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "bm25_search", fake_bm25)
+    monkeypatch.setattr(hs, "get_embedding", lambda text: [1.0])
+    monkeypatch.setattr(
+        hs, "vector_search",
+        lambda conn, query, limit=20, query_embedding=None, offset=0, filters=None, quantization="none", dimensions=1536: ranked[offset:offset + limit]
+    )
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    fixed = hs.hybrid_search("햇살론", limit=3, concurrent=False, depth=40, adaptive_depth=False)
+    requested.clear()
+    adaptive = hs.hybrid_search("햇살론", limit=3, concurrent=True, depth=40, adaptive_depth=True)
+
+    assert [r['id'] for r in adaptive] == [r['id'] for r in fixed] == ["p000", "p001", "p002"]
+    assert max(requested) < 40
+    assert hs.depth_stats()['last_depth'] == max(requested)
+
+
+def test_sql_engine_rejects_adaptive_depth():
+    with pytest.raises(ValueError):
+        hs.hybrid_search("햇살론", engine="sql", adaptive_depth=True)
+
+
+def test_result_cache_skips_legs_and_embedding(monkeypatch):
+    """같은 질문(공백/문장부호 차이 포함)은 두 번째부터 검색 레그와 임베딩 없이 캐시에서 반환"""
+    calls = []
+
+    def fake_bm25(conn, query, limit=20, offset=0, filters=None):
+        calls.append("bm25")
+        return [("a", 1.0)]
+
+    def fake_embedding(text):
+        calls.append("embedding")
+        return [1.0]
+
+    monkeypatch.setattr(hs, "result_cache", SearchResultCache(max_size=10))
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "bm25_search", fake_bm25)
+    monkeypatch.setattr(hs, "get_embedding", fake_embedding)
+    monkeypatch.setattr(hs, "vector_search", lambda conn, query, limit=20, query_embedding=None, offset=0, filters=None, quantization="none", dimensions=1536: [("b", 0.9)])
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    first = hs.hybrid_search("햇살론 조건", limit=3)
+    calls.clear()
+    second = hs.hybrid_search("햇살론 조건?", limit=3)
+
+    assert second == first
+    assert calls == []
+    assert hs.result_cache.stats()['hits'] == 1
+
+    # limit이나 결합 전략이 다르면 별도 항목
+    hs.hybrid_search("햇살론 조건", limit=5)
+    hs.hybrid_search("햇살론 조건", limit=3, fusion="convex")
+    assert hs.result_cache.stats()['misses'] == 3
+
+
+def test_rerank_fetches_more_candidates(monkeypatch):
+    """재정렬을 켜면 RERANK_CANDIDATES개를 조회한 뒤 재정렬기가 상위 limit개를 고름"""
+    ranked = [(f"p{i}", 1.0 - i / 100) for i in range(20)]
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "bm25_search", lambda conn, query, limit=20, offset=0, filters=None: ranked[offset:offset + limit])
+    monkeypatch.setattr(hs, "get_embedding", lambda text: [1.0])
+    monkeypatch.setattr(
+        hs, "vector_search",
+        lambda conn, query, limit=20, query_embedding=None, offset=0, filters=None, quantization="none", dimensions=1536: ranked[offset:offset + limit]
+    )
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    class LastFirst:
+        def score(self, query, documents, timeout=None):
+            return list(range(len(documents)))
+
+    monkeypatch.setattr(rerank, "get_reranker", lambda name: LastFirst())
+
+    results = hs.hybrid_search("햇살론", limit=2, rerank="llm")
+
+    assert [r['id'] for r in results] == [f"p{hs.RERANK_CANDIDATES - 1}", f"p{hs.RERANK_CANDIDATES - 2}"]
+
+
+def test_chunk_granularity_collapses_to_products(monkeypatch):
+    """청크 결과를 상품 단위로 묶고, 상품마다 일치 구간을 붙임"""
+    chunks = {
+        "p1:product_description:0": ("p1", "product_description", "농업인 대상"),
+        "p1:important_notices:0": ("p1", "important_notices", "중도상환 수수료"),
+        "p1:important_notices:1": ("p1", "important_notices", "연체 시 불이익"),
+        "p2:required_documents:0": ("p2", "required_documents", "신분증"),
+    }
+    ranked = [(chunk_id, 1.0) for chunk_id in chunks]
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "get_embedding", lambda text: [1.0])
+    monkeypatch.setattr(hs, "chunk_bm25_search", lambda conn, query, limit=60, offset=0, filters=None: ranked)
+    monkeypatch.setattr(hs, "chunk_vector_search", lambda conn, embedding, limit=60, offset=0, filters=None: ranked)
+    monkeypatch.setattr(hs, "fetch_chunks", lambda conn, ids: chunks)
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    results = hs.hybrid_search("중도상환", limit=2, granularity="chunk")
+
+    assert [r['id'] for r in results] == ["p1", "p2"]
+    assert [p['content'] for p in results[0]['passages']] == ["농업인 대상", "중도상환 수수료"]
+    assert results[1]['passages'][0]['field'] == "required_documents"
+
+    with pytest.raises(ValueError):
+        hs.hybrid_search("중도상환", granularity="chunk", engine="sql")
+
+
+class RecordingCursor:
+    """실행된 SQL과 파라미터를 기록하는 가짜 커서"""
+
+    def __init__(self, log, rows=None):
+        self.log = log
+        self.rows = rows if rows is not None else [("a", 0.9)]
+        self.closed = False
+
+    def execute(self, sql, params=None):
+        self.log.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        self.closed = True
+
+
+def test_quantized_vector_search_rescores_candidates():
+    """양자화 인덱스 식으로 후보를 (offset + limit) * VECTOR_RESCORE_FACTOR개 뽑고 원본 벡터로 재정렬"""
+    log, cursors = [], []
+
+    def open_cursor(self):
+        cursors.append(RecordingCursor(log))
+        return cursors[-1]
+
+    conn = type("FakeConn", (), {"cursor": open_cursor})()
+
+    results = hs.vector_search(conn, "", limit=5, query_embedding=[0.1], offset=5, quantization="binary", dimensions=512)
+
+    sql, params = log[0]
+    candidates = (5 + 5) * hs.VECTOR_RESCORE_FACTOR
+    assert results == [("a", 0.9)]
+    assert "binary_quantize(subvector(searchable_text_embedding, 1, 512))::bit(512) <~>" in sql
+    assert "ORDER BY similarity DESC" in sql
+    assert params[-3:] == (candidates, 5, 5)
+    # HNSW가 후보 수만큼 반환하도록 같은 왕복에서 ef_search를 올림
+    assert "set_config(\n        'hnsw.ef_search'" in sql and params[0] == candidates
+    # 커서는 하나만 열고 닫음
+    assert len(cursors) == 1 and cursors[0].closed
+
+    with pytest.raises(ValueError):
+        hs.hybrid_search("햇살론", quantization="int4")
+    with pytest.raises(ValueError):
+        hs.hybrid_search("햇살론", quantization="halfvec", engine="sql")
+
+
+def test_trace_records_leg_fetch_and_embedding_spans(monkeypatch):
+    """동시 실행 모드의 스레드 풀 레그도 search span 아래에 기록되고, 임베딩 캐시 적중 여부가 남음"""
+    embedding = SimpleNamespace(data=[SimpleNamespace(embedding=[1.0])])
+    monkeypatch.setattr(hs, "client", SimpleNamespace(embeddings=SimpleNamespace(create=lambda **kwargs: embedding)))
+    monkeypatch.setattr(hs, "embedding_cache", EmbeddingCache(max_size=10))
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "bm25_search", lambda conn, query, limit=20, offset=0, filters=None: [("a", 1.0)])
+    monkeypatch.setattr(hs, "vector_search", lambda conn, query, limit=20, query_embedding=None, offset=0, filters=None, quantization="none", dimensions=1536: [("b", 0.9)])
+    monkeypatch.setattr(hs, "fetch_products", fake_fetch_products)
+
+    cache_hits = []
+    for _ in range(2):
+        with start_trace() as trace:
+            hs.hybrid_search("공무원 대출", limit=3, concurrent=True)
+        spans = {record['name']: record for record in trace.spans}
+
+        assert set(spans) == {"search", "db.bm25", "db.vector", "db.fetch", "embedding"}
+        root = spans["search"]['span_id']
+        assert all(spans[name]['parent_span_id'] == root for name in ("db.bm25", "db.vector", "db.fetch", "embedding"))
+        cache_hits.append(spans["embedding"]['attributes']['cache_hit'])
+
+    # 두 번째 검색은 임베딩 캐시 적중
+    assert cache_hits == [False, True]
+
+
+def test_verify_search_indexes_requires_quantized_index():
+    """양자화 검색을 쓰면 식 인덱스가 없을 때 시작 시점에 SchemaError"""
+    from schema import verify_search_indexes, quantized_index_name, SchemaError, BM25_INDEX_NAME, VECTOR_INDEX_NAMES
+
+    existing = [(BM25_INDEX_NAME,), (VECTOR_INDEX_NAMES["hnsw"],)]
+    conn = type("FakeConn", (), {"cursor": lambda self: RecordingCursor([], rows=existing)})()
+
+    verify_search_indexes(conn)
+    with pytest.raises(SchemaError, match="--quantization halfvec --dimensions 512"):
+        verify_search_indexes(conn, quantization="halfvec", dimensions=512)
+
+    existing.append((quantized_index_name("halfvec", 512),))
+    verify_search_indexes(conn, quantization="halfvec", dimensions=512)
+
+
+def test_schema_check_cli_checks_quantized_index(monkeypatch, capsys):
+    """schema.py --check --quantization도 양자화 식 인덱스가 없으면 실패로 종료"""
+    import schema
+
+    existing = [(schema.BM25_INDEX_NAME,), (schema.VECTOR_INDEX_NAMES["hnsw"],)]
+    conn = type("FakeConn", (), {"cursor": lambda self: RecordingCursor([], rows=existing)})()
+
+    @contextmanager
+    def fake_schema_connection(pooled=True):
+        yield conn
+
+    monkeypatch.setattr(schema, "get_connection", fake_schema_connection)
+    monkeypatch.setattr(sys, "argv", ["schema.py", "--check", "--quantization", "halfvec", "--dimensions", "512"])
+    with pytest.raises(SystemExit) as exited:
+        schema.main()
+    assert exited.value.code == 1
+    assert schema.quantized_index_name("halfvec", 512) in capsys.readouterr().out
+
+    existing.append((schema.quantized_index_name("halfvec", 512),))
+    schema.main()
+    assert "모두 존재" in capsys.readouterr().out
+
+
+def test_embedding_api_uses_cache_model(monkeypatch):
+    """API 호출 모델과 캐시 키 모델이 같은 EMBEDDING_MODEL이고, cache_hit은 조회 후에 기록"""
+    calls = []
+
+    class FakeEmbeddings:
+        def create(self, model, input):
+            calls.append(model)
+            return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0, 0.0])])
+
+    monkeypatch.setattr(hs, "EMBEDDING_MODEL", "text-embedding-test")
+    monkeypatch.setattr(hs, "client", SimpleNamespace(embeddings=FakeEmbeddings()))
+    monkeypatch.setattr(hs, "embedding_cache", EmbeddingCache(max_size=10))
+
+    hits = []
+    for use_cache in (True, True, False):
+        with start_trace() as trace:
+            hs.get_embedding("공무원 대출", use_cache=use_cache)
+        hits.append(trace.spans[0]['attributes']['cache_hit'])
+
+    assert calls == ["text-embedding-test", "text-embedding-test"]
+    assert hits == [False, True, False]
+    assert hs.embedding_cache.get("공무원 대출", "text-embedding-test") == [1.0, 0.0]
+
+
+def test_search_path_does_not_import_ingestion_modules():
+    """검색/답변 경로는 필드 이름 상수만 쓰므로 chunking → load_data(OpenAI 클라이언트 생성)를 임포트하지 않음"""
+    code = "import sys, langgraph_rag; print(sorted({'chunking', 'load_data'} & set(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "OPENAI_API_KEY": "test-key"}, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,68 @@
+"""
+하이브리드 검색 DB 연동 테스트
+
+실제 loan_products 테이블이 필요하므로 DATABASE_URL이 없으면 건너뜁니다.
+OpenAI API 호출을 피하기 위해 테이블에 저장된 임베딩을 쿼리 임베딩으로 사용합니다.
+"""
+import os
+import pytest
+
+# OpenAI 클라이언트는 import 시점에 키를 요구하므로 테스트용 값 설정
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import hybrid_search as hs
+from db_pool import get_connection
+
+pytestmark = pytest.mark.skipif(not hs.DATABASE_URL, reason="DATABASE_URL이 설정되지 않았습니다.")
+
+PARITY_QUERIES = ["공무원 대출", "햇살론", "의사 전용 대출", "농업인 운전자금"]
+
+
+@pytest.fixture
+def stored_embedding(monkeypatch):
+    """DB에 저장된 상품 임베딩 하나를 get_embedding()의 반환값으로 고정"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT searchable_text_embedding::text
+            FROM loan_products
+            WHERE searchable_text_embedding IS NOT NULL
+            ORDER BY id
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+        cursor.close()
+
+    if row is None:
+        pytest.skip("임베딩이 저장된 상품이 없습니다. load_data.py를 먼저 실행하세요.")
+
+    embedding = [float(value) for value in row[0].strip('[]').split(',')]
+    monkeypatch.setattr(hs, "get_embedding", lambda text: embedding)
+    return embedding
+
+
+@pytest.mark.parametrize("query", PARITY_QUERIES)
+def test_sql_engine_matches_python_engine(stored_embedding, query):
+    """단일 SQL 엔진이 Python RRF 경로와 같은 순서, 같은 점수, 같은 필드를 반환하는지 확인"""
+    python_results = hs.hybrid_search(query, limit=10, engine="python", concurrent=False)
+    sql_results = hs.hybrid_search(query, limit=10, engine="sql")
+
+    assert sql_results == python_results
+
+
+def test_filters_pushed_into_both_engines(stored_embedding):
+    """필터는 두 엔진에서 같은 결과를 내고, 반환된 상품은 모두 조건을 만족"""
+    filters = {'can_apply_mobile': True}
+    python_results = hs.hybrid_search("대출", limit=10, engine="python", concurrent=False, filters=filters, use_cache=False)
+    sql_results = hs.hybrid_search("대출", limit=10, engine="sql", filters=filters, use_cache=False)
+
+    assert sql_results == python_results
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT count(*) FROM loan_products WHERE id = ANY(%s) AND can_apply_mobile IS NOT TRUE",
+            ([r['id'] for r in python_results],)
+        )
+        assert cursor.fetchone()[0] == 0
+        cursor.close()
@@ -0,0 +1,337 @@
+"""
+LangGraph RAG 그래프 테스트
+
+LLM은 langchain의 가짜 채팅 모델로, 검색은 가짜 hybrid_search(또는 DB/임베딩 함수만 가짜인 실제 hybrid_search)로 대체합니다.
+"""
+import gc
+import os
+import io
+import json
+import asyncio
+import argparse
+from contextlib import contextmanager
+
+# OpenAI 클라이언트는 import 시점에 키를 요구하므로 테스트용 값 설정
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import langgraph_rag as rag
+import hybrid_search as hs
+import bm25_index
+import vector_index
+from result_cache import SearchResultCache
+from router import FastRouter
+from load_data import estimate_tokens
+from tracing import start_trace, span
+
+DOCUMENT = {
+    'id': 'p1', 'product_name': '햇살론', 'product_code': 'A1', 'product_summary': '서민 대출',
+    'target_description': '저신용자', 'loan_limit_description': '최대 3천만원', 'rrf_score': 0.03,
+}
+
+
+def initial_state(question: str, router: str = "llm") -> dict:
+    return {
+        "question": question, "route_decision": "", "documents": [], "answer": "",
+        "debug": False, "search_options": {}, "router": router,
+    }
+
+
+def use_fake_llm(monkeypatch, *replies):
+    monkeypatch.setattr(rag, "llm", GenericFakeChatModel(messages=iter([AIMessage(content=r) for r in replies])))
+
+
+def test_async_graph_routes_and_retrieves(monkeypatch):
+    use_fake_llm(monkeypatch, "search", "햇살론은 서민 대출입니다 [상품1]")
+    searched = []
+    monkeypatch.setattr(rag, "hybrid_search", lambda question, limit, **options: searched.append(question) or [DOCUMENT])
+
+    result = asyncio.run(rag.build_graph().ainvoke(initial_state("햇살론 조건은?")))
+
+    assert searched == ["햇살론 조건은?"]
+    assert result["route_decision"] == "search"
+    assert result["answer"] == "햇살론은 서민 대출입니다 [상품1]"
+
+
+def test_stream_answer_emits_generate_tokens_only(monkeypatch):
+    """route 노드의 "direct"는 스트리밍하지 않고, 답변 토큰만 순서대로 전달"""
+    use_fake_llm(monkeypatch, "direct", "안녕하세요 무엇을 도와드릴까요")
+    tokens = []
+
+    result = asyncio.run(rag.stream_answer(rag.build_graph(), initial_state("안녕"), tokens.append))
+
+    assert len(tokens) > 1
+    assert "".join(tokens) == "안녕하세요 무엇을 도와드릴까요"
+    assert result["answer"] == "안녕하세요 무엇을 도와드릴까요"
+    assert result["first_token_seconds"] is not None
+
+
+def test_fast_router_skips_llm_and_falls_back_when_unsure(monkeypatch):
+    """규칙/임베딩으로 판단되면 LLM 호출 없이 라우팅하고, 확신이 없을 때만 LLM 호출"""
+    vectors = {"상품 질문": [1.0, 0.0], "잡담": [0.0, 1.0], "애매한 질문": [0.7, 0.7], "약관 질문": [0.9, 0.1]}
+    router = FastRouter(
+        embed=lambda text: vectors[text],
+        embed_many=lambda texts: [vectors[text] for text in texts],
+        exemplars={"search": ["상품 질문"], "direct": ["잡담"]},
+        margin=0.1
+    )
+    monkeypatch.setattr(rag, "fast_router", router)
+    monkeypatch.setattr(rag, "hybrid_search", lambda question, limit, **options: [DOCUMENT])
+    # LLM 응답은 fallback 라우팅 1번과 답변 3번에만 사용
+    use_fake_llm(monkeypatch, "답변1", "답변2", "direct", "답변3")
+
+    graph = rag.build_graph()
+    results = [
+        asyncio.run(graph.ainvoke(initial_state(question, router="fast")))
+        for question in ("햇살론 조건은?", "약관 질문", "애매한 질문")
+    ]
+
+    assert [(r["route_decision"], r["route_method"]) for r in results] == [
+        ("search", "rule"), ("search", "embedding"), ("direct", "llm")
+    ]
+    assert [r["answer"] for r in results] == ["답변1", "답변2", "답변3"]
+    assert router.stats()["fallback_rate"] == 1 / 3
+
+
+def test_speculative_retrieval_overlaps_routing(monkeypatch):
+    """추측 검색은 라우팅 LLM 호출 전에 시작되고, direct로 판단되면 결과를 버림"""
+    events = []
+
+    class SlowRouteLLM:
+        """라우팅 호출이 검색보다 늦게 끝나는 가짜 LLM"""
+
+        def __init__(self, route):
+            self.route = route
+
+        async def ainvoke(self, messages, config=None, **kwargs):
+            if messages[0].content == rag.ROUTE_PROMPT:
+                await asyncio.sleep(0.1)
+                events.append("routed")
+                return AIMessage(content=self.route)
+            return AIMessage(content="답변")
+
+    def fake_search(question, limit, **options):
+        events.append("searched")
+        return [DOCUMENT]
+
+    monkeypatch.setattr(rag, "hybrid_search", fake_search)
+    monkeypatch.setattr(rag, "_speculation_stats", dict.fromkeys(rag._speculation_stats, 0))
+    graph = rag.build_graph()
+
+    monkeypatch.setattr(rag, "llm", SlowRouteLLM("search"))
+    state = {**initial_state("한도 알려줘"), "speculative": True}
+    result = asyncio.run(graph.ainvoke(state))
+    assert events == ["searched", "routed"]
+    assert result["documents"] == [DOCUMENT]
+
+    monkeypatch.setattr(rag, "llm", SlowRouteLLM("direct"))
+    result = asyncio.run(graph.ainvoke(state))
+    assert result["documents"] == []
+
+    stats = rag.speculation_stats()
+    assert (stats['speculated'], stats['used'], stats['wasted']) == (2, 1, 1)
+    assert stats['avg_saved_ms'] > 0
+
+
+def test_speculative_retrieval_is_cancelled_when_routing_fails(monkeypatch):
+    """라우팅 LLM이 실패하면 추측 검색 태스크를 취소/회수하여 "exception was never retrieved"가 남지 않음"""
+    class FailingRouteLLM:
+        async def ainvoke(self, messages, config=None, **kwargs):
+            await asyncio.sleep(0.05)
+            raise RuntimeError("route failed")
+
+    def failing_search(question, limit, **options):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(rag, "llm", FailingRouteLLM())
+    monkeypatch.setattr(rag, "hybrid_search", failing_search)
+    monkeypatch.setattr(rag, "_speculation_stats", dict.fromkeys(rag._speculation_stats, 0))
+    unretrieved = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        with start_trace() as trace, span("rag"):
+            try:
+                await rag.build_graph().ainvoke({**initial_state("한도 알려줘"), "speculative": True})
+            except RuntimeError as e:
+                assert "route failed" in str(e)
+        await asyncio.sleep(0)
+        return trace
+
+    trace = asyncio.run(run())
+    gc.collect()
+    assert unretrieved == []
+    assert rag.speculation_stats()['wasted'] == 1
+
+    # 추측 검색 span은 route가 아니라 rag 바로 아래에 기록
+    spans = {record['name']: record for record in trace.spans}
+    assert spans["retrieve.speculative"]['parent_span_id'] == spans["rag"]['span_id']
+
+
+def test_generate_prompt_keeps_static_prefix_and_records_cached_tokens(monkeypatch):
+    """질문/날짜가 달라도 시스템 메시지(캐시 대상 앞부분)는 같고, 날짜 안내사항은 맨 뒤에 위치"""
+    first = rag.build_search_messages("햇살론 조건은?", [DOCUMENT], current_date="2026년 01월 01일")
+    second = rag.build_search_messages("한도 알려줘", [DOCUMENT], current_date="2026년 01월 02일")
+
+    assert first[0].content == second[0].content == rag.GENERATE_STATIC_PROMPT
+    assert "{current_date}" not in rag.GENERATE_STATIC_PROMPT
+    assert "[중요 안내사항]" in rag.GENERATE_STATIC_PROMPT and "[중요 안내사항]" not in first[1].content
+    assert first[1].content.endswith("[기준일]\n2026년 01월 01일")
+
+    class UsageLLM:
+        async def ainvoke(self, messages, config=None, **kwargs):
+            assert kwargs["prompt_cache_key"] == rag.RAG_PROMPT_CACHE_KEY
+            usage = {"input_tokens": 1200, "output_tokens": 80, "total_tokens": 1280,
+                     "input_token_details": {"cache_read": 1024}}
+            return AIMessage(content="답변", usage_metadata=usage)
+
+    monkeypatch.setattr(rag, "llm", UsageLLM())
+    monkeypatch.setattr(rag, "_prompt_cache_stats", dict.fromkeys(rag._prompt_cache_stats, 0))
+    assert asyncio.run(rag._generate(first, prompt_cache_key=rag.RAG_PROMPT_CACHE_KEY)) == "답변"
+
+    stats = rag.prompt_cache_stats()
+    assert (stats['calls'], stats['input_tokens'], stats['cached_tokens'], stats['output_tokens']) == (1, 1200, 1024, 80)
+    assert stats['cached_ratio'] == 1024 / 1200
+
+
+def test_prompt_cache_stats_count_only_search_answers(monkeypatch):
+    """직접 답변은 캐시 키 없이 호출하고 prompt_cache_stats()에 집계하지 않음"""
+    seen = []
+
+    class UsageLLM:
+        async def ainvoke(self, messages, config=None, **kwargs):
+            seen.append(kwargs.get("prompt_cache_key"))
+            return AIMessage(content="답변", usage_metadata={"input_tokens": 100, "output_tokens": 10, "total_tokens": 110})
+
+    monkeypatch.setattr(rag, "llm", UsageLLM())
+    monkeypatch.setattr(rag, "_prompt_cache_stats", dict.fromkeys(rag._prompt_cache_stats, 0))
+    asyncio.run(rag.generate_node({"question": "안녕하세요", "route_decision": "direct", "documents": []}))
+    assert rag.prompt_cache_stats()['calls'] == 0
+
+    asyncio.run(rag.generate_node({"question": "햇살론 조건은?", "route_decision": "search", "documents": [DOCUMENT]}))
+    assert rag.prompt_cache_stats()['calls'] == 1
+    assert seen == [None, rag.RAG_PROMPT_CACHE_KEY]
+
+
+def test_static_prompt_reaches_prompt_cache_minimum():
+    """
+    고정 지시문 길이 측정: OpenAI 프롬프트 캐시 최소 길이(1024 토큰) 이상이어야 질문이 달라도 캐시가 적중
+    토크나이저 없이 재므로 한글 2글자당 1토큰으로 낮춰 잡은 하한으로 확인합니다
+    (UTF-8 바이트 / 3 추정치는 그보다 큼).
+    """
+    prompt = rag.GENERATE_STATIC_PROMPT
+    assert len(prompt) // 2 >= 1024
+    assert estimate_tokens(prompt) >= 1024
+
+
+def test_batch_answers_questions_concurrently_with_bounded_workers(monkeypatch):
+    """배치 모드는 그래프 하나로 최대 workers개씩 동시에 답변하고, 실패한 질문만 error로 기록"""
+    items = rag.read_questions(io.StringIO(
+        '{"id": "q1", "question": "햇살론 조건은?"}\n\n"전세자금 한도는?"\n{"question": "실패 질문"}\n'
+    ))
+    assert [item["id"] for item in items] == ["q1", 3, 4]
+
+    running, peak = 0, 0
+
+    class EchoLLM:
+        async def ainvoke(self, messages, config=None, **kwargs):
+            nonlocal running, peak
+            if messages[0].content == rag.ROUTE_PROMPT:
+                return AIMessage(content="search")
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            usage = {"input_tokens": 1500, "output_tokens": 40, "total_tokens": 1540}
+            return AIMessage(content="답변", usage_metadata=usage)
+
+    def fake_search(question, limit, **options):
+        if question == "실패 질문":
+            raise RuntimeError("db down")
+        return [DOCUMENT]
+
+    monkeypatch.setattr(rag, "llm", EchoLLM())
+    monkeypatch.setattr(rag, "hybrid_search", fake_search)
+    records, traces = [], []
+
+    summary = asyncio.run(rag.answer_batch(
+        rag.build_graph(), items, initial_state(""), records.append, workers=2, on_trace=traces.append
+    ))
+
+    assert summary["questions"] == 3 and summary["failed"] == 1
+    assert peak == 2
+    by_id = {record["id"]: record for record in records}
+    assert by_id["q1"]["answer"] == "답변" and by_id["q1"]["route_decision"] == "search"
+    assert by_id["q1"]["documents"] == [{"id": "p1", "product_name": "햇살론", "rrf_score": 0.03}]
+    assert set(by_id["q1"]["timings"]) == {"route", "retrieve", "generate", "total"}
+    assert "db down" in by_id[4]["error"]
+
+    # 질문마다 trace 하나, 노드 span은 rag span 아래에 기록되고 LLM 토큰 수가 남음
+    trace = next(trace for trace in traces if trace.trace_id == by_id["q1"]["trace_id"])
+    spans = {record['name']: record for record in trace.spans}
+    assert {"rag", "route", "llm.route", "retrieve", "generate", "llm.generate"} <= set(spans)
+    assert spans["generate"]['parent_span_id'] == spans["rag"]['span_id']
+    assert spans["llm.generate"]['attributes']['llm.input_tokens'] == 1500
+    failed = next(trace for trace in traces if trace.trace_id == by_id[4]["trace_id"])
+    assert {record['name']: record['status'] for record in failed.spans}["retrieve"] == "error"
+
+
+def test_batch_stdout_is_jsonl_with_real_search_path(monkeypatch, tmp_path, capsys):
+    """배치 결과를 표준 출력으로 보낼 때 검색/디버그 진행 메시지가 섞이지 않아 모든 줄이 JSON으로 파싱됨"""
+    class EchoLLM:
+        async def ainvoke(self, messages, config=None, **kwargs):
+            if messages[0].content == rag.ROUTE_PROMPT:
+                return AIMessage(content="search")
+            return AIMessage(content="답변")
+
+    @contextmanager
+    def fake_connection(pooled=True):
+        yield object()
+
+    # 실제 hybrid_search() 경로를 타고 DB/임베딩 함수만 가짜 구현으로 대체
+    monkeypatch.setattr(rag, "llm", EchoLLM())
+    monkeypatch.setattr(hs, "result_cache", SearchResultCache(max_size=0))
+    monkeypatch.setattr(hs, "get_connection", fake_connection)
+    monkeypatch.setattr(hs, "get_embedding", lambda text: [1.0, 0.0])
+    monkeypatch.setattr(hs, "bm25_search", lambda conn, query, limit=20, offset=0, filters=None: [("p1", 2.0)])
+    monkeypatch.setattr(hs, "vector_search", lambda conn, query, limit=20, query_embedding=None, offset=0, filters=None, quantization="none", dimensions=1536: [("p1", 0.9)])
+    monkeypatch.setattr(hs, "fetch_products", lambda conn, rrf_results, limit: [{**DOCUMENT, 'rrf_score': score} for _, score in rrf_results[:limit]])
+
+    # 메모리/로컬 인덱스는 첫 검색에서 로드되며 로드 메시지를 출력
+    for module in (vector_index, bm25_index):
+        monkeypatch.setattr(module, "get_connection", fake_connection)
+        monkeypatch.setattr(module, "get_catalog_version", lambda conn: 1)
+        monkeypatch.setattr(module, "_index", None)
+    monkeypatch.setattr(bm25_index, "BM25_INDEX_PATH", None)
+    monkeypatch.setattr(vector_index.InMemoryVectorIndex, "from_db", staticmethod(lambda conn: vector_index.InMemoryVectorIndex(["p1"], [[1.0, 0.0]])))
+    monkeypatch.setattr(bm25_index.LocalBM25Index, "from_db", staticmethod(lambda conn, catalog_version=0: bm25_index.LocalBM25Index.build(["p1"], ["햇살론"])))
+
+    batch = tmp_path / "questions.jsonl"
+    batch.write_text('"햇살론 조건은?"\n"전세자금 한도는?"\n', encoding="utf-8")
+    args = argparse.Namespace(batch=str(batch), output="-", workers=2)
+    state = {**initial_state(""), "debug": True}
+
+    in_process = {"vector_backend": "memory", "keyword_backend": "local"}
+    for options in ({}, {"concurrent": True}, in_process):
+        rag.run_batch(rag.build_graph(), args, {**state, "search_options": options})
+
+        out, err = capsys.readouterr()
+        records = [json.loads(line) for line in out.splitlines()]
+        assert [record["answer"] for record in records] == ["답변", "답변"]
+        assert "Running BM25 and vector search" in err and "[DEBUG]" in err
+        if options is in_process:
+            assert "in-memory vector index" in err and "local BM25 index" in err
+
+
+def test_fast_router_does_not_route_mixed_greeting_and_product_question_to_direct():
+    """인사/감사와 상품 질문이 섞인 문장은 규칙으로 direct 판단하지 않고 다음 단계(임베딩/LLM)로 넘김"""
+    router = FastRouter(embed=lambda text: [0.0, 0.0], embed_many=lambda texts: [[1.0, 0.0] for _ in texts])
+
+    for question in ("안녕하세요, 농업인 대출 상품 추천해주세요", "답변 감사합니다. 공무원 대출 한도는 얼마인가요?"):
+        assert router.rule_decision(question) is None
+
+    assert router.rule_decision("감사합니다") == "direct"
+    assert router.rule_decision("공무원 대출 한도는 얼마인가요?") == "search"
+    assert router.rule_decision("안녕하세요, 햇살론 조건 알려주세요") == "search"
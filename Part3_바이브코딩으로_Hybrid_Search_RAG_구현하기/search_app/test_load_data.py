@@ -0,0 +1,250 @@
+"""
+데이터 수집 파이프라인 테스트
+
+OpenAI API와 DB 대신 가짜 구현을 사용합니다.
+"""
+import os
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# OpenAI 클라이언트는 import 시점에 키를 요구하므로 테스트용 값 설정
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import load_data
+
+
+class FlakyError(Exception):
+    pass
+
+
+class FakeEmbeddings:
+    """처음 fail_times번은 실패하고, 이후 입력 길이를 임베딩으로 돌려주는 가짜 API"""
+
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.calls = []
+
+    def create(self, model, input):
+        self.calls.append(list(input))
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise FlakyError("rate limited")
+        # 순서가 뒤섞인 응답도 index로 정렬되는지 확인하기 위해 역순으로 반환
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def use_fake_api(monkeypatch, fake):
+    monkeypatch.setattr(load_data, "client", SimpleNamespace(embeddings=fake))
+    monkeypatch.setattr(load_data, "RETRYABLE_ERRORS", (FlakyError,))
+    monkeypatch.setattr(load_data.time, "sleep", lambda seconds: None)
+
+
+def test_chunked():
+    assert list(load_data.chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_get_embeddings_retries_and_keeps_order(monkeypatch):
+    """레이트 리밋 후 재시도하고, 입력 순서대로 임베딩 반환"""
+    fake = FakeEmbeddings(fail_times=2)
+    use_fake_api(monkeypatch, fake)
+
+    embeddings = load_data.get_embeddings(["a", "bb", "ccc"])
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert len(fake.calls) == 3
+
+
+def test_ingest_batches_one_api_call_per_batch(monkeypatch):
+    """배치마다 임베딩 API 1회, DB 쓰기 1회"""
+    fake = FakeEmbeddings()
+    use_fake_api(monkeypatch, fake)
+    written = []
+    monkeypatch.setattr(
+        load_data, "insert_products_batch",
+        lambda conn, products, embeddings, metadata_only=(): written.append((len(products), len(embeddings)))
+    )
+
+    products = [{'id': str(i), 'searchable_text': 'x' * i} for i in range(1, 6)]
+    stats = load_data.ingest_batches(conn=None, products=products, batch_size=2)
+
+    assert [len(call) for call in fake.calls] == [2, 2, 1]
+    assert written == [(2, 2), (2, 2), (1, 1)]
+    assert stats['rows'] == 5
+    assert stats['failed'] == 0
+    assert stats['batches'] == 3
+
+
+def test_product_row_matches_columns():
+    """INSERT 값이 컬럼 순서와 맞고, 정제 텍스트와 임베딩이 채워지는지 확인"""
+    product = {'id': 'p1', 'product_name': 'NH햇살론119', 'searchable_text': 'NH햇살론119 (서민금융)'}
+    row = load_data.product_row(product, [0.5])
+    values = dict(zip(load_data.PRODUCT_COLUMNS, row))
+
+    assert len(row) == len(load_data.PRODUCT_COLUMNS)
+    assert values['product_name'] == 'NH햇살론119'
+    assert values['cleaned_searchable_text'] == 'NH햇살론119 서민금융'
+    assert values['searchable_text_embedding'] == [0.5]
+
+
+def test_plan_batch_incremental():
+    """새 상품/텍스트 변경은 재임베딩, 메타데이터 변경은 갱신만, 동일하면 건너뜀"""
+    unchanged = {'id': 'same', 'searchable_text': '공무원 대출'}
+    metadata = {'id': 'meta', 'searchable_text': '햇살론', 'max_interest_rate': '6.39'}
+    changed = {'id': 'text', 'searchable_text': '새 설명'}
+    new = {'id': 'new', 'searchable_text': '의사 전용'}
+    existing = {
+        'same': (load_data.content_hash(unchanged), load_data.text_hash('공무원 대출')),
+        'meta': ('old-hash', load_data.text_hash('햇살론')),
+        'text': ('old-hash', load_data.text_hash('예전 설명')),
+    }
+
+    to_embed, metadata_only, skipped = load_data.plan_batch([unchanged, metadata, changed, new], existing)
+
+    assert [p['id'] for p in to_embed] == ['text', 'new']
+    assert [p['id'] for p in metadata_only] == ['meta']
+    assert skipped == 1
+
+
+def test_ingest_batches_skips_unchanged_catalog(monkeypatch):
+    """카탈로그가 그대로면 임베딩 API와 DB 쓰기를 모두 건너뜀"""
+    fake = FakeEmbeddings()
+    use_fake_api(monkeypatch, fake)
+    products = [{'id': str(i), 'searchable_text': f'상품 {i}'} for i in range(4)]
+    monkeypatch.setattr(load_data, "fetch_existing_hashes", lambda conn, ids: {
+        p['id']: (load_data.content_hash(p), load_data.text_hash(p['searchable_text']))
+        for p in products if p['id'] in ids
+    })
+
+    def fail_on_write(*args):
+        raise AssertionError("변경 없는 카탈로그에서 DB 쓰기가 발생했습니다.")
+
+    monkeypatch.setattr(load_data, "insert_products_batch", fail_on_write)
+
+    seen_ids = set()
+    stats = load_data.ingest_batches(None, products, batch_size=3, incremental=True, seen_ids=seen_ids)
+
+    assert fake.calls == []
+    assert stats['skipped'] == 4
+    assert stats['rows'] == 0
+    assert seen_ids == {'0', '1', '2', '3'}
+
+
+def test_iter_json_array_streams_across_chunk_boundaries(tmp_path):
+    """청크가 상품 중간에서 잘려도 json.load와 같은 결과"""
+    products = [{'id': str(i), 'searchable_text': f'햇살론 {i}', 'tags': [i, {'nested': '서민금융'}]} for i in range(20)]
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(products, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    assert list(load_data.iter_json_array(str(path), chunk_size=7)) == products
+    assert list(load_data.iter_products(str(path))) == products
+
+
+def test_iter_json_array_rejects_truncated_file(tmp_path):
+    """닫히지 않은 배열은 오류"""
+    path = tmp_path / "broken.json"
+    path.write_text('[{"id": "1"}, {"id": "2"', encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        list(load_data.iter_json_array(str(path), chunk_size=4))
+
+
+def test_iter_products_json_lines(tmp_path):
+    """.jsonl은 한 줄에 상품 하나, 빈 줄은 무시"""
+    path = tmp_path / "products.jsonl"
+    path.write_text('{"id": "1"}\n\n{"id": "2"}\n', encoding='utf-8')
+
+    assert [p['id'] for p in load_data.iter_products(str(path))] == ['1', '2']
+
+
+def test_checkpoint_resume(tmp_path):
+    """체크포인트는 같은 원본 파일에만 적용되고, 건너뛴 상품 id도 기록"""
+    source = tmp_path / "products.jsonl"
+    source.write_text(''.join(f'{{"id": "{i}"}}\n' for i in range(5)), encoding='utf-8')
+    checkpoint = str(tmp_path / "state" / "checkpoint.json")
+
+    assert load_data.load_checkpoint(checkpoint, str(source)) == 0
+    load_data.save_checkpoint(checkpoint, str(source), 3)
+    assert load_data.load_checkpoint(checkpoint, str(source)) == 3
+
+    seen_ids = set()
+    remaining = load_data.skip_products(load_data.iter_products(str(source)), 3, seen_ids)
+    assert [p['id'] for p in remaining] == ['3', '4']
+    assert seen_ids == {'0', '1', '2'}
+
+    source.write_text('{"id": "changed"}\n', encoding='utf-8')
+    assert load_data.load_checkpoint(checkpoint, str(source)) == 0
+
+
+def test_ingest_batches_reports_each_batch(monkeypatch):
+    """on_batch_done은 배치 크기와 성공 여부로 호출"""
+    use_fake_api(monkeypatch, FakeEmbeddings())
+    conn = SimpleNamespace(rollback=lambda: None)
+
+    def fail_second_batch(conn, products, embeddings, metadata_only=()):
+        if products[0]['id'] == '2':
+            raise RuntimeError("db down")
+
+    monkeypatch.setattr(load_data, "insert_products_batch", fail_second_batch)
+    reports = []
+    products = iter([{'id': str(i), 'searchable_text': 'x'} for i in range(5)])
+    stats = load_data.ingest_batches(conn, products, batch_size=2, on_batch_done=lambda n, ok: reports.append((n, ok)))
+
+    assert reports == [(2, True), (2, False), (1, True)]
+    assert stats['failed'] == 2
+
+
+def test_token_budget_waits_for_refill():
+    """분당 한도를 넘으면 토큰이 다시 찰 때까지 대기"""
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    budget = load_data.TokenBudget(600, clock=lambda: now[0], sleep=sleep)  # 초당 10토큰
+
+    assert budget.acquire(600) == 0.0
+    assert budget.acquire(50) == 5.0
+    assert sleeps == [5.0]
+    # 한도보다 큰 요청은 버킷이 가득 찰 때까지만 대기
+    assert budget.acquire(10_000) == 60.0
+    assert budget.waited_seconds == 65.0
+
+
+def test_parallel_workers_embed_concurrently_and_write_in_order(monkeypatch):
+    """임베딩은 워커들이 동시에 호출하고, DB 쓰기는 배치 순서대로"""
+    workers = 3
+    barrier = threading.Barrier(workers, timeout=5)
+
+    lock = threading.Lock()
+
+    class ConcurrentEmbeddings(FakeEmbeddings):
+        def create(self, model, input):
+            with lock:
+                first_wave = len(self.calls) < workers
+                self.calls.append(list(input))
+            # 첫 3개 배치가 동시에 호출되지 않으면 BrokenBarrierError로 실패
+            if first_wave:
+                barrier.wait()
+            return SimpleNamespace(data=[
+                SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)
+            ])
+
+    use_fake_api(monkeypatch, ConcurrentEmbeddings())
+    written = []
+    monkeypatch.setattr(
+        load_data, "insert_products_batch",
+        lambda conn, products, embeddings, metadata_only=(): written.append([p['id'] for p in products])
+    )
+
+    products = [{'id': str(i), 'searchable_text': 'x' * (i + 1)} for i in range(7)]
+    stats = load_data.ingest_batches(None, products, batch_size=2, workers=workers)
+
+    assert written == [['0', '1'], ['2', '3'], ['4', '5'], ['6']]
+    assert stats['rows'] == 7
+    assert len(stats['embed_latencies']) == 4
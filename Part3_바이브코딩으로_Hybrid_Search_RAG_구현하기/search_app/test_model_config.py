@@ -20,9 +20,9 @@ def test_model_configuration():
 
     content = search_file.read_text(encoding='utf-8')
 
-    # model= 패턴 찾기
+    # model= 패턴과 모델 상수(EMBEDDING_MODEL = ...) 찾기
     model_pattern = r'model\s*=\s*["\']([^"\']+)["\']'
-    matches = re.findall(model_pattern, content)
+    matches = re.findall(model_pattern, content, flags=re.IGNORECASE)
 
     if not matches:
         print("❌ FAIL: 모델 설정을 찾을 수 없습니다.")
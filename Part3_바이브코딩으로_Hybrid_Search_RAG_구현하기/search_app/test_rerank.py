@@ -0,0 +1,107 @@
+"""
+재정렬 단계 테스트 (모델 대신 가짜 재정렬기 사용)
+"""
+import time
+import threading
+from types import SimpleNamespace
+
+import rerank
+
+PRODUCTS = [
+    {'id': 'a', 'product_name': '징검다리론', 'rrf_score': 0.032},
+    {'id': 'b', 'product_name': '햇살론15', 'rrf_score': 0.031},
+    {'id': 'c', 'product_name': '햇살론뱅크', 'rrf_score': 0.030},
+]
+
+
+class FakeReranker:
+    def __init__(self, scores, delay=0.0):
+        self.scores = scores
+        self.delay = delay
+        self.calls = []
+
+    def score(self, query, documents, timeout=None):
+        self.calls.append(documents)
+        time.sleep(self.delay)
+        return self.scores
+
+
+def test_rerank_orders_by_score_in_one_call():
+    """모든 후보를 한 번의 호출로 채점하고 점수순으로 상위 limit개 반환"""
+    reranker = FakeReranker([1.0, 9.0, 5.0])
+
+    results, ok = rerank.rerank("햇살론", PRODUCTS, reranker, limit=2)
+
+    assert ok
+    assert len(reranker.calls) == 1 and len(reranker.calls[0]) == 3
+    assert [r['id'] for r in results] == ['b', 'c']
+    assert results[0]['rerank_score'] == 9.0
+    assert results[0]['rrf_score'] == 0.031
+
+
+def test_rerank_falls_back_on_budget_or_error():
+    """지연시간 한도를 넘거나 채점이 실패하면 결합 순서 유지"""
+    slow = FakeReranker([1.0, 9.0, 5.0], delay=0.2)
+    results, ok = rerank.rerank("햇살론", PRODUCTS, slow, limit=2, budget_ms=20)
+    assert not ok
+    assert [r['id'] for r in results] == ['a', 'b']
+
+    broken = FakeReranker([1.0])  # 후보 수와 맞지 않는 점수
+    results, ok = rerank.rerank("햇살론", PRODUCTS, broken, limit=2)
+    assert not ok
+    assert [r['id'] for r in results] == ['a', 'b']
+    assert rerank.rerank_stats()['timeouts'] >= 1
+
+
+def test_rerank_falls_back_when_reranker_cannot_be_created(monkeypatch):
+    """이름으로 받은 재정렬기 생성(모델 로드)이 실패해도 예외 대신 결합 순서 사용"""
+    def missing_extra():
+        raise ImportError("No module named 'sentence_transformers'")
+
+    monkeypatch.setitem(rerank.RERANKERS, "cross_encoder", missing_extra)
+    monkeypatch.setattr(rerank, "_rerankers", {})
+
+    results, ok = rerank.rerank("햇살론", PRODUCTS, "cross_encoder", limit=2)
+
+    assert not ok
+    assert [r['id'] for r in results] == ['a', 'b']
+
+
+def test_rerank_skips_when_workers_are_busy(monkeypatch):
+    """시간 초과된 채점이 스레드를 차지하고 있으면 대기열에 쌓지 않고 바로 결합 순서 사용"""
+    monkeypatch.setattr(rerank, "_slots", threading.BoundedSemaphore(1))
+    slow = FakeReranker([1.0, 9.0, 5.0], delay=0.3)
+    _, ok = rerank.rerank("햇살론", PRODUCTS, slow, limit=2, budget_ms=20)
+    assert not ok
+
+    fast = FakeReranker([1.0, 9.0, 5.0])
+    skipped = rerank.rerank_stats()['skipped']
+    results, ok = rerank.rerank("햇살론", PRODUCTS, fast, limit=2)
+    assert not ok and fast.calls == []
+    assert [r['id'] for r in results] == ['a', 'b']
+    assert rerank.rerank_stats()['skipped'] == skipped + 1
+
+    # 느린 채점이 끝나면 자리가 반납됨
+    time.sleep(0.4)
+    _, ok = rerank.rerank("햇살론", PRODUCTS, fast, limit=2)
+    assert ok
+
+
+def test_llm_reranker_uses_minimal_reasoning_effort():
+    """gpt-5-mini 채점은 minimal 추론으로 호출 (한도 안에 끝나도록)"""
+    requests = []
+
+    class FakeCompletions:
+        def create(self, **kwargs):
+            requests.append(kwargs)
+            message = SimpleNamespace(content='{"scores": [3, 7]}')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+
+    scores = rerank.LLMReranker(client=client).score("햇살론", ["문서1", "문서2"], timeout=1.5)
+
+    assert scores == [3.0, 7.0]
+    assert requests[0]["reasoning_effort"] == "minimal"
+    assert rerank.LLMReranker(client=client, reasoning_effort="").score("햇살론", ["문서1", "문서2"]) == [3.0, 7.0]
+    assert "reasoning_effort" not in requests[1]
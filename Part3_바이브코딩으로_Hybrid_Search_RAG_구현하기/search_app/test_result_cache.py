@@ -0,0 +1,61 @@
+"""
+검색 결과 캐시 테스트
+"""
+from result_cache import SearchResultCache
+
+PRODUCTS = [{'id': 'a', 'product_name': '햇살론', 'rrf_score': 0.03}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_returns_copy():
+    """캐시 히트는 복사본을 반환하므로 호출자가 수정해도 캐시는 그대로"""
+    cache = SearchResultCache(max_size=10)
+    key = cache.make_key("햇살론", 3)
+    cache.set(key, PRODUCTS)
+
+    result = cache.get(key)
+    result[0]['product_name'] = "수정됨"
+
+    assert cache.get(key) == PRODUCTS
+    assert cache.stats()['hit_rate'] == 1.0
+
+
+def test_ttl_and_lru_eviction():
+    """TTL이 지나면 미스, 최대 항목 수를 넘으면 가장 오래 안 쓴 항목부터 제거"""
+    clock = FakeClock()
+    cache = SearchResultCache(max_size=2, ttl=10, clock=clock)
+    cache.set("a", PRODUCTS)
+    cache.set("b", PRODUCTS)
+    cache.get("a")
+    cache.set("c", PRODUCTS)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == PRODUCTS
+    assert cache.stats()['evictions'] == 1
+
+    clock.now = 11
+    assert cache.get("a") is None
+
+
+def test_catalog_version_change_invalidates():
+    """카탈로그 버전이 바뀌면 다음 버전 확인 때 전체 무효화"""
+    clock = FakeClock()
+    version = {'value': 1}
+    cache = SearchResultCache(max_size=10, version_source=lambda: version['value'], check_interval=5, clock=clock)
+    cache.set("a", PRODUCTS)
+    assert cache.get("a") == PRODUCTS
+
+    version['value'] = 2
+    clock.now = 1
+    assert cache.get("a") == PRODUCTS  # 확인 주기 전에는 유지
+
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.stats()['invalidations'] == 1
@@ -0,0 +1,59 @@
+"""
+검색 품질 평가 테스트 (DB/API 불필요)
+"""
+import os
+from pathlib import Path
+
+# OpenAI 클라이언트는 import 시점에 키를 요구하므로 테스트용 값 설정
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import search_eval
+
+PRODUCTS_PATH = Path(__file__).parent.parent / "loan_products.json"
+QUERIES_PATH = Path(__file__).parent / "benchmarks" / "relevance_queries.json"
+
+HATSALLON_IDS = {"cmg7bz9160018f8e2kr3raese", "cmg7bz7od000vf8e2uvkmh1bq", "cmg7bz7vq000xf8e21jmy0le1"}
+
+
+def test_metrics():
+    """정답 {a: 2, b: 1}에 대해 [c, a, d, b] 순서의 지표"""
+    relevant = {'a': 2, 'b': 1}
+    ranked = ['c', 'a', 'd', 'b']
+
+    assert search_eval.recall_at_k(ranked, relevant, 2) == 0.5
+    assert search_eval.recall_at_k(ranked, relevant, 4) == 1.0
+    assert search_eval.reciprocal_rank(ranked, relevant) == 0.5
+    assert search_eval.ndcg_at_k(['a', 'b'], relevant, 2) == 1.0
+    assert 0 < search_eval.ndcg_at_k(ranked, relevant, 4) < 1
+
+
+def test_fake_embedding_is_deterministic_and_normalized():
+    first = search_eval.fake_embedding("서민금융 햇살론")
+    second = search_eval.fake_embedding("서민금융 햇살론")
+
+    assert first == second
+    assert abs(sum(value * value for value in first) - 1.0) < 1e-9
+
+
+def test_memory_bm25_finds_korean_terms():
+    """BM25_ISSUE_REPORT.md에서 0건이던 '햇살론'이 ngram BM25로 검색되는지 확인"""
+    catalog = search_eval.MemoryCatalog.from_json(str(PRODUCTS_PATH))
+
+    top5 = {product_id for product_id, _ in catalog.bm25("햇살론", 5)}
+
+    assert top5 >= HATSALLON_IDS
+
+
+def test_evaluate_labelled_queries():
+    """라벨링된 질의 세트 전체를 평가하고 모드별 지표와 단계별 지연시간을 반환"""
+    catalog = search_eval.MemoryCatalog.from_json(str(PRODUCTS_PATH))
+    queries = search_eval.load_queries(str(QUERIES_PATH))
+
+    report = search_eval.evaluate(catalog, queries, k=10)
+
+    assert {q['query'] for q in queries} >= {"햇살론", "서민금융"}
+    for mode in search_eval.SEARCH_MODES:
+        for value in report['metrics'][mode].values():
+            assert 0.0 <= value <= 1.0
+    assert all(len(report['latencies'][stage]) == len(queries) for stage in search_eval.LATENCY_STAGES)
+    assert report['metrics']['bm25']['recall'] > 0.9
@@ -0,0 +1,44 @@
+"""
+구조화 필드 검색 필터 테스트 (DB 불필요)
+"""
+import pytest
+
+from search_filters import filter_sql, normalize_filters, parse_filter_args
+from vector_index import InMemoryVectorIndex
+from bm25_index import LocalBM25Index
+
+
+def test_filter_sql_positional_and_named():
+    """None 값은 무시하고, 이름순으로 같은 조건을 만듦"""
+    filters = {'max_interest_rate_lte': 5, 'can_apply_mobile': True, 'is_available': None}
+
+    clause, params = filter_sql(filters)
+    assert clause == " AND can_apply_mobile = %s AND max_interest_rate::numeric <= %s"
+    assert params == [True, 5.0]
+
+    clause, params = filter_sql(filters, named=True)
+    assert "%(filter_can_apply_mobile)s" in clause
+    assert params == {'filter_can_apply_mobile': True, 'filter_max_interest_rate_lte': 5.0}
+
+    assert filter_sql(None) == ("", [])
+
+
+def test_invalid_filters_rejected():
+    with pytest.raises(ValueError):
+        normalize_filters({'product_name': '햇살론'})
+    with pytest.raises(ValueError):
+        normalize_filters({'can_apply_mobile': "yes"})
+    assert parse_filter_args(["can_apply_mobile=true", "min_interest_rate_lte=3.5"]) == {
+        'can_apply_mobile': True, 'min_interest_rate_lte': 3.5
+    }
+
+
+def test_local_indexes_respect_allowed_ids():
+    """로컬/메모리 인덱스는 allowed_ids에 있는 상품만 반환"""
+    ids = ["a", "b", "c"]
+    vectors = InMemoryVectorIndex(ids, [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]])
+    assert [pid for pid, _ in vectors.search([1.0, 0.0], limit=3, allowed_ids={"b", "c"})] == ["b", "c"]
+    assert vectors.search([1.0, 0.0], limit=3, allowed_ids=set()) == []
+
+    bm25 = LocalBM25Index.build(ids, ["햇살론 대출", "햇살론 뱅크", "공무원 대출"])
+    assert [pid for pid, _ in bm25.search("햇살론", limit=3, allowed_ids={"b", "c"})] == ["b"]
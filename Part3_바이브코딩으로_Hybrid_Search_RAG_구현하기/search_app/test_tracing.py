@@ -0,0 +1,66 @@
+"""
+단계별 계측(span) 테스트
+"""
+import io
+import json
+import asyncio
+import threading
+
+import pytest
+
+from tracing import start_trace, span, set_attributes, export_spans, summarize
+
+
+def test_spans_nest_across_threads_and_noop_without_trace():
+    """to_thread로 실행한 함수의 span도 부모 span 아래에 기록되고, trace 밖에서는 기록하지 않음"""
+    def leg():
+        with span("db.bm25"):
+            set_attributes(rows=3)
+
+    async def node():
+        with span("retrieve"):
+            await asyncio.to_thread(leg)
+
+    with span("ignored") as attributes:
+        attributes['cache_hit'] = True
+
+    with start_trace() as trace:
+        asyncio.run(node())
+        # 스레드 풀에 직접 제출한 스레드는 컨텍스트를 넘겨받지 않음
+        thread = threading.Thread(target=leg)
+        thread.start()
+        thread.join()
+
+    spans = {record['name']: record for record in trace.spans}
+    assert set(spans) == {"retrieve", "db.bm25"}
+    assert spans["db.bm25"]['parent_span_id'] == spans["retrieve"]['span_id']
+    assert spans["db.bm25"]['attributes'] == {'rows': 3}
+
+    stream = io.StringIO()
+    export_spans(trace, stream)
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['name'] for line in lines] == ["retrieve", "db.bm25"]
+    assert all(line['trace_id'] == trace.trace_id for line in lines)
+
+
+def test_summary_aggregates_latency_tokens_and_cache_hits():
+    """span 이름별 p95, 숫자 속성 합계, 참/거짓 속성 비율 집계 (예외가 난 span은 error 상태)"""
+    traces = []
+    for i in range(4):
+        with start_trace() as trace:
+            with span("embedding", cache_hit=i > 0):
+                pass
+            with span("llm.generate") as attributes:
+                attributes['llm.input_tokens'] = 100
+            with pytest.raises(RuntimeError):
+                with span("db.vector"):
+                    raise RuntimeError("timeout")
+        traces.append(trace)
+
+    rows = {row['name']: row for row in summarize(traces)}
+
+    assert rows["embedding"]['count'] == 4
+    assert rows["embedding"]['rates'] == {'cache_hit': 0.75}
+    assert rows["llm.generate"]['totals'] == {'llm.input_tokens': 400}
+    assert traces[0].spans[-1]['status'] == "error"
+    assert rows["db.vector"]['p95_ms'] >= rows["db.vector"]['p50_ms']
@@ -0,0 +1,58 @@
+"""
+프로세스 내 벡터 인덱스 테스트 (DB 불필요)
+"""
+from contextlib import contextmanager
+
+import numpy as np
+
+import vector_index
+
+
+@contextmanager
+def fake_connection(pooled=True):
+    yield object()
+
+
+def test_search_matches_brute_force_cosine():
+    """행렬곱 top-k가 직접 계산한 코사인 유사도 순서와 같은지 확인"""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 16))
+    ids = [f"p{i}" for i in range(50)]
+    index = vector_index.InMemoryVectorIndex(ids, embeddings.tolist())
+    query = rng.normal(size=16)
+
+    results = index.search(query.tolist(), limit=5)
+
+    cosine = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    expected = [ids[i] for i in np.argsort(-cosine)[:5]]
+    assert [product_id for product_id, _ in results] == expected
+    assert abs(results[0][1] - cosine.max()) < 1e-5
+
+
+def test_search_edge_cases():
+    """빈 인덱스, limit이 상품 수보다 큰 경우"""
+    assert vector_index.InMemoryVectorIndex([], []).search([1.0, 0.0], limit=3) == []
+
+    index = vector_index.InMemoryVectorIndex(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    assert [product_id for product_id, _ in index.search([1.0, 0.1], limit=10)] == ["a", "b"]
+
+
+def test_reloads_when_catalog_version_changes(monkeypatch):
+    """카탈로그 버전이 바뀌었을 때만 다시 로드"""
+    versions = iter([1, 1, 2])
+    loads = []
+
+    def fake_from_db(conn):
+        loads.append(conn)
+        return vector_index.InMemoryVectorIndex(["a"], [[1.0]])
+
+    monkeypatch.setattr(vector_index, "get_connection", fake_connection)
+    monkeypatch.setattr(vector_index, "get_catalog_version", lambda conn: next(versions))
+    monkeypatch.setattr(vector_index.InMemoryVectorIndex, "from_db", staticmethod(fake_from_db))
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_REFRESH_INTERVAL", 0)
+    monkeypatch.setattr(vector_index, "_index", None)
+
+    first = vector_index.get_vector_index()
+    assert vector_index.get_vector_index() is first
+    assert vector_index.get_vector_index() is not first
+    assert len(loads) == 2
@@ -0,0 +1,167 @@
+"""
+RAG 단계별 계측 (OpenTelemetry 형식의 span)
+질문 하나를 trace 하나로 묶고, 노드(route/retrieve/generate)와 그 안의 단계(LLM 호출, 임베딩,
+BM25/벡터 검색, 상세 조회, DB 연결 대기)를 span으로 기록합니다.
+
+- start_trace() 안에서 실행된 코드만 기록하며, trace가 없으면 span()은 아무것도 하지 않습니다.
+- 현재 trace/span은 contextvars로 전달되므로 asyncio 태스크와 asyncio.to_thread()로 실행한
+  함수에도 이어집니다. 스레드 풀에 직접 제출할 때는 contextvars.copy_context().run으로 감싸세요.
+- span의 attributes에는 LLM 토큰 수(llm.input_tokens 등), 캐시 적중 여부(cache_hit) 등을 기록합니다.
+
+export_spans()는 span을 한 줄에 하나씩 JSON으로 기록하고, print_summary()는 span 이름별
+p50/p95 지연시간과 속성 합계/비율을 표로 출력합니다.
+"""
+import json
+import math
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, TextIO
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[dict]] = ContextVar("current_span", default=None)
+
+
+class Trace:
+    """질문 하나의 span 목록 (여러 스레드/태스크에서 추가되므로 lock으로 보호)"""
+
+    def __init__(self, name: str = "rag"):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.root_span_id: Optional[str] = None
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+
+@contextmanager
+def start_trace(name: str = "rag") -> Iterator[Trace]:
+    """이 블록 안(과 여기서 시작한 태스크/스레드)의 span을 새 trace에 기록"""
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, detached: bool = False, **attributes) -> Iterator[dict]:
+    """
+    블록 실행 시간을 span으로 기록하고, 블록에서 채울 수 있는 attributes 딕셔너리를 반환
+    trace가 없으면 기록하지 않습니다 (반환된 딕셔너리는 버려짐).
+    예외가 나면 status="error"와 error 속성을 남기고 예외는 그대로 전달합니다.
+    detached=True이면 현재 span 대신 trace의 최상위 span 아래에 기록합니다
+    (노드 안에서 시작했지만 노드와 별개로 이어지는 백그라운드 작업용).
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield dict(attributes)
+        return
+
+    parent = _current_span.get()
+    span_id = uuid.uuid4().hex[:16]
+    if parent is None and trace.root_span_id is None:
+        trace.root_span_id = span_id
+    if detached:
+        parent_span_id = trace.root_span_id if trace.root_span_id != span_id else None
+    else:
+        parent_span_id = parent['span_id'] if parent else None
+    record = {
+        'trace_id': trace.trace_id,
+        'span_id': span_id,
+        'parent_span_id': parent_span_id,
+        'name': name,
+        'start_time_unix_nano': time.time_ns(),
+        'attributes': dict(attributes),
+        'status': "ok",
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record['attributes']
+    except BaseException as e:
+        record['status'] = "error"
+        record['attributes']['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        record['end_time_unix_nano'] = record['start_time_unix_nano'] + int(record['duration_ms'] * 1_000_000)
+        _current_span.reset(token)
+        trace.add(record)
+
+
+def set_attributes(**attributes):
+    """현재 span에 속성 추가 (span이 없으면 무시)"""
+    record = _current_span.get()
+    if record is not None:
+        record['attributes'].update(attributes)
+
+
+def export_spans(trace: Trace, stream: TextIO):
+    """trace의 span을 시작 시각 순서로 한 줄에 하나씩 JSON으로 기록"""
+    for record in sorted(trace.spans, key=lambda s: s['start_time_unix_nano']):
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    stream.flush()
+
+
+def summarize(traces: List[Trace]) -> List[dict]:
+    """
+    span 이름별 요약 (p95 내림차순)
+    숫자 속성은 합계, 참/거짓 속성은 참인 비율로 집계합니다.
+    Returns: [{'name', 'count', 'p50_ms', 'p95_ms', 'mean_ms', 'totals', 'rates'}, ...]
+    """
+    grouped = {}
+    for trace in traces:
+        for record in trace.spans:
+            grouped.setdefault(record['name'], []).append(record)
+
+    rows = []
+    for name, records in grouped.items():
+        durations = sorted(record['duration_ms'] for record in records)
+        totals, rates = {}, {}
+        for record in records:
+            for key, value in record['attributes'].items():
+                if isinstance(value, bool):
+                    rates.setdefault(key, []).append(value)
+                elif isinstance(value, (int, float)):
+                    totals[key] = totals.get(key, 0) + value
+        rows.append({
+            'name': name,
+            'count': len(records),
+            'p50_ms': _percentile(durations, 50),
+            'p95_ms': _percentile(durations, 95),
+            'mean_ms': sum(durations) / len(durations),
+            'totals': totals,
+            'rates': {key: sum(values) / len(values) for key, values in rates.items()},
+        })
+    return sorted(rows, key=lambda row: row['p95_ms'], reverse=True)
+
+
+def print_summary(traces: List[Trace], file: TextIO = None):
+    """span 이름별 지연시간과 속성 요약 표 출력"""
+    print("="*100, file=file)
+    print(f"{'span':<20} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}  attributes", file=file)
+    print("-"*100, file=file)
+    for row in summarize(traces):
+        details = [f"{key}={value:g}" for key, value in sorted(row['totals'].items())]
+        details += [f"{key}={value:.0%}" for key, value in sorted(row['rates'].items())]
+        print(
+            f"{row['name']:<20} {row['count']:>5} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} "
+            f"{row['mean_ms']:>10.1f}  {', '.join(details)}",
+            file=file
+        )
+    print("="*100, file=file)
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    """nearest-rank 방식 백분위수 (정렬된 값)"""
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
@@ -0,0 +1,137 @@
+"""
+프로세스 내 벡터 인덱스
+상품이 수십~수천 개 수준이면 Neon 왕복보다 메모리 내 계산이 빠릅니다.
+loan_products의 임베딩을 정규화된 float32 행렬 하나로 올려 두고, 코사인 top-k를 행렬곱 한 번으로 계산합니다.
+
+load_data.py가 상품을 바꾸면 카탈로그 버전(schema.bump_catalog_version)이 올라가고,
+인덱스는 VECTOR_INDEX_REFRESH_INTERVAL초마다 버전을 확인하여 바뀌었으면 다시 로드합니다.
+같은 프로세스에서 즉시 반영하려면 refresh_vector_index()를 호출합니다.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import nullcontext
+from typing import List, Optional, Set, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from db_pool import get_connection
+from schema import get_catalog_version
+
+# 환경변수 로드
+load_dotenv()
+
+# 카탈로그 버전 확인 주기 (초)
+VECTOR_INDEX_REFRESH_INTERVAL = float(os.getenv("VECTOR_INDEX_REFRESH_INTERVAL", "60"))
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+class InMemoryVectorIndex:
+    """정규화된 임베딩 행렬 기반 코사인 유사도 검색"""
+
+    def __init__(self, ids: List[str], embeddings):
+        self.ids = list(ids)
+        self.positions = {product_id: i for i, product_id in enumerate(self.ids)}
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = np.ascontiguousarray(matrix / norms)
+
+    @classmethod
+    def from_db(cls, conn) -> "InMemoryVectorIndex":
+        """loan_products의 임베딩 전체 로드"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, searchable_text_embedding::text
+            FROM loan_products
+            WHERE searchable_text_embedding IS NOT NULL
+            ORDER BY id
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+
+        # pgvector의 텍스트 표현 '[0.1,0.2,...]'은 JSON 배열과 같은 형식
+        return cls([row[0] for row in rows], [json.loads(row[1]) for row in rows])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(
+        self,
+        query_embedding: list,
+        limit: int = 20,
+        allowed_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        코사인 유사도 top-k (vector_search()와 같은 형식)
+        allowed_ids를 주면 그 상품만 후보로 사용합니다 (search_filters.allowed_ids 참고).
+        Returns: [(product_id, similarity), ...]
+        """
+        if not self.ids or limit <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = self.matrix @ query
+        limit = min(limit, len(self.ids))
+        if allowed_ids is not None:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[[self.positions[i] for i in allowed_ids if i in self.positions]] = True
+            scores = np.where(mask, scores, -np.inf)
+            limit = min(limit, int(mask.sum()))
+            if limit == 0:
+                return []
+        # 전체 정렬 대신 상위 limit개만 골라 정렬 (동점은 id 순서)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+
+def get_vector_index(conn=None) -> InMemoryVectorIndex:
+    """
+    모듈 단위 벡터 인덱스 반환
+    최초 호출 시 로드하고, 이후에는 VECTOR_INDEX_REFRESH_INTERVAL마다 카탈로그 버전을 확인합니다.
+    conn: 호출자가 이미 잡고 있는 연결 (주면 풀에서 연결을 하나 더 빌리지 않으므로, 연결을 쥔 채 풀을 기다리는 교착을 막음)
+    """
+    global _index, _index_version, _checked_at
+
+    if _index is not None and time.monotonic() - _checked_at < VECTOR_INDEX_REFRESH_INTERVAL:
+        return _index
+
+    with _index_lock:
+        if _index is not None and time.monotonic() - _checked_at < VECTOR_INDEX_REFRESH_INTERVAL:
+            return _index
+
+        with nullcontext(conn) if conn is not None else get_connection() as conn:
+            version = get_catalog_version(conn)
+            if _index is None or version != _index_version:
+                _index = InMemoryVectorIndex.from_db(conn)
+                _index_version = version
+                print(f"Loaded in-memory vector index: {len(_index)} products (catalog version {version})", file=sys.stderr)
+        _checked_at = time.monotonic()
+
+    return _index
+
+
+def refresh_vector_index(conn=None) -> InMemoryVectorIndex:
+    """버전과 관계없이 즉시 다시 로드 (갱신 훅, conn은 get_vector_index()와 같음)"""
+    global _index, _index_version, _checked_at
+
+    with _index_lock:
+        with nullcontext(conn) if conn is not None else get_connection() as conn:
+            _index_version = get_catalog_version(conn)
+            _index = InMemoryVectorIndex.from_db(conn)
+        _checked_at = time.monotonic()
+        print(f"Reloaded in-memory vector index: {len(_index)} products (catalog version {_index_version})", file=sys.stderr)
+
+    return _index